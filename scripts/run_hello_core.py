@@ -9,35 +9,22 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
-from src.glyphser.certificate.build import write_execution_certificate  # noqa: E402
-from src.glyphser.checkpoint.write import save_checkpoint  # noqa: E402
+from src.glyphser.certificate.build import write_execution_certificate_digests  # noqa: E402
+from src.glyphser.checkpoint.write import save_checkpoint_digests  # noqa: E402
+from src.glyphser.data.jsonl_dataset import JsonlDataset  # noqa: E402
 from src.glyphser.data.next_batch import next_batch  # noqa: E402
 from src.glyphser.model.model_ir_executor import execute  # noqa: E402
-from src.glyphser.trace.compute_trace_hash import compute_trace_hash  # noqa: E402
-from src.glyphser.serialization.canonical_cbor import encode_canonical  # noqa: E402
+from src.glyphser.serialization.canonical_cbor import encode_canonical, freeze  # noqa: E402
 from src.glyphser.trace.trace_sidecar import write_trace  # noqa: E402
 
 FIXTURES = ROOT / "fixtures" / "hello-core"
 GOLDEN = ROOT / "docs" / "examples" / "hello-core" / "hello-core-golden.json"
 
 
-def _canonical_json_bytes(obj) -> bytes:
-    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=True).encode("utf-8")
-
-
 def _sha256_hex(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
-def _load_dataset(path: Path) -> list[dict]:
-    rows = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if not line.strip():
-            continue
-        rows.append(json.loads(line))
-    return rows
-
-
 def _record_hash(record: dict) -> str:
     return _sha256_hex(encode_canonical(record))
 
@@ -53,7 +40,7 @@ def main() -> int:
         print("missing fixture inputs in fixtures/hello-core")
         return 1
 
-    dataset = _load_dataset(dataset_path)
+    dataset = JsonlDataset(dataset_path)
     model_ir = json.loads(model_ir_path.read_text(encoding="utf-8"))
 
     cursor = 0
@@ -62,18 +49,20 @@ def main() -> int:
         print("empty batch")
         return 1
 
+    # The batch row is embedded in several trace records; freezing it lets the
+    # encoder reuse its canonical bytes instead of re-encoding it each time.
+    row = freeze(batch[0])
     inputs = batch[0]["x"]
     outputs = execute(model_ir, inputs)
 
     base_records = [
-        {"step": 1, "operator_id": "Glyphser.Data.NextBatch", "batch": batch[0]},
+        {"step": 1, "operator_id": "Glyphser.Data.NextBatch", "batch": row},
         {"step": 1, "operator_id": "Glyphser.Model.ModelIR_Executor", "inputs": inputs, "outputs": outputs},
     ]
     trace_records = [{**rec, "event_hash": _record_hash(rec)} for rec in base_records]
 
     trace_path = FIXTURES / "trace.json"
-    _ = write_trace(trace_records, trace_path)
-    trace_final_hash = compute_trace_hash(trace_records)
+    trace_final_hash = write_trace(trace_records, trace_path)
 
     manifest_hash = _sha256_hex((FIXTURES / "manifest.core.yaml").read_bytes())
     operator_registry_root_hash = json.loads(
@@ -87,8 +76,8 @@ def main() -> int:
         "operator_registry_root_hash": operator_registry_root_hash,
     }
     checkpoint_path = FIXTURES / "checkpoint.json"
-    _ = save_checkpoint(checkpoint_header, checkpoint_path)
-    checkpoint_hash = _sha256_hex(_canonical_json_bytes(checkpoint_header))
+    checkpoint_digests = save_checkpoint_digests(checkpoint_header, checkpoint_path)
+    checkpoint_hash = checkpoint_digests.json_sha256
 
     execution_certificate = {
         "certificate_id": "hello-core-cert-v1",
@@ -99,8 +88,10 @@ def main() -> int:
         "policy_gate_hash": "5a5e629c6f1bece7ef8d0b20f8ee99153f7eda4e2ec03eaa7b65db06d20fca67",
     }
     certificate_path = FIXTURES / "execution_certificate.json"
-    _ = write_execution_certificate(execution_certificate, certificate_path)
-    certificate_hash = _sha256_hex(_canonical_json_bytes(execution_certificate))
+    certificate_digests = write_execution_certificate_digests(
+        execution_certificate, certificate_path
+    )
+    certificate_hash = certificate_digests.json_sha256
 
     interface_hash = json.loads(
         (ROOT / "contracts" / "interface_hash.json").read_text(encoding="utf-8")
@@ -1,17 +1,22 @@
 """Deterministic execution certificate writer (minimal)."""
 from __future__ import annotations
 
-import hashlib
-import json
 from pathlib import Path
 from typing import Any, Dict
 
-from src.glyphser.serialization.canonical_cbor import encode_canonical
+from src.glyphser.persistence.artifact_writer import ArtifactDigests, write_artifact
+from src.glyphser.persistence.background_writer import PersistenceService
 
+CERTIFICATE_DOMAIN = "execution_certificate"
 
-def write_execution_certificate(evidence: Dict[str, Any], path: Path) -> str:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    text = json.dumps(evidence, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
-    path.write_text(text + "\n", encoding="utf-8")
-    digest = hashlib.sha256(encode_canonical(["execution_certificate", evidence])).hexdigest()
-    return digest
+
+def write_execution_certificate_digests(
+    evidence: Dict[str, Any], path: Path, service: PersistenceService | None = None
+) -> ArtifactDigests:
+    return write_artifact(evidence, path, CERTIFICATE_DOMAIN, service)
+
+
+def write_execution_certificate(
+    evidence: Dict[str, Any], path: Path, service: PersistenceService | None = None
+) -> str:
+    return write_artifact(evidence, path, CERTIFICATE_DOMAIN, service).commit_hash
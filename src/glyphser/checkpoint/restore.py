@@ -0,0 +1,198 @@
+"""Lazy, memory-mapped restore of sharded checkpoints (Checkpoint.Restore).
+
+``restore_checkpoint`` reads only the header and the manifest up front: the
+header, when the checkpoint has one, is validated and must commit to the
+manifest's hash and Merkle root, and the Merkle root is recomputed from the
+manifest's shard list. Shard files
+are memory-mapped the first time one of their entries is accessed, and their
+size and SHA-256 are checked against the manifest before anything is decoded
+from them. Entries are returned as lazy canonical CBOR views, so byte strings
+and ``raw``/``tensor_buffer`` results are zero-copy slices of the mapping.
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+from collections.abc import Mapping
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterator, List
+
+from src.glyphser.checkpoint.sharded import (
+    HEADER_NAME,
+    MANIFEST_NAME,
+    MANIFEST_VERSION,
+    merkle_root,
+    shard_leaf,
+)
+from src.glyphser.data_structures.validate_struct import validate_checkpoint_header
+from src.glyphser.serialization.canonical_cbor_decode import (
+    CBORMapView,
+    decode_canonical,
+    decode_canonical_lazy,
+    typed_array_payload,
+)
+
+
+def _check_shard_path(rel_path: Any) -> str:
+    if not isinstance(rel_path, str):
+        raise ValueError("missing or invalid str: path")
+    parts = PurePosixPath(rel_path).parts
+    if not parts or parts[0] == "/" or ".." in parts:
+        raise ValueError(f"shard path escapes the checkpoint directory: {rel_path!r}")
+    return rel_path
+
+
+class RestoredCheckpoint(Mapping):
+    """Read-only mapping over the entries of a restored checkpoint.
+
+    ``header`` (``None`` for checkpoints saved without one) and ``manifest``
+    are decoded eagerly; entries are decoded on
+    access from the memory-mapped shard that holds them. ``close()`` (or the
+    context manager) releases the mappings that no returned view still uses.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        header: Dict[str, Any] | None,
+        manifest: Dict[str, Any],
+        manifest_hash: bytes,
+    ):
+        self.directory = Path(directory)
+        self.header = header
+        self.manifest = manifest
+        self.checkpoint_hash = manifest_hash.hex()
+        self._shards: Dict[str, Dict[str, Any]] = {
+            s["path"]: s for s in manifest["shards"]
+        }
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._views: Dict[str, CBORMapView] = {}
+        self._locations: Dict[str, str] = {}
+        for path, shard in self._shards.items():
+            names = shard.get("entries")
+            if names is None:
+                # Manifests without entry lists are indexed by opening the shard.
+                names = list(self._open(path))
+            for name in names:
+                if name in self._locations:
+                    raise ValueError(f"duplicate checkpoint entry: {name}")
+                self._locations[name] = path
+
+    def _open(self, path: str) -> CBORMapView:
+        view = self._views.get(path)
+        if view is not None:
+            return view
+        shard = self._shards[path]
+        with open(self.directory / path, "rb") as f:
+            size = f.seek(0, 2)
+            if not size or size != shard["size_bytes"]:
+                raise ValueError(f"shard size mismatch: {path}")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hashlib.sha256(mm).digest() != shard["sha256"]:
+            mm.close()
+            raise ValueError(f"shard hash mismatch: {path}")
+        view = decode_canonical_lazy(mm)
+        if not isinstance(view, CBORMapView):
+            raise ValueError(f"shard is not a map: {path}")
+        names = shard.get("entries")
+        if names is not None and list(view) != names:
+            raise ValueError(f"shard entries do not match the manifest: {path}")
+        self._maps[path] = mm
+        self._views[path] = view
+        return view
+
+    def shard_of(self, name: str) -> str:
+        """Relative path of the shard holding entry ``name``."""
+        return self._locations[name]
+
+    def __getitem__(self, name: str) -> Any:
+        return self._open(self._locations[name])[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(self._locations))
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._locations
+
+    def raw(self, name: str) -> memoryview:
+        """Canonical CBOR encoding of entry ``name``, sliced from its shard."""
+        return self._open(self._locations[name]).raw(name)
+
+    def tensor_buffer(self, name: str) -> tuple[str, memoryview]:
+        """``(typecode, big-endian payload)`` of a typed-array entry, zero-copy."""
+        return typed_array_payload(self.raw(name))
+
+    @property
+    def loaded_shards(self) -> List[str]:
+        return sorted(self._views)
+
+    def verify(self) -> str:
+        """Check every shard against the manifest; returns ``checkpoint_hash``."""
+        for path in self._shards:
+            self._open(path)
+        return self.checkpoint_hash
+
+    def to_python(self) -> Dict[str, Any]:
+        """Fully decode (and validate) every entry."""
+        return {name: decode_canonical(self.raw(name)) for name in self}
+
+    def close(self) -> None:
+        self._views.clear()
+        for mm in self._maps.values():
+            try:
+                mm.close()
+            except BufferError:
+                pass  # still exported by a returned view; freed with it
+        self._maps.clear()
+
+    def __enter__(self) -> RestoredCheckpoint:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def restore_checkpoint(
+    directory: Path, expected_hash: str | None = None
+) -> RestoredCheckpoint:
+    """Open the sharded checkpoint in ``directory`` without reading its shards.
+
+    A header, if present, must pass ``validate_checkpoint_header`` and match
+    the manifest's hash and Merkle root; without one only the manifest's
+    Merkle root is checked. ``expected_hash`` (hex) additionally pins
+    ``checkpoint_hash``. Raises ``ValueError`` on any mismatch.
+    """
+    directory = Path(directory)
+    header = None
+    header_path = directory / HEADER_NAME
+    if header_path.exists():
+        header = decode_canonical(header_path.read_bytes())
+        if not isinstance(header, dict):
+            raise ValueError("checkpoint header must be a map")
+        validate_checkpoint_header(header)
+    manifest_bytes = (directory / MANIFEST_NAME).read_bytes()
+    manifest_hash = hashlib.sha256(manifest_bytes).digest()
+    if header is not None and header.get("checkpoint_manifest_hash") != manifest_hash:
+        raise ValueError("checkpoint header does not match the manifest hash")
+    if expected_hash is not None and manifest_hash.hex() != expected_hash:
+        raise ValueError("checkpoint hash mismatch")
+    manifest = decode_canonical(manifest_bytes)
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        raise ValueError(
+            f"unsupported manifest_version: {manifest.get('manifest_version')!r}"
+        )
+    shards = manifest["shards"]
+    paths = [_check_shard_path(s.get("path")) for s in shards]
+    if paths != sorted(set(paths)):
+        raise ValueError("manifest shards must be sorted by unique path")
+    root = merkle_root(
+        [shard_leaf(s["path"], s["sha256"], s["size_bytes"]) for s in shards]
+    )
+    if manifest["checkpoint_merkle_root"] != root or (
+        header is not None and header.get("checkpoint_merkle_root") != root
+    ):
+        raise ValueError("checkpoint_merkle_root mismatch")
+    return RestoredCheckpoint(directory, header, manifest, manifest_hash)
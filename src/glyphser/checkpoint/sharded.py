@@ -0,0 +1,186 @@
+"""Sharded checkpoint container with a Merkle-rooted manifest.
+
+Layout and hashing follow Checkpoint-Schema II.G.
+"""
+from __future__ import annotations
+
+import array
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping
+
+from src.glyphser.data_structures.validate_struct import validate_checkpoint_header
+from src.glyphser.persistence.background_writer import atomic_write_bytes
+from src.glyphser.serialization.canonical_cbor import (
+    encode_canonical,
+    encode_canonical_into,
+)
+
+MANIFEST_NAME = "checkpoint_manifest.cbor"
+HEADER_NAME = "checkpoint_header.cbor"
+MANIFEST_VERSION = "1"
+
+
+def commit_hash(tag: str, data: Any) -> bytes:
+    """``CommitHash(tag, data) = SHA-256(CBOR_CANONICAL([tag, data]))``."""
+    hasher = hashlib.sha256()
+    encode_canonical_into([tag, data], hasher)
+    return hasher.digest()
+
+
+def shard_leaf(path: str, sha256: bytes, size_bytes: int) -> bytes:
+    return commit_hash("ckpt_shard", [path, sha256, size_bytes])
+
+
+def merkle_root(leaves: List[bytes]) -> bytes:
+    """``checkpoint_merkle_root`` over leaves already ordered by shard path."""
+    if not leaves:
+        return commit_hash("ckpt_merkle_root", [])
+    level = list(leaves)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [
+            commit_hash("ckpt_merkle_node", [level[i], level[i + 1]])
+            for i in range(0, len(level), 2)
+        ]
+    return level[0]
+
+
+def _approx_size(value: Any) -> int:
+    # Cheap, deterministic size estimate used only to pack shards; it does not
+    # have to match the encoded size exactly.
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (memoryview, array.array)):
+        return memoryview(value).nbytes
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(value, (list, tuple)):
+        return 9 * len(value)
+    if isinstance(value, dict):
+        return sum(_approx_size(v) + len(k) for k, v in value.items())
+    if isinstance(value, str):
+        return len(value)
+    return 9
+
+
+def plan_shards(state: Mapping[str, Any], shard_bytes: int) -> List[List[str]]:
+    """Group state entries (in key order) into shards of about ``shard_bytes``.
+
+    An entry larger than the budget gets a shard of its own; ``shard_bytes=0``
+    puts every entry in its own shard.
+    """
+    if shard_bytes < 0:
+        raise ValueError("shard_bytes must be non-negative")
+    groups: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for name in sorted(state):
+        if not isinstance(name, str):
+            raise TypeError("checkpoint state keys must be str")
+        n = _approx_size(state[name])
+        if current and size + n > shard_bytes:
+            groups.append(current)
+            current, size = [], 0
+        current.append(name)
+        size += n
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _write_shard(
+    directory: str, rel_path: str, entries: Dict[str, Any], fsync: bool
+) -> tuple[str, bytes, int]:
+    data = encode_canonical(entries)
+    atomic_write_bytes(Path(directory) / rel_path, data, fsync=fsync)
+    return rel_path, hashlib.sha256(data).digest(), len(data)
+
+
+def build_manifest(
+    shards: Iterable[tuple[str, bytes, int]],
+    extra: Mapping[str, Any] | None = None,
+    entries: Mapping[str, List[str]] | None = None,
+) -> Dict[str, Any]:
+    """Return the ``checkpoint_manifest`` map for ``(path, sha256, size_bytes)`` shards.
+
+    ``entries`` optionally maps a shard path to the state keys it holds; it is
+    recorded per shard (an additive field outside the Merkle leaves) so that a
+    reader can locate an entry without opening other shards.
+    """
+    ordered = sorted(shards)
+    records = []
+    for p, h, n in ordered:
+        record: Dict[str, Any] = {"path": p, "sha256": h, "size_bytes": n}
+        if entries is not None:
+            record["entries"] = list(entries[p])
+        records.append(record)
+    manifest: Dict[str, Any] = dict(extra or {})
+    manifest.update(
+        {
+            "manifest_version": MANIFEST_VERSION,
+            "checkpoint_merkle_root": merkle_root([shard_leaf(*s) for s in ordered]),
+            "shards": records,
+        }
+    )
+    return manifest
+
+
+def save_sharded_checkpoint(
+    state: Mapping[str, Any],
+    directory: Path,
+    shard_bytes: int = 64 << 20,
+    rank: int = 0,
+    workers: int | None = 1,
+    fsync: bool = True,
+    extra_manifest: Mapping[str, Any] | None = None,
+    header: Mapping[str, Any] | None = None,
+) -> str:
+    """Write ``state`` as ``tensors/rank=<rank>/shard=<k>.bin`` files plus a manifest.
+
+    Each shard is the canonical CBOR map of its entries. Shards are encoded,
+    hashed and written atomically in a process pool when ``workers > 1``
+    (``None`` means one per CPU); the manifest is written after them. With
+    ``header``, ``checkpoint_header.cbor`` is written last, extended with
+    ``checkpoint_manifest_hash`` and ``checkpoint_merkle_root``; without it, a
+    header left in ``directory`` by an earlier save is removed. Returns
+    ``checkpoint_hash = ObjectDigest(checkpoint_manifest)``.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if header is None:
+        (directory / HEADER_NAME).unlink(missing_ok=True)
+    jobs = [
+        (
+            str(directory),
+            f"tensors/rank={rank}/shard={k}.bin",
+            {name: state[name] for name in group},
+            fsync,
+        )
+        for k, group in enumerate(plan_shards(state, shard_bytes))
+    ]
+    entries = {job[1]: list(job[2]) for job in jobs}
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            shards = list(pool.map(_write_shard, *zip(*jobs)))
+    else:
+        shards = [_write_shard(*job) for job in jobs]
+    manifest = build_manifest(shards, extra_manifest, entries)
+    manifest_bytes = encode_canonical(manifest)
+    atomic_write_bytes(directory / MANIFEST_NAME, manifest_bytes, fsync=fsync)
+    manifest_hash = hashlib.sha256(manifest_bytes).digest()
+    if header is not None:
+        validate_checkpoint_header(dict(header))
+        header_map = dict(header)
+        header_map["checkpoint_manifest_hash"] = manifest_hash
+        header_map["checkpoint_merkle_root"] = manifest["checkpoint_merkle_root"]
+        atomic_write_bytes(
+            directory / HEADER_NAME, encode_canonical(header_map), fsync=fsync
+        )
+    return manifest_hash.hex()
@@ -1,17 +1,23 @@
 """Deterministic checkpoint writer (minimal)."""
 from __future__ import annotations
 
-import hashlib
-import json
 from pathlib import Path
 from typing import Any, Dict
 
-from src.glyphser.serialization.canonical_cbor import encode_canonical
+from src.glyphser.persistence.artifact_writer import ArtifactDigests, write_artifact
+from src.glyphser.persistence.background_writer import PersistenceService
 
+CHECKPOINT_DOMAIN = "checkpoint"
 
-def save_checkpoint(state: Dict[str, Any], path: Path) -> str:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    text = json.dumps(state, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
-    path.write_text(text + "\n", encoding="utf-8")
-    digest = hashlib.sha256(encode_canonical(["checkpoint", state])).hexdigest()
-    return digest
+
+def save_checkpoint_digests(
+    state: Dict[str, Any], path: Path, service: PersistenceService | None = None
+) -> ArtifactDigests:
+    return write_artifact(state, path, CHECKPOINT_DOMAIN, service)
+
+
+def save_checkpoint(
+    state: Dict[str, Any], path: Path, service: PersistenceService | None = None
+) -> str:
+    # Serialized now, so the caller may mutate state while a queued write is pending.
+    return write_artifact(state, path, CHECKPOINT_DOMAIN, service).commit_hash
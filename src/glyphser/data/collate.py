@@ -0,0 +1,104 @@
+"""Collate batches into contiguous, array-backed columns.
+
+Columns follow the snapshot schema rules (``snapshot.infer_schema``): bool,
+int64 and float64 scalars, and same-length int64/float64 lists, become one
+flat buffer per column of ``rows * width`` elements; anything else stays a
+list of values. With ``backend="numpy"`` fixed-width columns are wrapped as
+``numpy.ndarray`` views of those buffers (NumPy is imported only then).
+"""
+from __future__ import annotations
+
+import array
+import itertools
+from typing import Any, Dict, Iterable, NamedTuple, Sequence, Tuple
+
+from src.glyphser.data.snapshot import SNAPSHOT_DTYPES, SnapshotDataset, infer_schema
+
+_NUMPY_DTYPES = {"bool": "|u1", "int64": "<i8", "float64": "<f8"}
+
+
+class Column(NamedTuple):
+    """One collated column: ``data`` holds ``shape[0]`` rows of ``shape[1:]`` items."""
+
+    data: Any
+    dtype: str
+    shape: Tuple[int, ...]
+
+
+def _to_numpy(column: Column) -> Column:
+    import numpy as np
+
+    if column.dtype not in SNAPSHOT_DTYPES:
+        return column
+    code = SNAPSHOT_DTYPES[column.dtype]
+    if not isinstance(column.data, array.array):
+        code = _NUMPY_DTYPES[column.dtype]
+    values = np.frombuffer(column.data, dtype=np.dtype(code)).reshape(column.shape)
+    return Column(values, column.dtype, column.shape)
+
+
+def _finish(columns: Dict[str, Column], backend: str) -> Dict[str, Column]:
+    if backend == "array":
+        return columns
+    if backend == "numpy":
+        return {name: _to_numpy(column) for name, column in columns.items()}
+    raise ValueError(f"unknown collate backend: {backend!r}")
+
+
+def collate(
+    rows: Sequence[Dict[str, Any]],
+    columns: Iterable[str] | None = None,
+    backend: str = "array",
+) -> Dict[str, Column]:
+    """Collate a batch of row dicts (e.g. from ``next_batch``) column by column.
+
+    Fixed-width columns are built as one ``array.array`` each (native byte
+    order); a row missing a key puts that key in a list column.
+    """
+    wanted = None if columns is None else set(columns)
+    out: Dict[str, Column] = {}
+    n = len(rows)
+    for name, dtype, shape in infer_schema(rows):
+        if wanted is not None and name not in wanted:
+            continue
+        if dtype == "cbor":
+            out[name] = Column([row.get(name) for row in rows], dtype, (n,))
+            continue
+        values = (row[name] for row in rows)
+        if shape:
+            values = itertools.chain.from_iterable(values)
+        out[name] = Column(
+            array.array(SNAPSHOT_DTYPES[dtype], values), dtype, (n, *shape)
+        )
+    if wanted is not None and wanted - out.keys():
+        raise KeyError(sorted(wanted - out.keys())[0])
+    return _finish(out, backend)
+
+
+def collate_snapshot(
+    snapshot: SnapshotDataset,
+    cursor: int,
+    batch_size: int,
+    world_size: int = 1,
+    rank: int = 0,
+    drop_last: bool = False,
+    columns: Iterable[str] | None = None,
+    backend: str = "array",
+) -> Tuple[Dict[str, Column], int]:
+    """Collated ``snapshot.next_column_batch``; returns ``(columns, next_cursor)``.
+
+    Fixed-width columns are ``memoryview`` slices of the mapped snapshot
+    buffers (little-endian hosts), so no element is copied; NumPy columns
+    are views of the same memory.
+    """
+    batch, next_cursor = snapshot.next_column_batch(
+        cursor, batch_size, world_size, rank, drop_last, columns
+    )
+    specs = {c["name"]: c for c in snapshot.manifest["columns"]}
+    out: Dict[str, Column] = {}
+    for name, data in batch.items():
+        spec = specs[name]
+        shape = tuple(spec["shape"])
+        rows = len(data) // shape[0] if shape else len(data)
+        out[name] = Column(data, spec["dtype"], (rows, *shape))
+    return _finish(out, backend), next_cursor
@@ -0,0 +1,173 @@
+"""Memory-mapped JSONL dataset with a cached line-offset index.
+
+The index (``<data>.lineidx``) is a 32-byte header, magic ``GLYLIDX2``
+followed by the data file's size and ``st_mtime_ns`` and the row count
+(big-endian u64s), then one ``(start, end)`` u64 pair per non-blank line. A
+header that no longer matches the data file makes the index stale, and it is
+rebuilt. Rows are the non-blank lines as ``str.splitlines()`` splits them.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, List
+
+from src.glyphser.persistence.background_writer import atomic_write_bytes
+
+LINE_INDEX_MAGIC = b"GLYLIDX2"
+LINE_INDEX_SUFFIX = ".lineidx"
+
+# The line boundaries of str.splitlines(), UTF-8 encoded.
+_LINE_BREAKS = re.compile(
+    rb"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]"
+)
+_OTHER_BREAKS = re.compile(rb"[\r\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+
+_HEADER = struct.Struct(">8sQQQ")
+_ENTRY = struct.Struct(">QQ")
+
+
+def _map(path: Path) -> mmap.mmap | None:
+    with open(path, "rb") as f:
+        if not f.seek(0, os.SEEK_END):
+            return None  # empty files cannot be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _blank(line: bytes) -> bool:
+    stripped = line.strip()
+    return not stripped or (
+        not stripped.isascii() and not stripped.decode("utf-8").strip()
+    )
+
+
+def build_line_index(data: Any) -> bytearray:
+    """Return the ``(start, end)`` entries of the non-blank lines of ``data``.
+
+    Lines are split like ``str.splitlines()`` on the UTF-8 text, so ``\r\n``,
+    ``\r`` and the other Unicode line boundaries end a line too.
+    """
+    entries = bytearray()
+    n = len(data)
+    if _OTHER_BREAKS.search(data) is None:
+        pos = 0
+        while pos < n:
+            end = data.find(b"\n", pos)
+            if end < 0:
+                end = n
+            if not _blank(data[pos:end]):
+                entries += _ENTRY.pack(pos, end)
+            pos = end + 1
+        return entries
+    pos = 0
+    for match in _LINE_BREAKS.finditer(data):
+        if not _blank(data[pos : match.start()]):
+            entries += _ENTRY.pack(pos, match.start())
+        pos = match.end()
+    if pos < n and not _blank(data[pos:n]):
+        entries += _ENTRY.pack(pos, n)
+    return entries
+
+
+class JsonlDataset(Sequence):
+    """Read-only ``Sequence`` of the JSON rows of a JSONL file.
+
+    Blank lines are skipped. Rows are parsed on access only; slicing returns
+    a list of parsed rows. Opening is O(1) when a fresh index exists next to
+    the file (``cache_index=True`` writes one, if the directory is writable).
+
+    Pickling keeps only the path, so a dataset can be sent to spawned worker
+    processes; unpickling reopens the file and raises ``ValueError`` if it
+    changed in the meantime.
+    """
+
+    def __init__(self, path: Path, cache_index: bool = True) -> None:
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + LINE_INDEX_SUFFIX)
+        self.cache_index = cache_index
+        stat = os.stat(self.path)
+        self._stamp = (stat.st_size, stat.st_mtime_ns)
+        self._data = _map(self.path)
+        self._index: Any = None
+        self._len = 0
+        if cache_index and self._load_index(stat):
+            return
+        entries = (
+            build_line_index(self._data) if self._data is not None else bytearray()
+        )
+        count = len(entries) // _ENTRY.size
+        header = _HEADER.pack(LINE_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, count)
+        if cache_index:
+            try:
+                atomic_write_bytes(self.index_path, header + entries, fsync=False)
+            except OSError:
+                pass  # read-only location: keep the index in memory
+        self._index = memoryview(bytes(header + entries))
+        self._len = len(entries) // _ENTRY.size
+
+    def _load_index(self, stat: os.stat_result) -> bool:
+        try:
+            index = _map(self.index_path)
+        except OSError:
+            return False
+        if index is None or len(index) < _HEADER.size:
+            return False
+        magic, size, mtime_ns, count = _HEADER.unpack_from(index)
+        expected = (LINE_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns)
+        fresh = (magic, size, mtime_ns) == expected
+        if not fresh or len(index) != _HEADER.size + count * _ENTRY.size:
+            index.close()
+            return False
+        self._index = index
+        self._len = count
+        return True
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "cache_index": self.cache_index,
+            "stamp": self._stamp,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"], state["cache_index"])
+        if self._stamp != state["stamp"]:
+            self.close()
+            raise ValueError(f"dataset file changed since it was pickled: {self.path}")
+
+    def raw(self, i: int) -> bytes:
+        """Unparsed bytes of row ``i``."""
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("dataset index out of range")
+        start, end = _ENTRY.unpack_from(self._index, _HEADER.size + i * _ENTRY.size)
+        return self._data[start:end]
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [json.loads(self.raw(k)) for k in range(*i.indices(self._len))]
+        return json.loads(self.raw(i))
+
+    def rows(self, indices: Sequence[int]) -> List[Any]:
+        """Parsed rows at arbitrary ``indices`` (e.g. from ``next_batch_indices``)."""
+        return [json.loads(self.raw(i)) for i in indices]
+
+    def close(self) -> None:
+        for m in (self._data, self._index):
+            if isinstance(m, mmap.mmap):
+                m.close()
+
+    def __enter__(self) -> JsonlDataset:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -1,20 +1,342 @@
-"""Deterministic next-batch helper (minimal)."""
+"""Deterministic next-batch helpers (Data-NextBatch).
+
+``next_batch`` slices a rank's share of an in-memory sequence in order.
+``next_batch_indices``
+implements the spec's virtual global order over a dataset of cardinality
+``N``: sequential positions for eval/infer, and for train a seeded
+permutation of the full blocks (``seeded_block_permute``) composed with a
+seeded affine bijection inside each block (``seeded_intra_block_map``). Only
+the block order (O(num_blocks)) is ever materialized; a batch costs
+O(batch size) plus one Philox draw per block it touches.
+
+Philox binding: the 16-byte ``epoch_seed`` supplies the key (bytes 0-8, two
+big-endian uint32 words) and the two high counter words (bytes 8-16, the
+first XORed with a stream id); the low two counter words hold the 64-bit draw
+index (low word first). Stream 0 draws the block shuffle (index = Fisher-Yates
+step) and stream 1 the intra-block parameters (index = block id); a draw's
+64-bit values are ``w0 | w1 << 32`` and ``w2 | w3 << 32``.
+"""
 from __future__ import annotations
 
-from typing import Any, Sequence, Tuple
+import array
+import hashlib
+from functools import lru_cache
+from math import gcd
+from typing import Any, Dict, List, Sequence, Tuple
+
+from src.glyphser.data.philox import philox4x32_10, philox4x32_10_many
+from src.glyphser.serialization.canonical_cbor import encode_canonical
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+SAMPLING_MODE_SHUFFLE = "SHUFFLE_WITHOUT_REPLACEMENT_BLOCK_AFFINE_V1"
+SAMPLING_MODE_SEQUENTIAL = "SEQUENTIAL_V1"
+STAGE_TYPES = ("train", "eval", "infer")
+
+_STREAM_BLOCK_PERMUTE = 0
+_STREAM_INTRA_BLOCK = 1
+_MASK32 = 0xFFFFFFFF
 
 
-def next_batch(dataset: Sequence[Any], cursor: int, batch_size: int) -> Tuple[list[Any], int]:
+def _check_uint(name: str, value: int, bits: int = 64) -> int:
+    if value.__class__ is not int or not 0 <= value < 1 << bits:
+        raise ValueError(f"{name} must be a uint{bits}")
+    return value
+
+
+def _check_shard(global_batch_size: int, world_size: int, rank: int) -> int:
+    # Returns the per-rank micro-batch size (Data-NextBatch I.C).
+    _check_uint("world_size", world_size, 32)
+    _check_uint("rank", rank, 32)
+    if world_size == 0 or rank >= world_size:
+        raise ValueError("rank must be in [0, world_size)")
+    if global_batch_size % world_size:
+        raise ValueError(
+            "BATCH_SIZE_INCONSISTENT: global_batch_size must be divisible by world_size"
+        )
+    return global_batch_size // world_size
+
+
+def next_batch_cursor(
+    n: int, cursor: int, batch_size: int, drop_last: bool = False
+) -> int:
+    """Cursor ``next_batch`` returns for ``n`` rows, without reading the dataset."""
+    if n == 0:
+        return cursor
+    limit = n
+    if drop_last:
+        limit = n // batch_size * batch_size
+        if limit == 0:
+            raise ValueError("batch_size exceeds the dataset size with drop_last")
+    end = min(cursor + batch_size, limit)
+    return end if end < limit else 0
+
+
+def next_batch_range(
+    n: int,
+    cursor: int,
+    batch_size: int,
+    world_size: int = 1,
+    rank: int = 0,
+    drop_last: bool = False,
+) -> Tuple[int, int, int]:
+    """``(start, stop, next_cursor)`` of the rows ``next_batch`` returns."""
     if batch_size <= 0:
         raise ValueError("batch_size must be positive")
     if cursor < 0:
         raise ValueError("cursor must be non-negative")
+    _check_uint("batch_size", batch_size)
+    _check_uint("cursor", cursor)
+    micro = _check_shard(batch_size, world_size, rank)
+    next_cursor = next_batch_cursor(n, cursor, batch_size, drop_last)
+    if n == 0:
+        return 0, 0, cursor
+    limit = n // batch_size * batch_size if drop_last else n
+    start = min(cursor + rank * micro, limit)
+    return start, min(start + micro, limit), next_cursor
+
+
+def next_batch(
+    dataset: Sequence[Any],
+    cursor: int,
+    batch_size: int,
+    world_size: int = 1,
+    rank: int = 0,
+    drop_last: bool = False,
+) -> Tuple[list[Any], int]:
+    """Return ``rank``'s in-order shard of the next global batch of ``batch_size`` rows.
+
+    Rank ``r`` gets the contiguous slice ``[cursor + r * m, cursor + (r + 1) * m)``
+    with ``m = batch_size // world_size``, so concatenating the shards of all
+    ranks gives the same global batch for any ``world_size``. Only that slice
+    of ``dataset`` is read. The final batch of a pass is partial (some ranks
+    may get fewer or no rows) unless ``drop_last``, which ends the pass at the
+    last full global batch. The returned cursor is the same on every rank and
+    wraps to 0 at the end of a pass.
+    """
+    start, stop, next_cursor = next_batch_range(
+        len(dataset), cursor, batch_size, world_size, rank, drop_last
+    )
+    if start == stop:
+        return [], next_cursor
+    return list(dataset[start:stop]), next_cursor
+
+
+def derive_epoch_seed(
+    kernel_replay_token: Any, manifest_hash: Any, dataset_key: str, epoch: int
+) -> bytes:
+    """First 16 bytes of the SHA-256 of the canonical CBOR seed material.
+
+    The material is
+    ``["nextbatch_epoch_seed", [token, manifest_hash, dataset_key, epoch]]``.
+    """
+    material = [
+        "nextbatch_epoch_seed",
+        [kernel_replay_token, manifest_hash, dataset_key, epoch],
+    ]
+    return hashlib.sha256(encode_canonical(material)).digest()[:16]
 
-    n = len(dataset)
+
+def _seed_words(epoch_seed: bytes, stream: int) -> tuple[tuple[int, int], int, int]:
+    if not isinstance(epoch_seed, (bytes, bytearray)) or len(epoch_seed) != 16:
+        raise ValueError("epoch_seed must be 16 bytes")
+    w = [int.from_bytes(epoch_seed[i : i + 4], "big") for i in range(0, 16, 4)]
+    return (w[0], w[1]), w[2] ^ stream, w[3]
+
+
+def seeded_block_permute(num_blocks: int, epoch_seed: bytes) -> array.array:
+    """``Glyphser.Data.SeededBlockPermute``: Fisher-Yates over ``[0, num_blocks)``.
+
+    Step ``i`` (ascending) swaps position ``i`` with ``i + r_i mod (num_blocks - i)``,
+    ``r_i`` being the first 64-bit value of draw ``i`` on stream 0.
+    """
+    if num_blocks <= 0:
+        raise ValueError("num_blocks must be positive")
+    key, s2, s3 = _seed_words(epoch_seed, _STREAM_BLOCK_PERMUTE)
+    order = array.array("Q", range(num_blocks))
+    counters = ((i & _MASK32, i >> 32, s2, s3) for i in range(num_blocks - 1))
+    for i, (w0, w1, _, _) in enumerate(philox4x32_10_many(counters, key)):
+        j = i + (w0 | w1 << 32) % (num_blocks - i)
+        order[i], order[j] = order[j], order[i]
+    return order
+
+
+def _intra_block_params(
+    block_id: int, block_size: int, epoch_seed: bytes, n: int
+) -> tuple[int, int, int, int]:
+    # (block_start, m, a, c) of the affine map j = (a * local_pos + c) mod m.
+    block_start = block_id * block_size
+    if block_size <= 0 or block_start >= n:
+        raise ValueError("block_id out of range")
+    m = min(block_size, n - block_start)
+    if m == 1:
+        return block_start, 1, 1, 0
+    key, s2, s3 = _seed_words(epoch_seed, _STREAM_INTRA_BLOCK)
+    w0, w1, w2, w3 = philox4x32_10((block_id & _MASK32, block_id >> 32, s2, s3), key)
+    k0, k1 = w0 | w1 << 32, w2 | w3 << 32
+    a = 1 + k0 % (m - 1)
+    for i in range(m - 1):
+        cand = 1 + (a - 1 + i) % (m - 1)
+        if gcd(cand, m) == 1:
+            return block_start, m, cand, k1 % m
+    raise ValueError("CONTRACT_VIOLATION: no multiplier coprime to block length")
+
+
+def seeded_intra_block_map(
+    block_id: int, local_pos: int, block_size: int, epoch_seed: bytes, n: int
+) -> int:
+    """``Glyphser.Data.SeededIntraBlockMap``: source of ``local_pos`` in a block."""
+    block_start, m, a, c = _intra_block_params(block_id, block_size, epoch_seed, n)
+    if not 0 <= local_pos < m:
+        raise ValueError("local_pos out of range")
+    return block_start + (a * local_pos + c) % m
+
+
+# Per-epoch state is small (block order, per-block affine parameters) and reused
+# by every batch of the epoch, so it is memoized rather than recomputed per call.
+_block_order = lru_cache(maxsize=4)(seeded_block_permute)
+_cached_intra_block_params = lru_cache(maxsize=4096)(_intra_block_params)
+_cached_epoch_seed = lru_cache(maxsize=16)(derive_epoch_seed)
+
+
+def virtual_order_indices(
+    start: int, count: int, n: int, epoch_seed: bytes, block_size: int
+) -> List[int]:
+    """Original indices of train positions ``[start, start + count)`` of an epoch.
+
+    Full blocks are visited in ``seeded_block_permute`` order; a short tail
+    block stays last. Consecutive positions within a block share one set of
+    affine parameters.
+    """
+    if block_size <= 0:
+        raise ValueError("sampler_block_size must be positive")
+    if start < 0 or count < 0 or start + count > n:
+        raise ValueError(
+            "GLOBAL_POSITION_EXCEEDS_CARDINALITY: positions outside the epoch"
+        )
+    num_full = n // block_size
+    order = _block_order(num_full, bytes(epoch_seed)) if num_full else ()
+    out: List[int] = []
+    p, end = start, start + count
+    while p < end:
+        block = p // block_size
+        local = p - block * block_size
+        run = min(end, (block + 1) * block_size) - p
+        perm = order[block] if block < num_full else block
+        block_start, m, a, c = _cached_intra_block_params(
+            perm, block_size, bytes(epoch_seed), n
+        )
+        out.extend(block_start + (a * q + c) % m for q in range(local, local + run))
+        p += run
+    return out
+
+
+def sampler_config_hash(
+    sampling_mode: str, sampler_block_size: int, drop_last: bool
+) -> bytes:
+    material = [
+        sampling_mode,
+        [
+            sampler_block_size,
+            drop_last,
+            "epoch_seed_rule",
+            "intra_block_affine_coprime",
+            "rank_contiguous_shard",
+        ],
+    ]
+    return hashlib.sha256(encode_canonical(material)).digest()
+
+
+def next_batch_indices(
+    n: int,
+    cursor: Dict[str, int],
+    global_batch_size: int,
+    *,
+    kernel_replay_token: Any,
+    manifest_hash: Any,
+    dataset_key: str,
+    world_size: int = 1,
+    rank: int = 0,
+    stage_type: str = "train",
+    drop_last: bool = False,
+    sampler_block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Tuple[List[int], Dict[str, int], Dict[str, Any]]:
+    """``Glyphser.Data.NextBatch`` for ``rank``'s micro-batch of one global batch.
+
+    ``cursor`` is ``{"epoch", "global_index"}``, shared by all ranks; returns
+    the rank's original sample indices (its contiguous slice of the global
+    batch, which does not depend on ``world_size``), the next cursor and the
+    sampling metadata. Train batches never wrap within an epoch: the last one
+    is partial, or dropped with ``drop_last``. Eval/infer ignore ``drop_last``
+    and are sequential modulo ``n``. All arithmetic is bounds-checked uint64.
+    """
+    if stage_type not in STAGE_TYPES:
+        raise ValueError(f"INVALID_STAGE_TYPE: {stage_type!r}")
+    _check_uint("n", n)
+    _check_uint("global_batch_size", global_batch_size)
+    _check_uint("sampler_block_size", sampler_block_size)
+    epoch = _check_uint("cursor.epoch", cursor["epoch"])
+    global_pos = _check_uint("cursor.global_index", cursor["global_index"])
     if n == 0:
-        return [], cursor
+        raise ValueError("CARDINALITY_MISMATCH: dataset cardinality must be positive")
+    if global_batch_size == 0:
+        raise ValueError("BATCH_SIZE_INCONSISTENT: global_batch_size must be positive")
+    if sampler_block_size == 0:
+        raise ValueError("BATCH_SIZE_INCONSISTENT: sampler_block_size must be positive")
+    micro = _check_shard(global_batch_size, world_size, rank)
+    train = stage_type == "train"
+    drop_last = bool(drop_last) and train
+    limit = n // global_batch_size * global_batch_size if drop_last else n
+    if limit == 0:
+        raise ValueError(
+            "BATCH_SIZE_INCONSISTENT: "
+            "global_batch_size exceeds cardinality with drop_last"
+        )
+    if global_pos >= limit:
+        raise ValueError(
+            "GLOBAL_POSITION_EXCEEDS_CARDINALITY: cursor is past the epoch"
+        )
+    start = global_pos + rank * micro
+
+    if train:
+        produced = min(global_batch_size, limit - global_pos)
+        count = max(0, min(micro, limit - start))
+        indices: List[int] = []
+        blocks = 0
+        if count:
+            seed = _cached_epoch_seed(
+                kernel_replay_token, manifest_hash, dataset_key, epoch
+            )
+            indices = virtual_order_indices(start, count, n, seed, sampler_block_size)
+            first_block = start // sampler_block_size
+            blocks = (start + count - 1) // sampler_block_size - first_block + 1
+        mode = SAMPLING_MODE_SHUFFLE
+    else:
+        produced = global_batch_size
+        indices = [(start + i) % n for i in range(micro)]
+        mode = SAMPLING_MODE_SEQUENTIAL
+        blocks = 0
 
-    end = min(cursor + batch_size, n)
-    batch = list(dataset[cursor:end])
-    next_cursor = end if end < n else 0
-    return batch, next_cursor
+    next_index = global_pos + produced
+    cursor_next = {"epoch": epoch, "global_index": next_index}
+    if next_index >= limit:
+        cursor_next = {
+            "epoch": _check_uint("cursor.epoch", epoch + 1),
+            "global_index": 0,
+        }
+    metadata = {
+        "epoch": epoch,
+        "global_position": global_pos,
+        "world_size": world_size,
+        "rank": rank,
+        "micro_batch_size": micro,
+        "global_batch_size": global_batch_size,
+        "is_shuffled": train,
+        "effective_batch_size": global_batch_size,
+        "blocks_materialized": blocks,
+        "subsampling_mode": "SHUFFLE_WITHOUT_REPLACEMENT" if train else "NONE",
+        "sampling_mode": mode,
+        "effective_q": float(global_batch_size) / float(n),
+        "sampler_block_size": sampler_block_size,
+        "sampler_config_hash": sampler_config_hash(mode, sampler_block_size, drop_last),
+    }
+    return indices, cursor_next, metadata
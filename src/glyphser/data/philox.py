@@ -0,0 +1,65 @@
+"""Philox4x32-10 counter-based generator (Salmon et al., SC'11; Random123).
+
+Only the bijection ``(counter, key) -> 4 x uint32`` is provided: callers pick
+the counter, so any draw can be recomputed independently of the others.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Sequence
+
+PHILOX_M0 = 0xD2511F53
+PHILOX_M1 = 0xCD9E8D57
+PHILOX_W0 = 0x9E3779B9
+PHILOX_W1 = 0xBB67AE85
+PHILOX_ROUNDS = 10
+_MASK32 = 0xFFFFFFFF
+
+
+def philox4x32_10(
+    counter: Sequence[int], key: Sequence[int]
+) -> tuple[int, int, int, int]:
+    """Return the four output words for a 4 x uint32 counter and 2 x uint32 key."""
+    c0, c1, c2, c3 = counter
+    k0, k1 = key
+    if not all(0 <= w <= _MASK32 for w in (c0, c1, c2, c3, k0, k1)):
+        raise ValueError("Philox counter and key words must be uint32")
+    for r in range(PHILOX_ROUNDS):
+        if r:
+            k0 = (k0 + PHILOX_W0) & _MASK32
+            k1 = (k1 + PHILOX_W1) & _MASK32
+        p0 = PHILOX_M0 * c0
+        p1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = (
+            (p1 >> 32) ^ c1 ^ k0,
+            p1 & _MASK32,
+            (p0 >> 32) ^ c3 ^ k1,
+            p0 & _MASK32,
+        )
+    return c0, c1, c2, c3
+
+
+def philox4x32_10_many(
+    counters: Iterable[Sequence[int]], key: Sequence[int]
+) -> Iterator[tuple[int, int, int, int]]:
+    """Yield ``philox4x32_10(counter, key)`` per counter, computing round keys once."""
+    k0, k1 = key
+    if not (0 <= k0 <= _MASK32 and 0 <= k1 <= _MASK32):
+        raise ValueError("Philox counter and key words must be uint32")
+    schedule = [
+        ((k0 + r * PHILOX_W0) & _MASK32, (k1 + r * PHILOX_W1) & _MASK32)
+        for r in range(PHILOX_ROUNDS)
+    ]
+    m0, m1, mask = PHILOX_M0, PHILOX_M1, _MASK32
+    for c0, c1, c2, c3 in counters:
+        if (c0 | c1 | c2 | c3) >> 32 or min(c0, c1, c2, c3) < 0:
+            raise ValueError("Philox counter and key words must be uint32")
+        for rk0, rk1 in schedule:
+            p0 = m0 * c0
+            p1 = m1 * c2
+            c0, c1, c2, c3 = (
+                (p1 >> 32) ^ c1 ^ rk0,
+                p1 & mask,
+                (p0 >> 32) ^ c3 ^ rk1,
+                p0 & mask,
+            )
+        yield c0, c1, c2, c3
@@ -0,0 +1,143 @@
+"""Prefetching batch pipeline around ``next_batch``."""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterator, Sequence
+
+from src.glyphser.data.next_batch import next_batch, next_batch_cursor
+
+_WORKER_DATASET: Sequence[Any] | None = None
+
+
+def _init_worker(dataset: Sequence[Any]) -> None:
+    # Process workers receive the dataset once instead of with every job.
+    global _WORKER_DATASET
+    _WORKER_DATASET = dataset
+
+
+def _load_batch(
+    dataset: Sequence[Any] | None,
+    cursor: int,
+    batch_size: int,
+    world_size: int,
+    rank: int,
+    drop_last: bool,
+    decode: Callable[[Any], Any] | None,
+    collate: Callable[[list[Any]], Any] | None,
+) -> Any:
+    if dataset is None:
+        dataset = _WORKER_DATASET
+    rows, _ = next_batch(dataset, cursor, batch_size, world_size, rank, drop_last)
+    if decode is not None:
+        rows = [decode(row) for row in rows]
+    return rows if collate is None else collate(rows)
+
+
+class BatchPipeline:
+    """Iterator over the batches ``next_batch`` produces, loaded ahead of time.
+
+    Up to ``prefetch`` batches are loaded, decoded (``decode`` per row) and
+    collated (``collate`` per batch) concurrently on ``workers`` threads, or
+    processes with ``use_processes=True``. Process workers receive the dataset
+    once, pickled unless the start method (``mp_context``, default for the
+    platform) is fork; ``JsonlDataset`` and ``SnapshotDataset`` pickle as their
+    paths and reopen in the worker. ``decode``/``collate`` must be picklable
+    too. The cursor sequence is computed up front on the calling thread
+    with ``next_batch_cursor``, so each job's cursor is known before any
+    earlier job finishes, and batches are delivered strictly in that order:
+    the output is identical to calling ``next_batch`` serially. Iteration is
+    endless, like the cursor, which wraps at the end of a pass.
+
+    ``cursor`` is the position of the next batch to be delivered; save it and
+    pass it back as ``cursor`` (or to ``seek``) to resume. A worker error is
+    raised when its batch would have been delivered, and the cursor stays on
+    that batch.
+    """
+
+    def __init__(
+        self,
+        dataset: Sequence[Any],
+        batch_size: int,
+        cursor: int = 0,
+        *,
+        world_size: int = 1,
+        rank: int = 0,
+        drop_last: bool = False,
+        decode: Callable[[Any], Any] | None = None,
+        collate: Callable[[list[Any]], Any] | None = None,
+        prefetch: int = 2,
+        workers: int = 1,
+        use_processes: bool = False,
+        mp_context: Any = None,
+    ) -> None:
+        if prefetch < 1 or workers < 1:
+            raise ValueError("prefetch and workers must be positive")
+        next_batch((), cursor, batch_size, world_size, rank)  # validate arguments
+        self._n = len(dataset)
+        self._args = (batch_size, world_size, rank, drop_last, decode, collate)
+        self.prefetch = prefetch
+        self._executor: Executor
+        if use_processes:
+            self._executor = ProcessPoolExecutor(
+                workers, mp_context, initializer=_init_worker, initargs=(dataset,)
+            )
+            self._dataset: Sequence[Any] | None = None
+        else:
+            self._executor = ThreadPoolExecutor(
+                workers, thread_name_prefix="glyphser-batch"
+            )
+            self._dataset = dataset
+        self._pending: Deque[tuple[int, Future]] = deque()
+        self._cursor = cursor
+        self._next_submit = cursor
+
+    @property
+    def cursor(self) -> int:
+        return self._cursor
+
+    def _fill(self) -> None:
+        batch_size, _, _, drop_last, _, _ = self._args
+        submit = self._executor.submit
+        while len(self._pending) < self.prefetch:
+            cursor = self._next_submit
+            future = submit(_load_batch, self._dataset, cursor, *self._args)
+            self._next_submit = next_batch_cursor(
+                self._n, cursor, batch_size, drop_last
+            )
+            self._pending.append((self._next_submit, future))
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        self._fill()
+        cursor_after, future = self._pending.popleft()
+        try:
+            batch = future.result()
+        except BaseException:
+            self.seek(self._cursor)  # a retry reloads the failed batch
+            raise
+        self._cursor = cursor_after
+        self._fill()
+        return batch
+
+    def seek(self, cursor: int) -> None:
+        """Drop prefetched batches and continue from ``cursor``."""
+        next_batch((), cursor, self._args[0])  # validate the cursor
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._cursor = self._next_submit = cursor
+
+    def close(self) -> None:
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> BatchPipeline:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,387 @@
+"""Columnar binary dataset snapshots (Data.BuildSnapshot / Data.ValidateSnapshot).
+
+A snapshot directory holds one file per column plus ``snapshot_manifest.cbor``:
+
+- fixed-width columns (every row has a bool, an int64, a float64, or a list of
+  the same length of int64/float64) are contiguous little-endian buffers of
+  ``row_count * width`` elements;
+- any other column is a variable column: the canonical CBOR encoding of each
+  row's value concatenated, plus an offsets file of ``row_count + 1``
+  little-endian u64s. A row without the key has an empty entry.
+
+The manifest records the row count, the source file's SHA-256 and size, and
+each column's dtype, shape, files, sizes and SHA-256. It is written last, and
+``snapshot_hash = SHA-256(manifest bytes)`` identifies the snapshot, so
+``validate_snapshot`` works from the snapshot alone.
+"""
+from __future__ import annotations
+
+import array
+import hashlib
+import mmap
+import os
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from src.glyphser.data.jsonl_dataset import JsonlDataset
+from src.glyphser.data.next_batch import next_batch_range
+from src.glyphser.persistence.background_writer import atomic_write_bytes
+from src.glyphser.serialization.canonical_cbor import encode_canonical
+from src.glyphser.serialization.canonical_cbor_decode import decode_canonical
+
+SNAPSHOT_MANIFEST_NAME = "snapshot_manifest.cbor"
+SNAPSHOT_VERSION = "1"
+# dtype -> array typecode; buffers are little-endian on disk.
+SNAPSHOT_DTYPES = {"bool": "B", "int64": "q", "float64": "d"}
+
+_INT64_RANGE = range(-(1 << 63), 1 << 63)
+_MISSING = object()
+
+
+def _scalar_dtype(value: Any) -> str | None:
+    if value.__class__ is bool:
+        return "bool"
+    if value.__class__ is int and value in _INT64_RANGE:
+        return "int64"
+    if value.__class__ is float:
+        return "float64"
+    return None
+
+
+def _value_layout(value: Any) -> Tuple[str, Tuple[int, ...]] | None:
+    # Fixed-width (dtype, shape) of a single value, or None if variable.
+    dtype = _scalar_dtype(value)
+    if dtype is not None:
+        return dtype, ()
+    if value.__class__ is list and value:
+        dtypes = {_scalar_dtype(v) for v in value}
+        if len(dtypes) == 1 and dtypes <= {"int64", "float64"}:
+            return dtypes.pop(), (len(value),)
+    return None
+
+
+def infer_schema(
+    rows: Iterable[Dict[str, Any]],
+) -> List[Tuple[str, str, Tuple[int, ...]]]:
+    """``(name, dtype, shape)`` per column in first-seen key order.
+
+    Columns missing from some rows, or whose values vary in type or shape,
+    get dtype ``"cbor"``.
+    """
+    layouts: Dict[str, Any] = {}
+    count = 0
+    for row in rows:
+        if not isinstance(row, dict):
+            raise ValueError("snapshot rows must be JSON objects")
+        for name in layouts:
+            if name not in row:
+                layouts[name] = None
+        for name, value in row.items():
+            if name not in layouts:
+                layouts[name] = _value_layout(value) if count == 0 else None
+            elif layouts[name] is not None and _value_layout(value) != layouts[name]:
+                layouts[name] = None
+        count += 1
+    return [(name, *(layout or ("cbor", ()))) for name, layout in layouts.items()]
+
+
+class _ColumnWriter:
+    def __init__(self, directory: Path, index: int, dtype: str) -> None:
+        self.dtype = dtype
+        self.rel_path = f"columns/c{index}.bin"
+        self.tmp = directory / f"columns/.c{index}.bin.tmp"
+        self.file = open(self.tmp, "wb")
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.offsets = array.array("Q", [0]) if dtype == "cbor" else None
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.hasher.update(data)
+        self.size += len(data)
+
+    def append(self, value: Any) -> None:
+        if self.offsets is not None:
+            if value is not _MISSING:
+                self.write(encode_canonical(value))
+            self.offsets.append(self.size)
+            return
+        values = array.array(
+            SNAPSHOT_DTYPES[self.dtype], value if isinstance(value, list) else [value]
+        )
+        if sys.byteorder == "big" and values.itemsize > 1:
+            values.byteswap()
+        self.write(values.tobytes())
+
+
+def build_snapshot(source: Path, directory: Path, fsync: bool = True) -> str:
+    """Convert the JSONL file ``source`` into a columnar snapshot in ``directory``.
+
+    Two streaming passes over ``source`` (schema inference, then column
+    writes); returns the snapshot hash (hex).
+    """
+    source = Path(source)
+    directory = Path(directory)
+    (directory / "columns").mkdir(parents=True, exist_ok=True)
+    with JsonlDataset(source, cache_index=False) as rows:
+        schema = infer_schema(rows)
+        writers = [
+            _ColumnWriter(directory, i, dtype) for i, (_, dtype, _) in enumerate(schema)
+        ]
+        try:
+            for row in rows:
+                for (name, _, _), writer in zip(schema, writers):
+                    writer.append(row.get(name, _MISSING))
+        except BaseException:
+            for writer in writers:
+                writer.file.close()
+                os.unlink(writer.tmp)
+            raise
+        for writer in writers:
+            writer.file.close()
+        row_count = len(rows)
+    source_sha256, source_size = _file_sha256(source)
+    columns = []
+    for (name, dtype, shape), writer in zip(schema, writers):
+        if fsync:
+            with open(writer.tmp, "rb") as f:
+                os.fsync(f.fileno())
+        os.replace(writer.tmp, directory / writer.rel_path)
+        column: Dict[str, Any] = {
+            "name": name,
+            "dtype": dtype,
+            "shape": list(shape),
+            "path": writer.rel_path,
+            "sha256": writer.hasher.digest(),
+            "size_bytes": writer.size,
+        }
+        if writer.offsets is not None:
+            offsets = writer.offsets
+            if sys.byteorder == "big":
+                offsets.byteswap()
+            data = offsets.tobytes()
+            column["offsets_path"] = writer.rel_path[:-4] + ".off"
+            column["offsets_sha256"] = hashlib.sha256(data).digest()
+            atomic_write_bytes(directory / column["offsets_path"], data, fsync=fsync)
+        columns.append(column)
+    manifest = {
+        "snapshot_version": SNAPSHOT_VERSION,
+        "row_count": row_count,
+        "source": {
+            "name": source.name,
+            "sha256": source_sha256,
+            "size_bytes": source_size,
+        },
+        "columns": columns,
+    }
+    manifest_bytes = encode_canonical(manifest)
+    atomic_write_bytes(directory / SNAPSHOT_MANIFEST_NAME, manifest_bytes, fsync=fsync)
+    return hashlib.sha256(manifest_bytes).hexdigest()
+
+
+def _file_sha256(path: Path) -> tuple[bytes, int]:
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+            size += len(block)
+    return hasher.digest(), size
+
+
+def validate_snapshot(
+    directory: Path, expected_hash: str | None = None, deep: bool = True
+) -> str:
+    """Check a snapshot against its manifest (and ``expected_hash``); returns the hash.
+
+    Column file sizes are always checked against the row count and schema;
+    ``deep`` also re-hashes every column file. Raises ``ValueError``.
+    """
+    directory = Path(directory)
+    manifest_bytes = (directory / SNAPSHOT_MANIFEST_NAME).read_bytes()
+    snapshot_hash = hashlib.sha256(manifest_bytes).hexdigest()
+    if expected_hash is not None and snapshot_hash != expected_hash:
+        raise ValueError("snapshot hash mismatch")
+    manifest = decode_canonical(manifest_bytes)
+    if manifest.get("snapshot_version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"unsupported snapshot_version: {manifest.get('snapshot_version')!r}"
+        )
+    n = manifest["row_count"]
+    for column in manifest["columns"]:
+        files = [(column["path"], column["sha256"], column["size_bytes"])]
+        dtype = column["dtype"]
+        if dtype == "cbor":
+            files.append(
+                (column["offsets_path"], column["offsets_sha256"], 8 * (n + 1))
+            )
+        elif dtype in SNAPSHOT_DTYPES:
+            width = 1
+            for dim in column["shape"]:
+                width *= dim
+            itemsize = array.array(SNAPSHOT_DTYPES[dtype]).itemsize
+            if column["size_bytes"] != n * width * itemsize:
+                raise ValueError(
+                    f"column size does not match row_count: {column['name']}"
+                )
+        else:
+            raise ValueError(f"unknown column dtype: {dtype!r}")
+        for rel_path, digest, size in files:
+            path = directory / rel_path
+            if deep:
+                actual = _file_sha256(path)
+                if actual != (digest, size):
+                    raise ValueError(f"snapshot file mismatch: {rel_path}")
+            elif path.stat().st_size != size:
+                raise ValueError(f"snapshot file size mismatch: {rel_path}")
+    return snapshot_hash
+
+
+def _map(path: Path) -> Any:
+    with open(path, "rb") as f:
+        if not f.seek(0, os.SEEK_END):
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SnapshotDataset(Sequence):
+    """Memory-mapped reader of a columnar snapshot.
+
+    As a ``Sequence`` it yields the original row dicts, so it can be passed to
+    ``next_batch`` directly. ``column_slice`` and ``next_column_batch`` hand
+    out column data instead: fixed-width columns as zero-copy ``memoryview``
+    slices of the mapped buffers (copied arrays on big-endian hosts), variable
+    columns as lists of decoded values.
+
+    Pickling keeps only the directory and snapshot hash; unpickling (e.g. in a
+    spawned worker process) maps the files again and checks the hash.
+    """
+
+    def __init__(
+        self, directory: Path, expected_hash: str | None = None, deep: bool = False
+    ) -> None:
+        self.directory = Path(directory)
+        self.snapshot_hash = validate_snapshot(self.directory, expected_hash, deep=deep)
+        self.manifest = decode_canonical(
+            (self.directory / SNAPSHOT_MANIFEST_NAME).read_bytes()
+        )
+        self._len = self.manifest["row_count"]
+        self._columns: Dict[str, Dict[str, Any]] = {}
+        self._maps: List[Any] = []
+        for column in self.manifest["columns"]:
+            info = dict(column)
+            info["data"] = self._open(column["path"])
+            if column["dtype"] == "cbor":
+                info["offsets"] = self._native(self._open(column["offsets_path"]), "Q")
+            else:
+                info["width"] = column["shape"][0] if column["shape"] else 1
+            self._columns[column["name"]] = info
+
+    def _open(self, rel_path: str) -> Any:
+        mm = _map(self.directory / rel_path)
+        self._maps.append(mm)
+        return mm
+
+    @staticmethod
+    def _native(buf: Any, code: str) -> Any:
+        if sys.byteorder == "little":
+            return memoryview(buf).cast(code)
+        values = array.array(code, bytes(buf))
+        values.byteswap()
+        return values
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "snapshot_hash": self.snapshot_hash}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["directory"], state["snapshot_hash"])
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def column_slice(self, name: str, start: int, stop: int) -> Any:
+        """Values of column ``name`` for rows ``[start, stop)``.
+
+        Fixed-width columns return a flat buffer of ``(stop - start) * width``
+        elements (row-major for list columns).
+        """
+        info = self._columns[name]
+        start, stop, _ = slice(start, stop).indices(self._len)
+        stop = max(start, stop)
+        if info["dtype"] == "cbor":
+            data, offsets = info["data"], info["offsets"]
+            return [
+                decode_canonical(data[offsets[i] : offsets[i + 1]])
+                if offsets[i + 1] > offsets[i]
+                else None
+                for i in range(start, stop)
+            ]
+        code = SNAPSHOT_DTYPES[info["dtype"]]
+        itemsize = array.array(code).itemsize
+        step = info["width"] * itemsize
+        return self._native(memoryview(info["data"])[start * step : stop * step], code)
+
+    def next_column_batch(
+        self,
+        cursor: int,
+        batch_size: int,
+        world_size: int = 1,
+        rank: int = 0,
+        drop_last: bool = False,
+        columns: Iterable[str] | None = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """Columnar ``next_batch``: same rows and cursor, as ``{name: slice}``."""
+        start, stop, next_cursor = next_batch_range(
+            self._len, cursor, batch_size, world_size, rank, drop_last
+        )
+        names = self.column_names if columns is None else list(columns)
+        batch = {name: self.column_slice(name, start, stop) for name in names}
+        return batch, next_cursor
+
+    def _row(self, i: int) -> Dict[str, Any]:
+        row: Dict[str, Any] = {}
+        for name, info in self._columns.items():
+            if info["dtype"] == "cbor":
+                offsets = info["offsets"]
+                if offsets[i + 1] > offsets[i]:
+                    row[name] = decode_canonical(
+                        info["data"][offsets[i] : offsets[i + 1]]
+                    )
+                continue
+            values = self.column_slice(name, i, i + 1)
+            if info["dtype"] == "bool":
+                values = [bool(v) for v in values]
+            row[name] = list(values) if info["shape"] else values[0]
+        return row
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [self._row(k) for k in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("snapshot index out of range")
+        return self._row(i)
+
+    def close(self) -> None:
+        self._columns.clear()
+        for mm in self._maps:
+            if isinstance(mm, mmap.mmap):
+                try:
+                    mm.close()
+                except BufferError:
+                    pass  # a returned column slice still references it
+        self._maps.clear()
+
+    def __enter__(self) -> SnapshotDataset:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
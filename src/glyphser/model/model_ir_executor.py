@@ -1,12 +1,385 @@
-"""Minimal deterministic model IR executor (stub)."""
+"""Deterministic ModelIR executor (forward/inference).
+
+``execute_ir`` runs a node-graph IR (``ModelIR-Executor.md``): ``nodes`` is a
+list of ``{"node_id", "instr", "inputs", "params"}`` maps. Nodes are ordered
+by ``topo_sort_nodes`` (Kahn's algorithm, lowest ``node_id`` first among
+ready nodes) and dispatched one at a time by ``dispatch_primitive``; an
+intermediate tensor is released after its last consumer runs.
+
+Two kernel sets implement the primitives. The NumPy kernels operate on
+float64 arrays and are used when NumPy is installed (``backend="auto"``); the
+pure-Python kernels operate on nested lists, reduce with ``math.fsum`` and
+need no dependencies. Both use the same formulas, so results agree to within
+rounding (matmul summation order is left to BLAS on the NumPy side).
+
+IRs without ``nodes`` (the hello-core ``operators`` form) keep the original
+placeholder semantics of ``execute``: optional top-level scalar ``scale`` and
+``bias`` applied elementwise.
+"""
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import functools
+import heapq
+import importlib
+import math
+from typing import Any, Callable, Dict, List, Mapping
+
+INSTR_INPUT = "INPUT"
+INSTR_OUTPUT = "OUTPUT"
+
+
+def _fail(code: str, node_id: Any, message: str) -> ValueError:
+    return ValueError(f"{code}: node {node_id!r}: {message}")
+
+
+def topo_sort_nodes(ir: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """``Glyphser.Model.TopoSortNodes``: nodes in deterministic topological order.
+
+    Raises ``ValueError`` with ``INVALID_IR`` for duplicate ids or dangling
+    inputs and ``CYCLE_DETECTED`` if the graph is not a DAG.
+    """
+    nodes = ir.get("nodes")
+    if not isinstance(nodes, list):
+        raise ValueError("INVALID_IR: 'nodes' must be a list")
+    by_id: Dict[Any, Dict[str, Any]] = {}
+    for node in nodes:
+        if (
+            not isinstance(node, dict)
+            or "node_id" not in node
+            or not isinstance(node.get("instr"), str)
+        ):
+            raise ValueError("INVALID_IR: every node needs a node_id and an instr")
+        if node["node_id"] in by_id:
+            raise _fail("INVALID_IR", node["node_id"], "duplicate node_id")
+        by_id[node["node_id"]] = node
+    if len({type(node_id) for node_id in by_id}) > 1:
+        raise ValueError("INVALID_IR: node ids must all be of one type")
+    indegree = dict.fromkeys(by_id, 0)
+    consumers: Dict[Any, List[Any]] = {node_id: [] for node_id in by_id}
+    for node_id, node in by_id.items():
+        for src in node.get("inputs", []):
+            if src not in by_id:
+                raise _fail("INVALID_IR", node_id, f"unknown input {src!r}")
+            indegree[node_id] += 1
+            consumers[src].append(node_id)
+    ready = [node_id for node_id, d in indegree.items() if d == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        node_id = heapq.heappop(ready)
+        order.append(by_id[node_id])
+        for dst in consumers[node_id]:
+            indegree[dst] -= 1
+            if indegree[dst] == 0:
+                heapq.heappush(ready, dst)
+    if len(order) != len(by_id):
+        stuck = min(node_id for node_id, d in indegree.items() if d)
+        raise _fail("CYCLE_DETECTED", stuck, "graph has a cycle")
+    return order
+
+
+# -- pure-Python kernels (nested lists of floats) --------------------------------
+
+
+def _depth(x: Any) -> int:
+    d = 0
+    while isinstance(x, list):
+        d += 1
+        x = x[0] if x else 0.0
+    return d
+
+
+def _py_tensor(x: Any) -> Any:
+    if isinstance(x, (list, tuple)) or hasattr(x, "tolist"):
+        x = x.tolist() if hasattr(x, "tolist") else x
+        return [_py_tensor(v) for v in x]
+    return float(x)
+
+
+def _py_map(f: Callable[[float], float], x: Any) -> Any:
+    if isinstance(x, list):
+        return [_py_map(f, v) for v in x]
+    return f(x)
+
+
+def _py_broadcast(f: Callable[[float, float], float], a: Any, b: Any) -> Any:
+    da, db = _depth(a), _depth(b)
+    if da > db:
+        return [_py_broadcast(f, v, b) for v in a]
+    if db > da:
+        return [_py_broadcast(f, a, v) for v in b]
+    if da == 0:
+        return f(a, b)
+    if len(a) == len(b):
+        return [_py_broadcast(f, x, y) for x, y in zip(a, b)]
+    if len(a) == 1:
+        return [_py_broadcast(f, a[0], y) for y in b]
+    if len(b) == 1:
+        return [_py_broadcast(f, x, b[0]) for x in a]
+    raise ValueError(f"cannot broadcast lengths {len(a)} and {len(b)}")
+
+
+def _py_matmul(a: Any, b: Any) -> Any:
+    da, db = _depth(a), _depth(b)
+    if not (1 <= da <= 2 and 1 <= db <= 2):
+        raise ValueError("matmul operands must be 1-D or 2-D")
+    rows = [a] if da == 1 else a
+    cols = [b] if db == 1 else [list(c) for c in zip(*b)]
+    inner = len(b)
+    if any(len(r) != inner for r in rows):
+        raise ValueError(f"inner dimensions differ: {len(rows[0])} vs {inner}")
+    out = [[math.fsum(x * y for x, y in zip(r, c)) for c in cols] for r in rows]
+    if db == 1:
+        out = [row[0] for row in out]
+    return out[0] if da == 1 else out
+
+
+def _py_reduce(x: Any, axis: int, f: Callable[[List[float]], float]) -> Any:
+    if axis == 0:
+        if _depth(x) == 1:
+            return f(x)
+        return [_py_reduce(list(col), 0, f) for col in zip(*x)]
+    return [_py_reduce(v, axis - 1, f) for v in x]
+
+
+def _py_reduction(
+    f: Callable[[List[float]], float], empty_ok: bool = False
+) -> Callable[[Any, Mapping[str, Any]], Any]:
+    def reduce_values(values: List[float]) -> float:
+        if not values and not empty_ok:
+            raise ValueError("reduction over an empty axis")
+        return f(values)
+
+    def kernel(x: Any, params: Mapping[str, Any]) -> Any:
+        axis = params.get("axis")
+        if axis is None:
+            flat: List[float] = []
+
+            def walk(v: Any) -> None:
+                if isinstance(v, list):
+                    for w in v:
+                        walk(w)
+                else:
+                    flat.append(v)
+
+            walk(x)
+            return reduce_values(flat)
+        ndim = _depth(x)
+        if not -ndim <= axis < ndim:
+            raise ValueError(f"axis {axis} out of range for {ndim}-D tensor")
+        return _py_reduce(x, axis % ndim, reduce_values)
+
+    return kernel
+
+
+def _py_softmax(x: Any, params: Mapping[str, Any]) -> Any:
+    if _depth(x) > 1:
+        return [_py_softmax(v, params) for v in x]
+    m = max(x)
+    e = [math.exp(v - m) for v in x]
+    s = math.fsum(e)
+    return [v / s for v in e]
+
+
+def _sigmoid(v: float) -> float:
+    return 0.5 * (1.0 + math.tanh(0.5 * v))
+
+
+def _py_gelu(v: float) -> float:
+    return 0.5 * v * (1.0 + math.erf(v / math.sqrt(2.0)))
+
+
+_PY_KERNELS: Dict[str, Callable[..., Any]] = {
+    "MATMUL": lambda a, b, p: _py_matmul(a, b),
+    "ADD": lambda a, b, p: _py_broadcast(lambda x, y: x + y, a, b),
+    "SUB": lambda a, b, p: _py_broadcast(lambda x, y: x - y, a, b),
+    "MUL": lambda a, b, p: _py_broadcast(lambda x, y: x * y, a, b),
+    "RELU": lambda a, p: _py_map(lambda v: v if v > 0.0 else 0.0, a),
+    "SIGMOID": lambda a, p: _py_map(_sigmoid, a),
+    "TANH": lambda a, p: _py_map(math.tanh, a),
+    "GELU": lambda a, p: _py_map(_py_gelu, a),
+    "EXP": lambda a, p: _py_map(math.exp, a),
+    "SOFTMAX": _py_softmax,
+    "SUM": _py_reduction(math.fsum, empty_ok=True),
+    "MEAN": _py_reduction(lambda v: math.fsum(v) / len(v)),
+    "MAX": _py_reduction(max),
+}
+
+
+# -- NumPy kernels ---------------------------------------------------------------
+
+
+def _np_reduction(
+    name: str, empty_ok: bool = False
+) -> Callable[[Any, Any, Mapping[str, Any]], Any]:
+    def kernel(np: Any, x: Any, params: Mapping[str, Any]) -> Any:
+        axis = params.get("axis")
+        if not empty_ok and (x.size == 0 if axis is None else x.shape[axis] == 0):
+            raise ValueError("reduction over an empty axis")
+        return getattr(np, name)(x, axis=axis)
+
+    return kernel
+
+
+def _np_softmax(np: Any, x: Any, params: Mapping[str, Any]) -> Any:
+    e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+
+@functools.lru_cache(maxsize=None)
+def _np_erf(np: Any) -> Callable[[Any], Any]:
+    # NumPy has no erf ufunc. SciPy's is used when installed; otherwise
+    # math.erf is applied per element, which keeps GELU exact (matching the
+    # pure-Python kernel) at Python-loop speed rather than switching to the
+    # tanh approximation.
+    try:
+        from scipy.special import erf
+    except ImportError:
+        return np.frompyfunc(math.erf, 1, 1)
+    return erf
+
+
+def _np_gelu(np: Any, x: Any, params: Mapping[str, Any]) -> Any:
+    erf = _np_erf(np)(x / math.sqrt(2.0))
+    return 0.5 * x * (1.0 + np.asarray(erf, dtype=np.float64))
+
+
+_NP_KERNELS: Dict[str, Callable[..., Any]] = {
+    "MATMUL": lambda np, a, b, p: np.matmul(a, b),
+    "ADD": lambda np, a, b, p: a + b,
+    "SUB": lambda np, a, b, p: a - b,
+    "MUL": lambda np, a, b, p: a * b,
+    "RELU": lambda np, a, p: np.maximum(a, 0.0),
+    "SIGMOID": lambda np, a, p: 0.5 * (1.0 + np.tanh(0.5 * a)),
+    "TANH": lambda np, a, p: np.tanh(a),
+    "GELU": _np_gelu,
+    "EXP": lambda np, a, p: np.exp(a),
+    "SOFTMAX": _np_softmax,
+    "SUM": _np_reduction("sum", empty_ok=True),
+    "MEAN": _np_reduction("mean"),
+    "MAX": _np_reduction("max"),
+}
+
+PRIMITIVES = frozenset(_PY_KERNELS) | {INSTR_INPUT, INSTR_OUTPUT, "PARAM", "CONST"}
+
+
+def _resolve_backend(backend: str) -> Any:
+    # Returns the numpy module, or None for the pure-Python kernels.
+    if backend == "python":
+        return None
+    if backend not in ("auto", "numpy"):
+        raise ValueError(f"unknown backend: {backend!r}")
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        if backend == "numpy":
+            raise
+        return None
+
+
+def dispatch_primitive(
+    node: Mapping[str, Any],
+    tensor_map: Mapping[Any, Any],
+    theta: Mapping[str, Any],
+    input_data: Mapping[Any, Any],
+    np: Any = None,
+) -> Any:
+    """``Glyphser.Model.DispatchPrimitive``: the output tensor of ``node``.
+
+    ``np`` is the NumPy module for the vectorized kernels, or ``None``.
+    """
+    node_id, instr = node["node_id"], node["instr"]
+    params = node.get("params", {})
+    args = [tensor_map[src] for src in node.get("inputs", [])]
+    if instr in (INSTR_INPUT, "PARAM", "CONST"):
+        if args:
+            raise _fail("INVALID_IR", node_id, f"{instr} takes no inputs")
+        if instr == INSTR_INPUT:
+            key = params.get("name", node_id)
+            if key not in input_data:
+                raise _fail("INVALID_IR", node_id, f"missing input data {key!r}")
+            value = input_data[key]
+        elif instr == "PARAM":
+            if params.get("name") not in theta:
+                raise _fail(
+                    "INVALID_IR", node_id, f"missing parameter {params.get('name')!r}"
+                )
+            value = theta[params["name"]]
+        else:
+            value = params["value"]
+        try:
+            if np is not None:
+                return np.asarray(value, dtype=np.float64)
+            return _py_tensor(value)
+        except TypeError as exc:
+            raise _fail("INVALID_IR", node_id, str(exc)) from exc
+        except ValueError as exc:
+            raise _fail("SHAPE_MISMATCH", node_id, str(exc)) from exc
+    if instr == INSTR_OUTPUT:
+        if len(args) != 1:
+            raise _fail("INVALID_IR", node_id, "OUTPUT takes exactly one input")
+        return args[0]
+    kernels = _NP_KERNELS if np is not None else _PY_KERNELS
+    kernel = kernels.get(instr)
+    if kernel is None:
+        raise _fail("PRIMITIVE_UNSUPPORTED", node_id, instr)
+    arity = 2 if instr in ("MATMUL", "ADD", "SUB", "MUL") else 1
+    if len(args) != arity:
+        raise _fail(
+            "INVALID_IR", node_id, f"{instr} takes {arity} input(s), got {len(args)}"
+        )
+    try:
+        return kernel(np, *args, params) if np is not None else kernel(*args, params)
+    except (ValueError, IndexError) as exc:
+        raise _fail("SHAPE_MISMATCH", node_id, str(exc)) from exc
+
+
+def execute_ir(
+    ir: Mapping[str, Any],
+    input_data: Mapping[Any, Any],
+    theta: Mapping[str, Any] | None = None,
+    backend: str = "auto",
+) -> Dict[Any, Any]:
+    """``Glyphser.Model.ModelIR_Executor`` in inference mode.
+
+    ``input_data`` is keyed by INPUT node id (or its ``params.name``) and
+    ``theta`` by PARAM ``params.name``. Returns ``{node_id: tensor}`` for the
+    OUTPUT nodes: float64 ``numpy.ndarray`` with the NumPy backend, nested
+    lists of floats with ``backend="python"``.
+    """
+    np = _resolve_backend(backend)
+    order = topo_sort_nodes(ir)
+    theta = theta or {}
+    last_use: Dict[Any, int] = {}
+    for pos, node in enumerate(order):
+        for src in node.get("inputs", []):
+            last_use[src] = pos
+    tensor_map: Dict[Any, Any] = {}
+    outputs: Dict[Any, Any] = {}
+    for pos, node in enumerate(order):
+        value = dispatch_primitive(node, tensor_map, theta, input_data, np)
+        if node["instr"] == INSTR_OUTPUT:
+            outputs[node["node_id"]] = value
+        tensor_map[node["node_id"]] = value
+        for src in node.get("inputs", []):
+            if last_use[src] == pos:
+                del tensor_map[src]
+        if node["node_id"] not in last_use:
+            tensor_map.pop(node["node_id"], None)
+    return outputs
 
 
 def execute(ir: Dict[str, Any], inputs: List[float]) -> List[float]:
-    # Deterministic placeholder: apply optional scalar and bias, then sum.
-    scale = float(ir.get("scale", 1.0))
-    bias = float(ir.get("bias", 0.0))
-    output = [x * scale + bias for x in inputs]
-    return output
+    if "nodes" not in ir:
+        # Placeholder semantics for IRs without a node graph: scalar scale and bias.
+        scale = float(ir.get("scale", 1.0))
+        bias = float(ir.get("bias", 0.0))
+        return [x * scale + bias for x in inputs]
+    inputs_ids = [n["node_id"] for n in ir["nodes"] if n.get("instr") == INSTR_INPUT]
+    if len(inputs_ids) != 1:
+        raise ValueError("INVALID_IR: execute() needs exactly one INPUT node")
+    outputs = execute_ir(ir, {inputs_ids[0]: inputs}, ir.get("theta"))
+    if len(outputs) != 1:
+        raise ValueError("INVALID_IR: execute() needs exactly one OUTPUT node")
+    (value,) = outputs.values()
+    return value.tolist() if hasattr(value, "tolist") else value
@@ -0,0 +1,47 @@
+"""Write JSON artifacts and compute their digests from one serialization."""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from src.glyphser.persistence.background_writer import PersistenceService
+from src.glyphser.serialization.canonical_cbor import encode_canonical_into
+
+_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+
+
+class ArtifactDigests(NamedTuple):
+    """Hex digests of one artifact.
+
+    ``commit_hash`` is ``SHA-256(CBOR_CANONICAL([domain, obj]))``;
+    ``json_sha256`` is the SHA-256 of the canonical JSON text, without the
+    trailing newline the file carries.
+    """
+
+    commit_hash: str
+    json_sha256: str
+
+
+def write_artifact(
+    obj: Any, path: Path, domain: str, service: PersistenceService | None = None
+) -> ArtifactDigests:
+    """Write ``obj`` as canonical JSON plus a newline and return its digests.
+
+    The JSON text is produced once and used both for the file and for
+    ``json_sha256``; the domain hash streams the canonical CBOR encoding into
+    the hasher without building it. With ``service`` the write is queued.
+    """
+    body = _ENCODER.encode(obj).encode("ascii")
+    json_sha256 = hashlib.sha256(body).hexdigest()
+    data = body + b"\n"
+    if service is not None:
+        service.submit(path, data)
+    else:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    hasher = hashlib.sha256()
+    encode_canonical_into([domain, obj], hasher)
+    return ArtifactDigests(hasher.hexdigest(), json_sha256)
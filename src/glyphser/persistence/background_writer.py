@@ -0,0 +1,187 @@
+"""Background persistence of serialized artifacts with atomic replacement."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+_TMP_COUNTER = itertools.count()
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # directories cannot be opened on some platforms
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: Path, data: Any, fsync: bool = True) -> None:
+    """Write ``data`` to ``path`` via a temp file in the same directory and rename.
+
+    Readers see either the previous file or the complete new one. With
+    ``fsync=True`` the file and the directory entry are made durable.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{next(_TMP_COUNTER)}.tmp")
+    fd = os.open(
+        tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(path.parent)
+
+
+class _Barrier:
+    __slots__ = ("future",)
+
+    def __init__(self) -> None:
+        self.future: Future = Future()
+
+
+_STOP = object()
+
+
+class PersistenceService:
+    """Writes artifacts on a background thread through a bounded queue.
+
+    ``submit`` hands over already-serialized bytes and returns a
+    ``concurrent.futures.Future`` for the write; it blocks only while
+    ``max_pending`` writes are queued (backpressure). Writes happen in
+    submission order with ``atomic_write_bytes``. ``barrier()`` returns a
+    future that completes once every earlier write is done, failing with the
+    first write error since the previous barrier; ``flush()`` waits on it.
+    ``asubmit``/``aflush`` are the asyncio equivalents and never block the
+    event loop.
+    """
+
+    def __init__(self, max_pending: int = 64, fsync: bool = True) -> None:
+        if max_pending < 1:
+            raise ValueError("max_pending must be positive")
+        self.fsync = fsync
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._error: BaseException | None = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="glyphser-persistence", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if isinstance(item, _Barrier):
+                error, self._error = self._error, None
+                if error is None:
+                    item.future.set_result(None)
+                else:
+                    item.future.set_exception(error)
+                continue
+            path, data, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                atomic_write_bytes(path, data, fsync=self.fsync)
+            except BaseException as exc:
+                # Reported through the future and the next barrier.
+                if self._error is None:
+                    self._error = exc
+                future.set_exception(exc)
+            else:
+                future.set_result(path)
+
+    def _put_locked(self, item: Any, block: bool) -> None:
+        # The open check and the enqueue share the lock close() takes before
+        # enqueueing _STOP, so nothing can be queued behind it.
+        if self._closed:
+            raise ValueError("persistence service is closed")
+        self._queue.put(item, block=block)
+
+    def _put(self, item: Any) -> None:
+        with self._lock:
+            self._put_locked(item, block=True)
+
+    async def _aput(self, item: Any) -> None:
+        if self._lock.acquire(blocking=False):
+            try:
+                self._put_locked(item, block=False)
+                return
+            except queue.Full:
+                pass
+            finally:
+                self._lock.release()
+        # Queue full or another producer waiting on it: block off the event loop.
+        await asyncio.get_running_loop().run_in_executor(None, self._put, item)
+
+    def submit(self, path: Path, data: Any) -> Future:
+        """Queue ``data`` (bytes-like, copied) to be written atomically to ``path``."""
+        future: Future = Future()
+        self._put((Path(path), bytes(data), future))
+        return future
+
+    def barrier(self) -> Future:
+        marker = _Barrier()
+        self._put(marker)
+        return marker.future
+
+    def flush(self) -> None:
+        """Block until every write submitted so far is on disk."""
+        self.barrier().result()
+
+    async def asubmit(self, path: Path, data: Any) -> asyncio.Future:
+        """Queue a write without blocking the event loop.
+
+        Returns an awaitable for the write's completion.
+        """
+        future: Future = Future()
+        await self._aput((Path(path), bytes(data), future))
+        return asyncio.wrap_future(future)
+
+    async def aflush(self) -> None:
+        marker = _Barrier()
+        await self._aput(marker)
+        await asyncio.wrap_future(marker.future)
+
+    def close(self) -> None:
+        """Flush outstanding writes and stop the writer thread."""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                stopping = not self._closed
+                self._closed = True
+                if stopping:
+                    self._queue.put(_STOP)
+            self._thread.join()
+
+    def __enter__(self) -> PersistenceService:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
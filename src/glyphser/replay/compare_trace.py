@@ -0,0 +1,190 @@
+"""Streaming first-divergence trace comparison (Glyphser.Replay.CompareTrace)."""
+from __future__ import annotations
+
+import math
+from itertools import count, islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from src.glyphser.error.emit import emit_error
+from src.glyphser.trace.compute_trace_hash import compute_record_hash
+from src.glyphser.trace.trace_index import TraceIndex, index_path
+from src.glyphser.trace.trace_sidecar import read_trace
+
+FIELD_CLASSES = ("E0", "E1", "NON_COMPARABLE")
+EPS_EQ = 1e-10
+_MISSING = "<missing>"
+
+
+def _field_class(profile: Dict[str, Any], field: str) -> str:
+    cls = profile.get("determinism_class_map", {}).get(field, "E0")
+    if cls not in FIELD_CLASSES:
+        raise ValueError(f"unknown determinism class for field {field}: {cls}")
+    return cls
+
+
+def _within_tolerance(a: Any, b: Any, abs_tol: float, rel_tol: float) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a is b
+    if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+        return False
+    if math.isnan(a) or math.isnan(b):
+        return math.isnan(a) and math.isnan(b)
+    return abs(a - b) <= max(abs_tol, rel_tol * max(abs(a), abs(b)))
+
+
+def _diff_values(
+    path: str,
+    a: Any,
+    b: Any,
+    tol: tuple[float, float] | None,
+    out: List[Dict[str, Any]],
+) -> None:
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in sorted(set(a) | set(b)):
+            sub = f"{path}.{key}"
+            if key not in a or key not in b:
+                out.append(
+                    {"field": sub, "a": a.get(key, _MISSING), "b": b.get(key, _MISSING)}
+                )
+            else:
+                _diff_values(sub, a[key], b[key], tol, out)
+    elif isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        for i, (x, y) in enumerate(zip(a, b)):
+            _diff_values(f"{path}[{i}]", x, y, tol, out)
+    elif type(a) is not type(b) or a != b:
+        if a != a and b != b and type(a) is type(b):  # canonical CBOR has a single NaN
+            return
+        if tol is None or not _within_tolerance(a, b, *tol):
+            out.append({"field": path, "a": a, "b": b})
+
+
+def diff_records(
+    a: Dict[str, Any], b: Dict[str, Any], profile: Dict[str, Any] | None = None
+) -> List[Dict[str, Any]]:
+    """Return field-level differences between two trace records.
+
+    Fields are compared by the class in ``profile["determinism_class_map"]``
+    (default ``E0``): ``E0`` exactly, ``E1`` numerically within
+    ``max(abs_tol, rel_tol * max(|a|, |b|))``, ``NON_COMPARABLE`` not at all.
+    Nested values are reported by path, e.g. ``outputs[1]``.
+    """
+    profile = profile or {}
+    tol = (float(profile.get("abs_tol", EPS_EQ)), float(profile.get("rel_tol", 0.0)))
+    out: List[Dict[str, Any]] = []
+    for key in sorted(set(a) | set(b)):
+        cls = _field_class(profile, key)
+        if cls == "NON_COMPARABLE":
+            continue
+        if key not in a or key not in b:
+            out.append(
+                {"field": key, "a": a.get(key, _MISSING), "b": b.get(key, _MISSING)}
+            )
+            continue
+        field_tol = tol if cls == "E1" else None
+        overrides = profile.get("field_tolerances", {}).get(key)
+        if field_tol is not None and overrides:
+            field_tol = (
+                float(overrides.get("abs_tol", tol[0])),
+                float(overrides.get("rel_tol", tol[1])),
+            )
+        _diff_values(key, a[key], b[key], field_tol, out)
+    return out
+
+
+def _open_index(path: Path) -> TraceIndex | None:
+    return TraceIndex(path) if index_path(path).exists() else None
+
+
+def _shared_checkpoint_prefix(index_a: TraceIndex, index_b: TraceIndex) -> int:
+    """Return the record index of the last checkpoint shared by both traces.
+
+    Once two chains differ they stay different, so checkpoint equality is
+    monotone and can be binary-searched.
+    """
+    n = index_a.interval
+    lo, hi = 0, min(index_a.checkpoint_count(), index_b.checkpoint_count())
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if index_a.checkpoint_hash(mid) == index_b.checkpoint_hash(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo * n
+
+
+def _records_from(
+    path: Path, index: TraceIndex | None, start: int
+) -> Iterator[Dict[str, Any]]:
+    if index is not None:
+        return index.iter_records(start)
+    return islice(read_trace(path), start, None)
+
+
+def compare_traces(
+    trace_a: Path, trace_b: Path, profile: Dict[str, Any] | None = None
+) -> Dict[str, Any]:
+    """Compare two trace files and report the first divergent record.
+
+    Records are streamed side by side, so memory does not grow with trace
+    length. When both traces have index sidecars with the same checkpoint
+    interval, the shared prefix is skipped by binary search over the
+    checkpointed chain hashes and only records after the last matching
+    checkpoint are read. Records with equal record hashes are not diffed.
+    """
+    trace_a, trace_b = Path(trace_a), Path(trace_b)
+    index_a, index_b = _open_index(trace_a), _open_index(trace_b)
+    start = 0
+    if (
+        index_a is not None
+        and index_b is not None
+        and index_a.interval == index_b.interval
+    ):
+        start = _shared_checkpoint_prefix(index_a, index_b)
+
+    summary: Dict[str, Any] = {
+        "status": "MATCH",
+        "divergence_count": 0,
+        "first_divergence_index": None,
+        "first_divergence_t": None,
+        "operator_id": None,
+        "field_diffs": [],
+        "records_skipped": start,
+        "records_compared": 0,
+    }
+    it_a = _records_from(trace_a, index_a, start)
+    it_b = _records_from(trace_b, index_b, start)
+    for k in count(start):
+        rec_a = next(it_a, None)
+        rec_b = next(it_b, None)
+        if rec_a is None and rec_b is None:
+            break
+        summary["records_compared"] += 1
+        if rec_a is None or rec_b is None:
+            # One trace ended early.
+            diffs = [
+                {"field": "<record>", "a": rec_a or _MISSING, "b": rec_b or _MISSING}
+            ]
+        elif compute_record_hash(rec_a) == compute_record_hash(rec_b):
+            continue
+        else:
+            diffs = diff_records(rec_a, rec_b, profile)
+            if not diffs:
+                continue
+        ref = rec_a if rec_a is not None else rec_b
+        summary.update(
+            status="DIVERGED",
+            divergence_count=1,
+            first_divergence_index=k,
+            first_divergence_t=ref.get("t"),
+            operator_id=ref.get("operator_id"),
+            field_diffs=diffs,
+            error=emit_error(
+                "REPLAY_DIVERGENCE",
+                "trace divergence",
+                record_index=k,
+                operator_id=ref.get("operator_id"),
+            ),
+        )
+        break
+    return summary
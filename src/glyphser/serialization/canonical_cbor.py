@@ -1,60 +1,698 @@
 """Canonical CBOR encoding (minimal, deterministic subset)."""
 from __future__ import annotations
 
+import array
+import hashlib
+import math
 import struct
-from typing import Any
+import sys
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Any, Callable, Iterable
+
+# Streaming sinks receive data in chunks of at least this size (except the
+# final chunk and oversized leaf values, which are passed through directly).
+_SINK_CHUNK_SIZE = 1 << 16
+
+_first = itemgetter(0)
+
+
+_HEADS = [
+    [
+        bytes([(major << 5) | n]) if n < 24 else bytes([(major << 5) | 24, n])
+        for n in range(256)
+    ]
+    for major in range(8)
+]
+_PACK_HEAD16 = struct.Struct(">BH").pack
+_PACK_HEAD32 = struct.Struct(">BI").pack
+_PACK_HEAD64 = struct.Struct(">BQ").pack
+_UNPACK_DOUBLE = struct.Struct(">d").unpack
+_PACK_FLOAT = struct.Struct(">Bd").pack
+
+# Every NaN is written as the quiet, positive NaN 0x7ff8000000000000, so a NaN's
+# sign and payload bits never reach a hash; the decoder accepts only this one.
+CANONICAL_NAN = b"\x7f\xf8\x00\x00\x00\x00\x00\x00"
+_NAN_ITEM = b"\xfb" + CANONICAL_NAN
+
+# Byte and text strings at least this long are written as a separate head and
+# payload instead of being concatenated first.
+_INLINE_PAYLOAD_MAX = 4096
 
 
 def _enc_uint(major: int, n: int) -> bytes:
+    if 0 <= n < 256:
+        return _HEADS[major][n]
     if n < 0:
         raise ValueError("negative uint")
-    if n < 24:
-        return bytes([(major << 5) | n])
-    if n < 256:
-        return bytes([(major << 5) | 24, n])
     if n < 65536:
-        return bytes([(major << 5) | 25]) + n.to_bytes(2, "big")
+        return _PACK_HEAD16((major << 5) | 25, n)
     if n < 4294967296:
-        return bytes([(major << 5) | 26]) + n.to_bytes(4, "big")
-    return bytes([(major << 5) | 27]) + n.to_bytes(8, "big")
+        return _PACK_HEAD32((major << 5) | 26, n)
+    if n < 18446744073709551616:
+        return _PACK_HEAD64((major << 5) | 27, n)
+    raise OverflowError("int too big to convert")
 
 
-def encode_canonical(obj: Any) -> bytes:
-    if obj is None:
-        return b"\xf6"
-    if obj is False:
-        return b"\xf4"
-    if obj is True:
-        return b"\xf5"
-    if isinstance(obj, int):
-        if obj >= 0:
-            return _enc_uint(0, obj)
-        return _enc_uint(1, -1 - obj)
-    if isinstance(obj, bytes):
-        return _enc_uint(2, len(obj)) + obj
-    if isinstance(obj, str):
-        b = obj.encode("utf-8")
+def _enc_none(obj: None, write: Callable[[bytes], Any]) -> None:
+    write(b"\xf6")
+
+
+def _enc_bool(obj: bool, write: Callable[[bytes], Any]) -> None:
+    write(b"\xf5" if obj else b"\xf4")
+
+
+def _enc_int(obj: int, write: Callable[[bytes], Any]) -> None:
+    if obj >= 0:
+        write(_enc_uint(0, obj))
+    else:
+        write(_enc_uint(1, -1 - obj))
+
+
+def _enc_bytes(obj: bytes, write: Callable[[bytes], Any]) -> None:
+    if len(obj) < _INLINE_PAYLOAD_MAX:
+        write(_enc_uint(2, len(obj)) + obj)
+    else:
+        write(_enc_uint(2, len(obj)))
+        write(obj)
+
+
+def _enc_str(obj: str, write: Callable[[bytes], Any]) -> None:
+    b = obj.encode("utf-8")
+    if len(b) < _INLINE_PAYLOAD_MAX:
+        write(_enc_uint(3, len(b)) + b)
+    else:
+        write(_enc_uint(3, len(b)))
+        write(b)
+
+
+def _enc_float(obj: float, write: Callable[[bytes], Any]) -> None:
+    write(_PACK_FLOAT(0xFB, obj) if obj == obj else _NAN_ITEM)
+
+
+def _canonicalize_nans(data: bytes) -> bytes:
+    # ``data`` is big-endian float64. Only items whose first byte is 0x7f or
+    # 0xff can be NaN, so buffers without such a byte are returned untouched.
+    high = data[0::8]
+    if b"\x7f" not in high and b"\xff" not in high:
+        return data
+    out = None
+    for k, byte in enumerate(high):
+        if byte & 0x7F == 0x7F:
+            i = 8 * k
+            item = data[i : i + 8]
+            if item != CANONICAL_NAN and math.isnan(_UNPACK_DOUBLE(item)[0]):
+                if out is None:
+                    out = bytearray(data)
+                out[i : i + 8] = CANONICAL_NAN
+    return data if out is None else bytes(out)
+
+
+# Lists and tuples of at least this many exact floats are packed in bulk; the
+# bytes are the same as encoding each element separately.
+_FLOAT_RUN_MIN = 8
+_FLOAT_RUN_CHUNK = 8192
+_FLOAT_ONLY = {float}
+_NATIVE_LITTLE = sys.byteorder == "little"
+
+
+def _pack_float_run(values: Any, write: Callable[[bytes], Any]) -> None:
+    for start in range(0, len(values), _FLOAT_RUN_CHUNK):
+        raw = array.array("d", values[start : start + _FLOAT_RUN_CHUNK])
+        if _NATIVE_LITTLE:
+            raw.byteswap()
+        src = _canonicalize_nans(raw.tobytes())
+        n = len(raw)
+        out = bytearray(9 * n)
+        out[0::9] = b"\xfb" * n
+        for k in range(8):
+            out[k + 1 :: 9] = src[k::8]
+        write(bytes(out))
+
+
+# RFC 8746 typed arrays. Only explicitly typed buffers (array.array, non-byte
+# memoryviews, NumPy arrays) use these tags; lists and tuples always encode as
+# CBOR arrays, so existing hashes are unaffected. Elements are big-endian.
+# format code -> (tag, itemsize, byteswap typecode)
+_TYPED_ARRAY_FORMATS: dict[str, tuple[int, int, str | None]] = {
+    "d": (82, 8, "d"),
+    "q": (75, 8, "q"),
+    "l": (75, 8, "q"),
+    "B": (64, 1, None),
+}
+TYPED_ARRAY_TAGS = {"uint8": 64, "int64": 75, "float64": 82}
+
+
+def _enc_typed_array(obj: Any, write: Callable[[bytes], Any]) -> None:
+    view = memoryview(obj)
+    fmt = view.format
+    order = fmt[0] if fmt[:1] in ("@", "=", "<", ">", "!") else "@"
+    spec = _TYPED_ARRAY_FORMATS.get(fmt.lstrip("@=<>!"))
+    if spec is None or view.ndim != 1 or view.itemsize != spec[1]:
+        raise TypeError(f"unsupported typed array format: {fmt!r} (ndim={view.ndim})")
+    tag, _, swap_code = spec
+    data = view.tobytes()
+    little = order == "<" or (order in ("@", "=") and _NATIVE_LITTLE)
+    if swap_code is not None and little:
+        swapped = array.array(swap_code)
+        swapped.frombytes(data)
+        swapped.byteswap()
+        data = swapped.tobytes()
+    if tag == 82:
+        data = _canonicalize_nans(data)
+    write(_enc_uint(6, tag))
+    _enc_bytes(data, write)
+
+
+def _enc_memoryview(obj: memoryview, write: Callable[[bytes], Any]) -> None:
+    # Unsigned-byte views are byte strings, matching the zero-copy byte strings
+    # returned by the lazy decoder; any other format is a typed array.
+    if obj.format == "B" and obj.ndim == 1:
+        _enc_bytes(obj.tobytes(), write)
+    else:
+        _enc_typed_array(obj, write)
+
+
+_ARRAY = 4
+_MAP = 5
+
+# Exact-type dispatch; subclasses are resolved through the MRO on first use.
+_SCALAR_ENCODERS: dict[type, Callable[[Any, Callable[[bytes], Any]], None]] = {
+    type(None): _enc_none,
+    bool: _enc_bool,
+    int: _enc_int,
+    bytes: _enc_bytes,
+    str: _enc_str,
+    float: _enc_float,
+    array.array: _enc_typed_array,
+    memoryview: _enc_memoryview,
+}
+_CONTAINER_KINDS: dict[type, int] = {list: _ARRAY, tuple: _ARRAY, dict: _MAP}
+
+
+def _resolve(cls: type) -> None:
+    # NumPy is never imported here: if a caller passes an ndarray, the module is
+    # already loaded and its arrays go through the typed-array path.
+    np = sys.modules.get("numpy")
+    if np is not None and issubclass(cls, np.ndarray):
+        _SCALAR_ENCODERS[cls] = _enc_typed_array
+        return
+    for base in cls.__mro__[1:]:
+        if base in _SCALAR_ENCODERS:
+            _SCALAR_ENCODERS[cls] = _SCALAR_ENCODERS[base]
+            return
+        if base in _CONTAINER_KINDS:
+            _CONTAINER_KINDS[cls] = _CONTAINER_KINDS[base]
+            return
+    raise TypeError(f"unsupported type: {cls!r}")
+
+
+def _encode_key(key: Any) -> bytes:
+    if key.__class__ is str:
+        b = key.encode("utf-8")
         return _enc_uint(3, len(b)) + b
-    if isinstance(obj, float):
-        return b"\xfb" + struct.pack(">d", obj)
-    if isinstance(obj, (list, tuple)):
-        out = [_enc_uint(4, len(obj))]
-        for item in obj:
-            out.append(encode_canonical(item))
-        return b"".join(out)
-    if isinstance(obj, dict):
-        items = []
-        for k, v in obj.items():
-            kb = encode_canonical(k)
-            vb = encode_canonical(v)
-            items.append((kb, vb))
-        items.sort(key=lambda kv: kv[0])
-        out = [_enc_uint(5, len(items))]
-        for kb, vb in items:
-            out.append(kb)
-            out.append(vb)
-        return b"".join(out)
-    raise TypeError(f"unsupported type: {type(obj)!r}")
+    return encode_canonical(key)
+
+
+# Cached map shape: map head, encoded keys in canonical order, value getter.
+_Shape = tuple[bytes, tuple[bytes, ...], Callable[[Any], tuple]]
+
+
+class _MapShapeCache:
+    """Pre-encoded keys and canonical value order per distinct map key tuple.
+
+    Records of the same shape (trace events, checkpoint headers, certificates)
+    then only pay for encoding their values. A shape is cached the second time
+    it is seen, so one-off maps do not pay for building it. Only maps with exact
+    ``str`` keys and at most ``max_keys`` entries are cached. The cache is
+    bounded by ``max_entries`` and is reset when full, which keeps the hit path
+    a single dict lookup.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_keys: int = 64) -> None:
+        self.max_entries = max_entries
+        self.max_keys = max_keys
+        self.entries: dict[tuple[Any, ...], _Shape] = {}
+        self._seen: set[tuple[Any, ...]] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def admit(self, keys: tuple[Any, ...]) -> _Shape | None:
+        """Record a miss; build and cache the shape if it has been seen before."""
+        self.misses += 1
+        seen = self._seen
+        if keys not in seen:
+            if len(seen) >= self.max_entries:
+                seen.clear()
+            seen.add(keys)
+            return None
+        if len(keys) > self.max_keys or not all(k.__class__ is str for k in keys):
+            return None
+        encoded = sorted([(_encode_key(k), k) for k in keys])
+        shape = (
+            _enc_uint(5, len(keys)),
+            tuple([kb for kb, _ in encoded]),
+            itemgetter(*[k for _, k in encoded]),
+        )
+        entries = self.entries
+        if len(entries) >= self.max_entries:
+            self.evictions += len(entries)
+            entries.clear()
+        entries[keys] = shape
+        return shape
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self._seen.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_MAP_SHAPES = _MapShapeCache()
+
+
+def _map_values(pairs: Iterable[tuple[bytes, Any]], write: Callable[[bytes], Any]):
+    # Each key is written when the generator resumes, i.e. after the previous
+    # value (including all of its children) has been fully encoded.
+    for kb, v in pairs:
+        write(kb)
+        yield v
+
+
+def _encode_into(obj: Any, write: Callable[[bytes], Any]) -> None:
+    # Explicit work stack of child iterators: nesting depth is bounded by
+    # memory, not by the interpreter recursion limit. ``open_ids`` holds the
+    # containers being encoded, so a self-referencing one is an error rather
+    # than an endless loop.
+    scalars = _SCALAR_ENCODERS
+    enc = scalars.get(obj.__class__)
+    if enc is not None:
+        enc(obj, write)
+        return
+    containers = _CONTAINER_KINDS
+    shapes = _MAP_SHAPES.entries
+    stack: list[Any] = []
+    open_ids: list[int] = []
+    active: set[int] = set()
+    it: Any = iter((obj,))
+    while True:
+        for item in it:
+            cls = item.__class__
+            enc = scalars.get(cls)
+            if enc is not None:
+                enc(item, write)
+                continue
+            kind = containers.get(cls)
+            if kind is None:
+                _resolve(cls)
+                enc = scalars.get(cls)
+                if enc is not None:
+                    enc(item, write)
+                    continue
+                kind = containers[cls]
+            n = len(item)
+            if kind == _ARRAY:
+                write(_enc_uint(4, n))
+                if not n:
+                    continue
+                if n >= _FLOAT_RUN_MIN and set(map(type, item)) == _FLOAT_ONLY:
+                    _pack_float_run(item, write)
+                    continue
+                child = iter(item)
+            elif n < 2:
+                # Nothing to sort: write the head and key, then the value.
+                if not n:
+                    write(b"\xa0")
+                    continue
+                ((k, v),) = item.items()
+                write(b"\xa1" + _encode_key(k))
+                child = iter((v,))
+            else:
+                # Keys are pre-encoded and pre-sorted per map shape; values are
+                # streamed in canonical key order.
+                keys = tuple(item)
+                shape = shapes.get(keys)
+                if shape is not None:
+                    _MAP_SHAPES.hits += 1
+                else:
+                    shape = _MAP_SHAPES.admit(keys)
+                if shape is not None:
+                    write(shape[0])
+                    child = _map_values(zip(shape[1], shape[2](item)), write)
+                else:
+                    pairs = [(_encode_key(k), v) for k, v in item.items()]
+                    pairs.sort(key=_first)
+                    write(_enc_uint(5, n))
+                    child = _map_values(pairs, write)
+            cid = id(item)
+            if cid in active:
+                raise ValueError("cannot encode a self-referencing container")
+            active.add(cid)
+            open_ids.append(cid)
+            stack.append(it)
+            it = child
+            break
+        else:
+            if not stack:
+                return
+            it = stack.pop()
+            active.discard(open_ids.pop())
+
+
+def _sink_writer(sink: Any) -> Callable[[bytes], Any]:
+    for name in ("update", "write", "extend"):
+        fn = getattr(sink, name, None)
+        if callable(fn):
+            return fn
+    raise TypeError(f"unsupported sink: {type(sink)!r}")
+
+
+class _ChunkedWriter:
+    """Coalesces small writes into fixed-size chunks for a downstream sink."""
+
+    __slots__ = ("_buf", "_sink_write", "total")
+
+    def __init__(self, sink_write: Callable[[bytes], Any]) -> None:
+        self._buf = bytearray()
+        self._sink_write = sink_write
+        self.total = 0
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        buf = self._buf
+        if len(data) >= _SINK_CHUNK_SIZE:
+            self.flush()
+            self._sink_write(data)
+            return
+        buf += data
+        if len(buf) >= _SINK_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buf:
+            self._sink_write(bytes(self._buf))
+            self._buf.clear()
+
+
+def encode_canonical(obj: Any) -> bytes:
+    out: list[bytes] = []
+    _encode_into(obj, out.append)
+    return b"".join(out)
+
+
+def encode_many(objs: Iterable[Any]) -> list[bytes]:
+    """Encode each object in ``objs``, like ``[encode_canonical(o) for o in objs]``."""
+    buf = bytearray()
+    write = buf.extend
+    bounds = [0]
+    for obj in objs:
+        _encode_into(obj, write)
+        bounds.append(len(buf))
+    view = memoryview(buf)
+    try:
+        return [view[a:b].tobytes() for a, b in zip(bounds, bounds[1:])]
+    finally:
+        view.release()
+
+
+def encode_canonical_into(obj: Any, sink: Any) -> int:
+    """Stream the canonical encoding of ``obj`` into ``sink``.
+
+    ``sink`` may be any object exposing ``update`` (hashlib objects), ``write``
+    (binary files) or ``extend`` (bytearray). The bytes written are identical to
+    ``encode_canonical(obj)``; peak memory depends on nesting depth and map key
+    sizes, not on payload size. Returns the number of bytes written.
+    """
+    writer = _ChunkedWriter(_sink_writer(sink))
+    _encode_into(obj, writer.write)
+    writer.flush()
+    return writer.total
+
+
+class SubtreeCache:
+    """Bounded LRU of canonical bytes and SHA-256 digests for ``FrozenValue``s.
+
+    Entries are keyed by wrapper identity, so a frozen subtree that is embedded
+    in many records is encoded and hashed once while it stays resident. Bounds
+    apply to both the entry count and the total cached bytes; values larger
+    than ``max_bytes`` are encoded but never cached.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 << 20) -> None:
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError("cache bounds must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[FrozenValue, tuple[bytes, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, frozen: FrozenValue) -> tuple[bytes, bytes]:
+        """Return ``(canonical_bytes, sha256_digest)`` for ``frozen``."""
+        with self._lock:
+            entry = self._entries.get(frozen)
+            if entry is not None:
+                self._entries.move_to_end(frozen)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        data = encode_canonical(frozen.value)
+        entry = (data, hashlib.sha256(data).digest())
+        if len(data) > self.max_bytes:
+            return entry
+        with self._lock:
+            if frozen not in self._entries:
+                self._entries[frozen] = entry
+                self._bytes += len(data)
+                while (
+                    len(self._entries) > self.max_entries
+                    or self._bytes > self.max_bytes
+                ):
+                    _, (old, _) = self._entries.popitem(last=False)
+                    self._bytes -= len(old)
+                    self.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_DEFAULT_SUBTREE_CACHE = SubtreeCache()
+
+
+def get_subtree_cache() -> SubtreeCache:
+    return _DEFAULT_SUBTREE_CACHE
+
+
+def encoder_stats() -> dict[str, dict[str, Any]]:
+    """Hit/miss/eviction counters of the encoder's process-wide caches."""
+    return {
+        "map_shapes": _MAP_SHAPES.stats(),
+        "subtree_cache": _DEFAULT_SUBTREE_CACHE.stats(),
+    }
+
+
+class FrozenValue:
+    """Opt-in wrapper marking ``value`` as immutable for encoding purposes.
+
+    The encoder splices the memoized canonical bytes of a frozen value in place
+    of re-encoding it. Callers must not mutate ``value`` after wrapping it.
+    """
+
+    __slots__ = ("value", "_cache")
+
+    def __init__(self, value: Any, cache: SubtreeCache | None = None) -> None:
+        self.value = value
+        self._cache = cache
+
+    def _entry(self) -> tuple[bytes, bytes]:
+        return (self._cache or _DEFAULT_SUBTREE_CACHE).lookup(self)
+
+    @property
+    def encoded(self) -> bytes:
+        return self._entry()[0]
+
+    @property
+    def digest(self) -> bytes:
+        return self._entry()[1]
+
+    def hexdigest(self) -> str:
+        return self._entry()[1].hex()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Caches hold locks and are process-local; a copy uses the default cache.
+        return (FrozenValue, (self.value,))
+
+    def __repr__(self) -> str:
+        return f"FrozenValue({self.value!r})"
+
+
+def freeze(value: Any, cache: SubtreeCache | None = None) -> FrozenValue:
+    if isinstance(value, FrozenValue):
+        return value
+    return FrozenValue(value, cache)
+
+
+def _enc_frozen(obj: FrozenValue, write: Callable[[bytes], Any]) -> None:
+    write(obj.encoded)
+
+
+_SCALAR_ENCODERS[FrozenValue] = _enc_frozen
+
+
+def register_encoder(
+    cls: type, enc: Callable[[Any, Callable[[bytes], Any]], None]
+) -> None:
+    """Encode instances of ``cls`` (and its subclasses) with ``enc(obj, write)``.
+
+    ``enc`` must write exactly the canonical encoding of the value ``obj``
+    stands for, e.g. the map a record class represents.
+    """
+    if cls in _CONTAINER_KINDS or cls in (type(None), bool, int, bytes, str, float):
+        raise ValueError(f"cannot override the encoder for {cls!r}")
+    _SCALAR_ENCODERS[cls] = enc
+    for sub in [c for c in _SCALAR_ENCODERS if c is not cls and issubclass(c, cls)]:
+        _SCALAR_ENCODERS[sub] = enc
+
+
+# Sentinel for absent optional fields in ``MapSchema.encode``.
+OMITTED: Any = object()
+
+
+def _field_str(v: str) -> bytes:
+    b = v.encode("utf-8")
+    return _enc_uint(3, len(b)) + b
+
+
+# Field kind -> expression template encoding ``{v}`` (inlined by ``MapSchema``).
+_FIELD_EXPRS: dict[str, str] = {
+    "uint": "(U[{v}] if {v} < 256 else _enc_uint(0, {v}))",
+    "str": "_field_str({v})",
+    "bytes": "(_enc_uint(2, len({v})) + {v})",
+    "float": "(_PACK_FLOAT(0xFB, {v}) if {v} == {v} else _NAN_ITEM)",
+    "any": "encode_canonical({v})",
+}
+
+
+class MapSchema:
+    """Canonical encoder for maps with a fixed set of text keys.
+
+    ``fields`` is a sequence of ``(name, kind)`` pairs, ``kind`` being one of
+    "uint", "str", "bytes", "float" or "any"; names listed in ``optional`` may
+    be passed as ``OMITTED`` to leave them out. ``constants`` are entries whose
+    value is the same for every map. The key order is resolved once and a
+    straight-line encoder is generated, so ``encode(values)`` (values in
+    ``fields`` order) only encodes the values. The result is the same as
+    ``encode_canonical`` on the equivalent dict; values must already match
+    their declared kind.
+    """
+
+    __slots__ = ("fields", "optional", "constants", "encode")
+
+    def __init__(
+        self,
+        fields: Iterable[tuple[str, str]],
+        optional: Iterable[str] = (),
+        constants: dict[str, Any] | None = None,
+    ) -> None:
+        self.fields = tuple(fields)
+        self.optional = frozenset(optional)
+        self.constants = dict(constants or {})
+        names = [name for name, _ in self.fields] + list(self.constants)
+        if len(set(names)) != len(names):
+            raise ValueError("duplicate field names")
+        if not self.optional <= set(names) - set(self.constants):
+            raise ValueError("optional names must be fields")
+        entries = []
+        for i, (name, kind) in enumerate(self.fields):
+            if kind not in _FIELD_EXPRS:
+                raise ValueError(f"unknown field kind: {kind}")
+            entries.append((_encode_key(name), i, kind))
+        for name, value in self.constants.items():
+            entries.append((_encode_key(name), -1, encode_canonical(value)))
+        entries.sort(key=_first)
+        self.encode = self._compile(entries)
+
+    def _compile(self, entries: list[tuple[bytes, int, Any]]) -> Callable[[Any], bytes]:
+        # One expression per entry, joined once; consecutive keys and constant
+        # values are merged into a single literal.
+        env: dict[str, Any] = {
+            "OMITTED": OMITTED,
+            "U": _HEADS[0],
+            "_enc_uint": _enc_uint,
+            "_field_str": _field_str,
+            "_PACK_FLOAT": _PACK_FLOAT,
+            "_NAN_ITEM": _NAN_ITEM,
+            "encode_canonical": encode_canonical,
+        }
+        parts: list[str] = []
+        present: list[str] = []
+        literal = b""
+        n_fixed = 0
+        for key, i, spec in entries:
+            if i < 0:
+                literal += key + spec
+                n_fixed += 1
+                continue
+            name, kind = self.fields[i]
+            value = _FIELD_EXPRS[kind].format(v=f"v{i}")
+            if name in self.optional:
+                if literal:
+                    parts.append(repr(literal))
+                    literal = b""
+                parts.append(f"({key!r} + {value} if v{i} is not OMITTED else b'')")
+                present.append(f"(v{i} is not OMITTED)")
+            else:
+                parts.append(repr(literal + key))
+                parts.append(value)
+                literal = b""
+                n_fixed += 1
+        if literal:
+            parts.append(repr(literal))
+        if present:
+            head = f"_enc_uint(5, {' + '.join([str(n_fixed)] + present)})"
+        else:
+            env["HEAD"] = _enc_uint(5, n_fixed)
+            head = "HEAD"
+        unpack = (
+            f"    ({''.join(f'v{i}, ' for i in range(len(self.fields)))}) = values\n"
+            if self.fields
+            else ""
+        )
+        body = f"    return {head} + b''.join(({', '.join(parts)},))\n"
+        source = f"def encode(values):\n{unpack}{body}"
+        exec(source, env)
+        return env["encode"]
 
 
 def encode_canonical_hex(obj: Any) -> str:
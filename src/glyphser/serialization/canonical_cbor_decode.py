@@ -0,0 +1,397 @@
+"""Canonical CBOR decoding with lazy, zero-copy container views.
+
+Decoding is strict: any input that ``encode_canonical`` would not have produced
+(non-minimal heads, indefinite lengths, tags, unsorted or duplicate map keys,
+non-text map keys, invalid UTF-8, non-canonical NaN, trailing bytes) is
+rejected with ``ValueError``. The only tags accepted are the RFC 8746 typed
+arrays enumerated by the profile (uint8, int64 and float64, big-endian), which
+decode to ``array.array``.
+
+``decode_canonical`` materializes the whole item. ``decode_canonical_lazy`` and
+``open_canonical`` return ``CBORArrayView``/``CBORMapView`` objects that decode
+entries only when accessed; byte strings are returned as ``memoryview`` slices
+of the input. Lazy views validate the regions they touch; call
+``decode_canonical`` (or ``CBORArrayView.to_python``) to validate everything.
+"""
+from __future__ import annotations
+
+import array
+import mmap
+import struct
+import sys
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.glyphser.serialization.canonical_cbor import CANONICAL_NAN, encode_canonical
+
+_MIN_ARG = {24: 24, 25: 256, 26: 65536, 27: 4294967296}
+_SIMPLE = {20: False, 21: True, 22: None}
+_NO_KEY = object()
+# RFC 8746 typed-array tags enumerated by the profile -> array typecode.
+_TYPED_ARRAYS = {64: "B", 75: "q", 82: "d"}
+
+
+def _as_view(data: Any) -> memoryview:
+    view = memoryview(data)
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+
+def _read_arg(buf: memoryview, pos: int, ai: int) -> tuple[int, int]:
+    if ai < 24:
+        return ai, pos
+    if ai > 27:
+        raise ValueError(f"indefinite-length or reserved encoding at offset {pos - 1}")
+    end = pos + (1 << (ai - 24))
+    if end > len(buf):
+        raise ValueError("truncated input")
+    value = int.from_bytes(buf[pos:end], "big")
+    if value < _MIN_ARG[ai]:
+        raise ValueError(f"non-minimal length or integer encoding at offset {pos - 1}")
+    return value, end
+
+
+def _read_simple(buf: memoryview, pos: int, ai: int) -> tuple[Any, int]:
+    if ai in _SIMPLE:
+        return _SIMPLE[ai], pos
+    if ai == 27:
+        end = pos + 8
+        if end > len(buf):
+            raise ValueError("truncated input")
+        raw = buf[pos:end]
+        (value,) = struct.unpack(">d", raw)
+        if value != value and raw != CANONICAL_NAN:
+            raise ValueError(f"non-canonical NaN payload at offset {pos - 1}")
+        return value, end
+    raise ValueError(f"forbidden simple value or float width at offset {pos - 1}")
+
+
+def _read_text(buf: memoryview, pos: int, end: int) -> str:
+    if end > len(buf):
+        raise ValueError("truncated input")
+    try:
+        return str(buf[pos:end], "utf-8")
+    except UnicodeDecodeError as exc:
+        raise ValueError(f"invalid UTF-8 text string at offset {pos}") from exc
+
+
+def _typed_array_span(buf: memoryview, pos: int, tag: int) -> tuple[str, int, int]:
+    code = _TYPED_ARRAYS.get(tag)
+    if code is None:
+        raise ValueError(f"tag {tag} is not allowed at offset {pos - 1}")
+    if pos >= len(buf) or buf[pos] >> 5 != 2:
+        raise ValueError(f"typed array payload must be a byte string at offset {pos}")
+    n, start = _read_arg(buf, pos + 1, buf[pos] & 0x1F)
+    end = start + n
+    if end > len(buf):
+        raise ValueError("truncated input")
+    if n % array.array(code).itemsize:
+        raise ValueError(
+            f"typed array length not a multiple of element size at offset {pos}"
+        )
+    return code, start, end
+
+
+def _read_typed_array(buf: memoryview, pos: int, tag: int) -> tuple[array.array, int]:
+    code, start, end = _typed_array_span(buf, pos, tag)
+    values = array.array(code)
+    values.frombytes(buf[start:end])
+    if values.itemsize > 1 and sys.byteorder == "little":
+        values.byteswap()
+    if code == "d":
+        for value in values:
+            if value != value and struct.pack(">d", value) != CANONICAL_NAN:
+                raise ValueError(
+                    f"non-canonical NaN payload in typed array at offset {start}"
+                )
+    return values, end
+
+
+def _skip(buf: memoryview, pos: int) -> int:
+    """Return the end offset of the item at ``pos`` without decoding it."""
+    n = len(buf)
+    pending = 1
+    while pending:
+        pending -= 1
+        if pos >= n:
+            raise ValueError("truncated input")
+        ib = buf[pos]
+        major = ib >> 5
+        pos += 1
+        if major == 7:
+            _, pos = _read_simple(buf, pos, ib & 0x1F)
+            continue
+        arg, pos = _read_arg(buf, pos, ib & 0x1F)
+        if major == 2 or major == 3:
+            pos += arg
+            if pos > n:
+                raise ValueError("truncated input")
+        elif major == 4:
+            pending += arg
+        elif major == 5:
+            pending += 2 * arg
+        elif major == 6:
+            pos = _typed_array_span(buf, pos, arg)[2]
+    return pos
+
+
+def _decode_lazy(buf: memoryview, pos: int) -> Any:
+    if pos >= len(buf):
+        raise ValueError("truncated input")
+    ib = buf[pos]
+    major = ib >> 5
+    if major == 7:
+        return _read_simple(buf, pos + 1, ib & 0x1F)[0]
+    arg, start = _read_arg(buf, pos + 1, ib & 0x1F)
+    if major == 0:
+        return arg
+    if major == 1:
+        return -1 - arg
+    if major == 2:
+        if start + arg > len(buf):
+            raise ValueError("truncated input")
+        return buf[start : start + arg]
+    if major == 3:
+        return _read_text(buf, start, start + arg)
+    if major == 4:
+        return CBORArrayView(buf, pos, start, arg)
+    if major == 5:
+        return CBORMapView(buf, pos, start, arg)
+    return _read_typed_array(buf, start, arg)[0]
+
+
+def _decode_eager(buf: memoryview, pos: int) -> tuple[Any, int]:
+    # Iterative so that nesting depth is not bounded by the recursion limit.
+    # Frames are [container, remaining, pending_key, previous_key_bytes].
+    stack: list[list[Any]] = []
+    n = len(buf)
+    while True:
+        if pos >= n:
+            raise ValueError("truncated input")
+        start = pos
+        ib = buf[pos]
+        major = ib >> 5
+        expecting_key = bool(stack) and stack[-1][2] is _NO_KEY
+        if expecting_key and major != 3:
+            raise ValueError(f"map key must be a text string at offset {pos}")
+        if major == 7:
+            value, pos = _read_simple(buf, pos + 1, ib & 0x1F)
+        else:
+            arg, pos = _read_arg(buf, pos + 1, ib & 0x1F)
+            if major == 0:
+                value = arg
+            elif major == 1:
+                value = -1 - arg
+            elif major == 2:
+                if pos + arg > n:
+                    raise ValueError("truncated input")
+                value = bytes(buf[pos : pos + arg])
+                pos += arg
+            elif major == 3:
+                value = _read_text(buf, pos, pos + arg)
+                pos += arg
+            elif major == 4:
+                if arg:
+                    stack.append([[], arg, None, None])
+                    continue
+                value = []
+            elif major == 5:
+                if arg:
+                    stack.append([{}, arg, _NO_KEY, b""])
+                    continue
+                value = {}
+            else:
+                value, pos = _read_typed_array(buf, pos, arg)
+
+        if expecting_key:
+            frame = stack[-1]
+            key_bytes = bytes(buf[start:pos])
+            if key_bytes <= frame[3]:
+                raise ValueError(f"map keys not in canonical order at offset {start}")
+            frame[3] = key_bytes
+            frame[2] = value
+            continue
+
+        while True:
+            if not stack:
+                return value, pos
+            frame = stack[-1]
+            container = frame[0]
+            if container.__class__ is list:
+                container.append(value)
+            else:
+                container[frame[2]] = value
+                frame[2] = _NO_KEY
+            frame[1] -= 1
+            if frame[1]:
+                break
+            stack.pop()
+            value = container
+
+
+class CBORArrayView(Sequence):
+    """Lazy view over a canonical CBOR array; items decode on access."""
+
+    __slots__ = ("_buf", "_head", "_count", "_offsets")
+
+    def __init__(self, buf: memoryview, head: int, first: int, count: int) -> None:
+        self._buf = buf
+        self._head = head
+        self._count = count
+        self._offsets = [first]
+
+    def _offset(self, index: int) -> int:
+        offsets = self._offsets
+        while len(offsets) <= index:
+            offsets.append(_skip(self._buf, offsets[-1]))
+        return offsets[index]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("array index out of range")
+        return _decode_lazy(self._buf, self._offset(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._count):
+            yield _decode_lazy(self._buf, self._offset(i))
+
+    def to_python(self) -> list[Any]:
+        return _decode_eager(self._buf, self._head)[0]
+
+
+class CBORMapView(Mapping):
+    """Lazy view over a canonical CBOR map with text keys.
+
+    Entries are indexed incrementally in canonical key order, so looking up a
+    key only scans entries whose encoded key sorts before it.
+    """
+
+    __slots__ = ("_buf", "_head", "_count", "_next", "_key_bytes", "_keys", "_values")
+
+    def __init__(self, buf: memoryview, head: int, first: int, count: int) -> None:
+        self._buf = buf
+        self._head = head
+        self._count = count
+        self._next = first
+        self._key_bytes: list[bytes] = []
+        self._keys: list[str] = []
+        self._values: list[int] = []
+
+    def _scan_one(self) -> None:
+        buf = self._buf
+        pos = self._next
+        if pos >= len(buf):
+            raise ValueError("truncated input")
+        if buf[pos] >> 5 != 3:
+            raise ValueError(f"map key must be a text string at offset {pos}")
+        key_end = _skip(buf, pos)
+        key_bytes = bytes(buf[pos:key_end])
+        if self._key_bytes and key_bytes <= self._key_bytes[-1]:
+            raise ValueError(f"map keys not in canonical order at offset {pos}")
+        key = _decode_lazy(buf, pos)
+        self._next = _skip(buf, key_end)
+        self._key_bytes.append(key_bytes)
+        self._keys.append(key)
+        self._values.append(key_end)
+
+    def _find(self, key: str) -> int:
+        target = encode_canonical(key)
+        key_bytes = self._key_bytes
+        while len(key_bytes) < self._count and (
+            not key_bytes or key_bytes[-1] < target
+        ):
+            self._scan_one()
+        i = bisect_left(key_bytes, target)
+        if i < len(key_bytes) and key_bytes[i] == target:
+            return i
+        return -1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, key: Any) -> Any:
+        i = self._find(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        return _decode_lazy(self._buf, self._values[i])
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def raw(self, key: str) -> memoryview:
+        """Return the encoded bytes of the value at ``key`` as a zero-copy slice."""
+        i = self._find(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        start = self._values[i]
+        return self._buf[start : _skip(self._buf, start)]
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            if i == len(self._keys):
+                self._scan_one()
+            yield self._keys[i]
+
+    def to_python(self) -> dict[str, Any]:
+        return _decode_eager(self._buf, self._head)[0]
+
+
+def decode_canonical(data: Any) -> Any:
+    """Fully decode and validate a canonical CBOR item from a bytes-like object."""
+    buf = _as_view(data)
+    value, end = _decode_eager(buf, 0)
+    if end != len(buf):
+        raise ValueError(f"trailing bytes after top-level item at offset {end}")
+    return value
+
+
+def iter_canonical_sequence(data: Any) -> Iterator[Any]:
+    """Decode and validate each item of an RFC 8742 CBOR sequence in turn."""
+    buf = _as_view(data)
+    pos = 0
+    while pos < len(buf):
+        value, pos = _decode_eager(buf, pos)
+        yield value
+
+
+def decode_canonical_lazy(data: Any) -> Any:
+    """Decode the top-level item of ``data`` without copying it.
+
+    Containers are returned as lazy views that keep a reference to ``data``.
+    """
+    return _decode_lazy(_as_view(data), 0)
+
+
+def typed_array_payload(data: Any) -> tuple[str, memoryview]:
+    """Return ``(typecode, payload)`` for an encoded RFC 8746 typed array.
+
+    ``payload`` is a zero-copy slice holding the big-endian elements; use
+    ``decode_canonical`` instead when native-order values are needed.
+    """
+    buf = _as_view(data)
+    if not len(buf) or buf[0] >> 5 != 6:
+        raise ValueError("not a typed array")
+    tag, pos = _read_arg(buf, 1, buf[0] & 0x1F)
+    code, start, end = _typed_array_span(buf, pos, tag)
+    if end != len(buf):
+        raise ValueError(f"trailing bytes after top-level item at offset {end}")
+    return code, buf[start:end]
+
+
+def open_canonical(path: Path) -> Any:
+    """Memory-map ``path`` and return a lazy view of its top-level item."""
+    with open(path, "rb") as f:
+        if not f.seek(0, 2):
+            raise ValueError("truncated input")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode_canonical_lazy(mm)
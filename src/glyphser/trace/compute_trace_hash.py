@@ -2,18 +2,171 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Any, Iterable
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator
 
-from src.glyphser.serialization.canonical_cbor import encode_canonical
+from src.glyphser.serialization.canonical_cbor import (
+    encode_canonical,
+    encode_canonical_into,
+)
 
 
-def _sha256(data: bytes) -> bytes:
-    return hashlib.sha256(data).digest()
+def _sha256_canonical(obj: Any) -> bytes:
+    hasher = hashlib.sha256()
+    encode_canonical_into(obj, hasher)
+    return hasher.digest()
 
 
-def compute_trace_hash(records: Iterable[dict[str, Any]]) -> str:
-    h = _sha256(encode_canonical(["trace_chain", []]))
-    for record in records:
-        record_hash = _sha256(encode_canonical(record))
-        h = _sha256(encode_canonical(["trace_chain", [h, record_hash]]))
-    return h.hex()
+# h_0 = SHA-256(CBOR_CANONICAL(["trace_chain", []])).
+TRACE_HEAD_HASH = _sha256_canonical(["trace_chain", []])
+
+# CBOR_CANONICAL(["trace_chain", [h, record_hash]]) for 32-byte digests is a
+# fixed prefix, then h, then a bytes32 head, then record_hash.
+_BYTES32_HEAD = b"\x58\x20"
+_CHAIN_STEP_PREFIX = encode_canonical(["trace_chain", [bytes(32), bytes(32)]])[:-66]
+
+
+def compute_record_hash(record: dict[str, Any]) -> bytes:
+    return _sha256_canonical(record)
+
+
+def _hash_record_chunk(records: list[dict[str, Any]]) -> bytes:
+    return b"".join([_sha256_canonical(record) for record in records])
+
+
+def iter_record_hashes(
+    records: Iterable[dict[str, Any]],
+    workers: int | None = 1,
+    chunk_size: int = 512,
+) -> Iterator[bytes]:
+    """Yield ``compute_record_hash`` for each record, in order.
+
+    Record hashes do not depend on the chain, so with ``workers > 1`` (``None``
+    means one per CPU) they are computed in a process pool over chunks of
+    ``chunk_size`` records. At most ``2 * workers`` chunks are in flight, so
+    memory stays bounded for traces of any length. Records must be picklable.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1 or chunk_size < 1:
+        raise ValueError("workers and chunk_size must be positive")
+    if workers == 1:
+        yield from map(_sha256_canonical, records)
+        return
+    it = iter(records)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending: deque = deque()
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if chunk:
+                pending.append(pool.submit(_hash_record_chunk, chunk))
+                if len(pending) < 2 * workers:
+                    continue
+            if not pending:
+                break
+            digests = pending.popleft().result()
+            for i in range(0, len(digests), 32):
+                yield digests[i : i + 32]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def chain_step(h: bytes, record_hash: bytes) -> bytes:
+    """Advance the trace chain.
+
+    Returns ``SHA-256(CBOR_CANONICAL(["trace_chain", [h, record_hash]]))``.
+    """
+    if len(h) != 32 or len(record_hash) != 32:
+        raise ValueError("trace chain inputs must be 32-byte digests")
+    return hashlib.sha256(_CHAIN_STEP_PREFIX + h + _BYTES32_HEAD + record_hash).digest()
+
+
+class TraceHasher:
+    """Resumable ``trace_chain`` state: current chain hash plus record count.
+
+    ``export_state()`` returns a JSON- and CBOR-friendly dict that can be
+    embedded in a checkpoint header; ``TraceHasher.from_state`` resumes from
+    it, so only records written after the checkpoint need to be hashed.
+    """
+
+    __slots__ = ("_hash", "_count")
+
+    def __init__(self) -> None:
+        self._hash = TRACE_HEAD_HASH
+        self._count = 0
+
+    @property
+    def record_count(self) -> int:
+        return self._count
+
+    def digest(self) -> bytes:
+        return self._hash
+
+    def hexdigest(self) -> str:
+        return self._hash.hex()
+
+    def update(self, record: dict[str, Any]) -> bytes:
+        """Fold ``record`` into the chain and return its record hash."""
+        record_hash = _sha256_canonical(record)
+        self._hash = chain_step(self._hash, record_hash)
+        self._count += 1
+        return record_hash
+
+    def update_record_hash(self, record_hash: bytes) -> None:
+        self._hash = chain_step(self._hash, record_hash)
+        self._count += 1
+
+    def update_many(
+        self,
+        records: Iterable[dict[str, Any]],
+        workers: int | None = 1,
+        chunk_size: int = 512,
+    ) -> None:
+        """Fold ``records`` into the chain (``workers``: see ``iter_record_hashes``)."""
+        h = self._hash
+        n = 0
+        for record_hash in iter_record_hashes(records, workers, chunk_size):
+            h = chain_step(h, record_hash)
+            n += 1
+        self._hash = h
+        self._count += n
+
+    def copy(self) -> TraceHasher:
+        other = TraceHasher()
+        other._hash = self._hash
+        other._count = self._count
+        return other
+
+    def export_state(self) -> dict[str, Any]:
+        return {"trace_chain_hash": self._hash.hex(), "trace_record_count": self._count}
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any]) -> TraceHasher:
+        chain_hash = state.get("trace_chain_hash")
+        count = state.get("trace_record_count")
+        if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+            raise ValueError("missing or invalid int: trace_record_count")
+        try:
+            h = bytes.fromhex(chain_hash) if isinstance(chain_hash, str) else b""
+        except ValueError:
+            h = b""
+        if len(h) != 32:
+            raise ValueError("missing or invalid str: trace_chain_hash")
+        if count == 0 and h != TRACE_HEAD_HASH:
+            raise ValueError("trace_chain_hash does not match an empty trace")
+        hasher = cls()
+        hasher._hash = h
+        hasher._count = count
+        return hasher
+
+
+def compute_trace_hash(
+    records: Iterable[dict[str, Any]], workers: int | None = 1, chunk_size: int = 512
+) -> str:
+    hasher = TraceHasher()
+    hasher.update_many(records, workers, chunk_size)
+    return hasher.hexdigest()
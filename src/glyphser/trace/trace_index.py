@@ -0,0 +1,211 @@
+"""Seekable index sidecar for trace files.
+
+The index is written next to the trace (``<trace>.idx``) by ``TraceWriter``
+when ``index_interval`` is set. Layout, all integers big-endian:
+
+- a 16-byte header: magic ``GLYTIDX1``, format code (u8), 3 zero bytes and the
+  checkpoint interval ``N`` (u32);
+- one 16-byte entry per record: start and end byte offsets (u64, u64) of the
+  record's serialized bytes in the trace file (separators excluded);
+- after every ``N`` entries, the 32-byte ``trace_chain`` hash over all records
+  so far.
+
+Entry ``k`` therefore lives at ``16 + 16*k + 32*(k // N)``, so record lookup is
+O(1), and any range can be re-verified starting from the nearest checkpointed
+chain hash. The file is append-only and is extended after the trace data it
+points at has been written, which makes it safe to tail a live trace.
+"""
+from __future__ import annotations
+
+import json
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from src.glyphser.serialization.canonical_cbor_decode import decode_canonical
+from src.glyphser.trace.compute_trace_hash import (
+    TRACE_HEAD_HASH,
+    chain_step,
+    compute_record_hash,
+)
+from src.glyphser.trace.trace_record import record_from_json
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"GLYTIDX1"
+INDEX_FORMAT_CODES = {"json": 0, "ndjson": 1, "cbor": 2}
+
+_HEADER = struct.Struct(">8sB3xI")
+_ENTRY = struct.Struct(">QQ")
+_HASH_SIZE = 32
+_READ_WINDOW = 1 << 20
+
+
+def index_path(trace_path: Path) -> Path:
+    trace_path = Path(trace_path)
+    return trace_path.with_name(trace_path.name + INDEX_SUFFIX)
+
+
+def index_header(fmt: str, interval: int) -> bytes:
+    if interval < 1:
+        raise ValueError("index_interval must be positive")
+    return _HEADER.pack(INDEX_MAGIC, INDEX_FORMAT_CODES[fmt], interval)
+
+
+def parse_index_header(data: bytes) -> tuple[str, int]:
+    if len(data) < _HEADER.size:
+        raise ValueError("truncated trace index header")
+    magic, code, interval = _HEADER.unpack_from(data)
+    formats = {v: k for k, v in INDEX_FORMAT_CODES.items()}
+    if magic != INDEX_MAGIC or code not in formats or interval < 1:
+        raise ValueError("invalid trace index header")
+    return formats[code], interval
+
+
+def index_entry(start: int, end: int) -> bytes:
+    return _ENTRY.pack(start, end)
+
+
+def index_size(record_count: int, interval: int) -> int:
+    """Byte size of an index covering ``record_count`` records."""
+    return (
+        _HEADER.size
+        + _ENTRY.size * record_count
+        + _HASH_SIZE * (record_count // interval)
+    )
+
+
+def _entry_offset(k: int, interval: int) -> int:
+    return _HEADER.size + _ENTRY.size * k + _HASH_SIZE * (k // interval)
+
+
+class TraceIndex:
+    """Read-only view of a trace and its index sidecar.
+
+    ``len(index)`` is the number of fully indexed records; call ``refresh()``
+    to pick up records appended by a live writer since the index was opened.
+    """
+
+    def __init__(self, trace_path: Path) -> None:
+        self.trace_path = Path(trace_path)
+        self.index_path = index_path(self.trace_path)
+        self._data = b""
+        self._count = 0
+        self.refresh()
+
+    def refresh(self) -> int:
+        """Re-read the index and return the number of indexed records."""
+        data = self.index_path.read_bytes()
+        self.fmt, self.interval = parse_index_header(data)
+        n, block = self.interval, self.interval * _ENTRY.size + _HASH_SIZE
+        body = len(data) - _HEADER.size
+        # A partially written trailing entry, or a block whose checkpoint hash
+        # is not complete yet, is ignored until the writer finishes it.
+        full, rest = divmod(body, block)
+        self._count = full * n + min(rest // _ENTRY.size, n - 1)
+        self._data = data
+        return self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _check(self, k: int) -> int:
+        if k < 0:
+            k += self._count
+        if not 0 <= k < self._count:
+            raise IndexError("trace record index out of range")
+        return k
+
+    def span(self, k: int) -> tuple[int, int]:
+        """Return the ``(start, end)`` byte offsets of record ``k``."""
+        k = self._check(k)
+        return _ENTRY.unpack_from(self._data, _entry_offset(k, self.interval))
+
+    def checkpoint_count(self) -> int:
+        return self._count // self.interval
+
+    def checkpoint_hash(self, j: int) -> bytes:
+        """Chain hash after ``j * interval`` records (``j == 0`` is the head)."""
+        if not 0 <= j <= self.checkpoint_count():
+            raise IndexError("trace checkpoint index out of range")
+        if j == 0:
+            return TRACE_HEAD_HASH
+        pos = _entry_offset(j * self.interval, self.interval) - _HASH_SIZE
+        return self._data[pos : pos + _HASH_SIZE]
+
+    def read_raw(self, k: int) -> bytes:
+        start, end = self.span(k)
+        with open(self.trace_path, "rb") as f:
+            f.seek(start)
+            raw = f.read(end - start)
+        if len(raw) != end - start:
+            raise ValueError(f"trace file is truncated at record {k}")
+        return raw
+
+    def _decode(self, raw: bytes) -> Dict[str, Any]:
+        if self.fmt == "cbor":
+            return decode_canonical(raw)
+        return record_from_json(json.loads(raw))
+
+    def read_record(self, k: int) -> Dict[str, Any]:
+        return self._decode(self.read_raw(k))
+
+    def iter_records(
+        self, start: int = 0, stop: int | None = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Decode records ``[start, stop)`` in order.
+
+        The trace is read in windows of about ``_READ_WINDOW`` bytes (one
+        record at a time for larger records), so memory use does not grow with
+        the length of the range.
+        """
+        stop = self._count if stop is None else min(stop, self._count)
+        k = start
+        with open(self.trace_path, "rb") as f:
+            while k < stop:
+                first = self.span(k)[0]
+                spans = [self.span(k)]
+                while k + len(spans) < stop:
+                    span = self.span(k + len(spans))
+                    if span[1] - first > _READ_WINDOW:
+                        break
+                    spans.append(span)
+                last = spans[-1][1]
+                f.seek(first)
+                blob = f.read(last - first)
+                if len(blob) != last - first:
+                    raise ValueError("trace file is truncated")
+                for s, e in spans:
+                    yield self._decode(blob[s - first : e - first])
+                k += len(spans)
+
+    def chain_hash_at(self, k: int) -> bytes:
+        """Chain hash after the first ``k`` records, from the nearest checkpoint."""
+        if not 0 <= k <= self._count:
+            raise IndexError("trace record index out of range")
+        j = k // self.interval
+        h = self.checkpoint_hash(j)
+        for record in self.iter_records(j * self.interval, k):
+            h = chain_step(h, compute_record_hash(record))
+        return h
+
+    def verify_range(self, start: int, stop: int | None = None) -> bytes:
+        """Re-hash records ``[start, stop)`` from the nearest checkpoint.
+
+        Every checkpoint crossed is compared with the recomputed chain hash;
+        ``ValueError`` is raised on the first mismatch. Returns the chain hash
+        after ``stop`` records.
+        """
+        stop = self._count if stop is None else stop
+        if not 0 <= start <= stop <= self._count:
+            raise IndexError("trace record range out of bounds")
+        n = self.interval
+        k = (start // n) * n
+        h = self.checkpoint_hash(k // n)
+        for record in self.iter_records(k, stop):
+            h = chain_step(h, compute_record_hash(record))
+            k += 1
+            if k % n == 0 and h != self.checkpoint_hash(k // n):
+                raise ValueError(
+                    f"trace chain mismatch at checkpoint after record {k - 1}"
+                )
+        return h
@@ -0,0 +1,310 @@
+"""Slotted trace record classes bound to the canonical trace schema.
+
+One class per ``TraceRecord`` kind of ``docs/layer2-specs/Trace-Sidecar.md``
+(II.F). Field types are checked once at construction, instances are immutable
+and carry no per-record dict, and ``encode()`` writes the canonical CBOR map through a
+precomputed key order. The bytes are identical to ``encode_canonical`` on the
+equivalent dict (``to_dict()``), which always includes ``kind``.
+
+JSON has no byte strings, so the JSON trace formats carry ``bytes32`` fields
+as ``{"__bytes__": "<lowercase hex>"}`` (``to_json_dict``), the same tagging the
+canonical CBOR vectors use; ``record_from_json`` turns tagged fields back into
+bytes when such a trace is read and leaves untagged records alone.
+"""
+from __future__ import annotations
+
+import hashlib
+from operator import attrgetter
+from typing import Any, Callable, Dict
+
+from src.glyphser.serialization.canonical_cbor import (
+    OMITTED,
+    MapSchema,
+    register_encoder,
+)
+
+# Field type -> (check expression on ``{v}``, MapSchema kind).
+_FIELD_TYPES: dict[str, tuple[str, str]] = {
+    "string": ("{v}.__class__ is str", "str"),
+    "bytes32": ("{v}.__class__ is bytes and len({v}) == 32", "bytes"),
+    "uint32": ("{v}.__class__ is int and 0 <= {v} < 4294967296", "uint"),
+    "uint64": ("{v}.__class__ is int and 0 <= {v} < 18446744073709551616", "uint"),
+    "float64": ("{v}.__class__ is float", "float"),
+}
+
+_Fields = tuple[tuple[str, str], ...]
+
+# Key of the single-entry object a bytes value becomes in JSON traces.
+JSON_BYTES_TAG = "__bytes__"
+
+# kind -> (required fields, optional fields), per Trace-Sidecar II.F.
+TRACE_RECORD_SCHEMA: dict[str, tuple[_Fields, _Fields]] = {
+    "RUN_HEADER": (
+        (
+            ("schema_version", "string"),
+            ("replay_token", "bytes32"),
+            ("run_id", "string"),
+            ("tenant_id", "string"),
+            ("task_type", "string"),
+            ("world_size", "uint32"),
+            ("backend_binary_hash", "bytes32"),
+            ("driver_runtime_fingerprint_hash", "bytes32"),
+            ("policy_bundle_hash", "bytes32"),
+            ("monitor_policy_hash", "bytes32"),
+            ("operator_contracts_root_hash", "bytes32"),
+            ("redaction_mode", "string"),
+            ("hash_gate_M", "uint64"),
+            ("hash_gate_K", "uint64"),
+        ),
+        (
+            ("redaction_key_id", "string"),
+            ("redaction_policy_hash", "bytes32"),
+            ("authz_decision_hash", "bytes32"),
+        ),
+    ),
+    "ITER": (
+        (
+            ("t", "uint64"),
+            ("stage_id", "string"),
+            ("operator_id", "string"),
+            ("operator_seq", "uint64"),
+            ("rank", "uint32"),
+            ("status", "string"),
+            ("replay_token", "bytes32"),
+        ),
+        (
+            ("loss_total", "float64"),
+            ("grad_norm", "float64"),
+            ("state_fp", "bytes32"),
+            ("functional_fp", "bytes32"),
+            ("rng_offset_before", "uint64"),
+            ("rng_offset_after", "uint64"),
+            ("resource_ledger_hash", "bytes32"),
+            ("quota_decision", "string"),
+            ("quota_policy_hash", "bytes32"),
+            ("tracking_event_type", "string"),
+            ("artifact_id", "string"),
+            ("metric_name", "string"),
+            ("metric_value", "float64"),
+            ("window_id", "string"),
+        ),
+    ),
+    "POLICY_GATE_VERDICT": (
+        (
+            ("t", "uint64"),
+            ("policy_gate_hash", "bytes32"),
+            ("transcript_hash", "bytes32"),
+        ),
+        (),
+    ),
+    "CHECKPOINT_COMMIT": (
+        (
+            ("t", "uint64"),
+            ("checkpoint_hash", "bytes32"),
+            ("checkpoint_header_hash", "bytes32"),
+            ("checkpoint_merkle_root", "bytes32"),
+            ("trace_snapshot_hash", "bytes32"),
+        ),
+        (),
+    ),
+    "CERTIFICATE_INPUTS": (
+        (("t", "uint64"), ("certificate_inputs_hash", "bytes32")),
+        (),
+    ),
+    "RUN_END": (
+        (
+            ("status", "string"),
+            ("final_state_fp", "bytes32"),
+            ("trace_final_hash", "bytes32"),
+        ),
+        (),
+    ),
+    "ERROR": (
+        (
+            ("t", "uint64"),
+            ("failure_code", "string"),
+            ("failure_operator", "string"),
+            ("diagnostics_hash", "bytes32"),
+        ),
+        (),
+    ),
+}
+
+
+class TraceRecord:
+    """Base class of the per-kind record classes; see ``TRACE_RECORD_TYPES``.
+
+    Absent optional fields read as ``OMITTED`` and are left out of the map.
+    Instances are immutable, so the checks made at construction keep holding
+    for ``encode()``.
+    """
+
+    __slots__ = ()
+    kind: str = ""
+    _fields: tuple[str, ...] = ()
+    _bytes_fields: frozenset[str] = frozenset()
+    _schema: MapSchema
+    _values: Callable[[Any], tuple[Any, ...]]
+
+    def encode(self) -> bytes:
+        """Return ``CBOR_CANONICAL(self.to_dict())``."""
+        return self._schema.encode(self._values(self))
+
+    def record_hash(self) -> bytes:
+        return hashlib.sha256(self._schema.encode(self._values(self))).digest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {"kind": self.kind}
+        for name, value in zip(self._fields, self._values(self)):
+            if value is not OMITTED:
+                record[name] = value
+        return record
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        """``to_dict()`` with ``bytes32`` fields tagged as ``{"__bytes__": hex}``."""
+        record = self.to_dict()
+        for name in self._bytes_fields.intersection(record):
+            record[name] = {JSON_BYTES_TAG: record[name].hex()}
+        return record
+
+    @staticmethod
+    def from_dict(record: Dict[str, Any]) -> TraceRecord:
+        cls = TRACE_RECORD_TYPES.get(record.get("kind"))
+        if cls is None:
+            raise ValueError(f"unknown trace record kind: {record.get('kind')!r}")
+        return cls(**record)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Rebuild through the keyword constructor; the default slot-state
+        # protocol would go through the immutable __setattr__.
+        return (_rebuild_record, (self.__class__, self.to_dict()))
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values(self) == self._values(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        body = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items() if k != "kind")
+        return f"{self.__class__.__name__}({body})"
+
+
+def _compile_init(cls: type, required: _Fields, optional: _Fields) -> Any:
+    # Keyword-only constructor with one inlined type check per field, the way
+    # dataclasses generate theirs. Missing or unknown fields raise TypeError.
+    # Fields are stored through the slot descriptors, past the immutable
+    # __setattr__.
+    kind = cls.kind
+    params = [name for name, _ in required]
+    params += [f"{name}=OMITTED" for name, _ in optional]
+    lines = [f"def __init__(self, *, {', '.join(params)}, kind={kind!r}):"]
+    lines.append(f"    if kind != {kind!r}:")
+    lines.append(f"        raise ValueError('kind mismatch: expected {kind}')")
+    for fields, is_optional in ((required, False), (optional, True)):
+        for name, type_name in fields:
+            check = _FIELD_TYPES[type_name][0].format(v=name)
+            guard = (
+                f"{name} is not OMITTED and not ({check})"
+                if is_optional
+                else f"not ({check})"
+            )
+            lines.append(f"    if {guard}:")
+            lines.append(
+                f"        raise ValueError('missing or invalid {type_name}: {name}')"
+            )
+            lines.append(f"    set_{name}(self, {name})")
+    env: dict[str, Any] = {"OMITTED": OMITTED}
+    for name, _ in required + optional:
+        env[f"set_{name}"] = cls.__dict__[name].__set__
+    exec("\n".join(lines), env)
+    return env["__init__"]
+
+
+def _record_class(name: str, kind: str) -> type[TraceRecord]:
+    required, optional = TRACE_RECORD_SCHEMA[kind]
+    fields = required + optional
+    names = tuple(field for field, _ in fields)
+    schema = MapSchema(
+        [(field, _FIELD_TYPES[t][1]) for field, t in fields],
+        optional=[field for field, _ in optional],
+        constants={"kind": kind},
+    )
+    cls = type(
+        name,
+        (TraceRecord,),
+        {
+            "__slots__": names,
+            "__doc__": f"``{kind}`` trace record (Trace-Sidecar II.F).",
+            "kind": kind,
+            "_fields": names,
+            "_bytes_fields": frozenset(field for field, t in fields if t == "bytes32"),
+            "_schema": schema,
+            "_values": attrgetter(*names),
+        },
+    )
+    cls.__init__ = _compile_init(cls, required, optional)
+    return cls
+
+
+RunHeaderRecord = _record_class("RunHeaderRecord", "RUN_HEADER")
+IterRecord = _record_class("IterRecord", "ITER")
+PolicyGateVerdictRecord = _record_class(
+    "PolicyGateVerdictRecord", "POLICY_GATE_VERDICT"
+)
+CheckpointCommitRecord = _record_class("CheckpointCommitRecord", "CHECKPOINT_COMMIT")
+CertificateInputsRecord = _record_class("CertificateInputsRecord", "CERTIFICATE_INPUTS")
+RunEndRecord = _record_class("RunEndRecord", "RUN_END")
+ErrorRecord = _record_class("ErrorRecord", "ERROR")
+
+TRACE_RECORD_TYPES: dict[str, type[TraceRecord]] = {
+    cls.kind: cls
+    for cls in (
+        RunHeaderRecord,
+        IterRecord,
+        PolicyGateVerdictRecord,
+        CheckpointCommitRecord,
+        CertificateInputsRecord,
+        RunEndRecord,
+        ErrorRecord,
+    )
+}
+
+
+def _enc_trace_record(obj: TraceRecord, write: Callable[[bytes], Any]) -> None:
+    write(obj.encode())
+
+
+register_encoder(TraceRecord, _enc_trace_record)
+
+
+def _rebuild_record(cls: type[TraceRecord], fields: Dict[str, Any]) -> TraceRecord:
+    return cls(**fields)
+
+
+def record_from_json(record: Any) -> Any:
+    """Undo ``to_json_dict`` for a record parsed from a JSON trace.
+
+    Top-level values of the form ``{"__bytes__": hex}`` are converted back to
+    bytes; records without such values are returned unchanged.
+    """
+    if not isinstance(record, dict):
+        return record
+    fields = [
+        name
+        for name, value in record.items()
+        if value.__class__ is dict and value.keys() == {JSON_BYTES_TAG}
+    ]
+    if not fields:
+        return record
+    record = dict(record)
+    for name in fields:
+        record[name] = bytes.fromhex(record[name][JSON_BYTES_TAG])
+    return record
@@ -0,0 +1,304 @@
+"""Block-compressed, string-interned trace segments.
+
+File layout (integers big-endian):
+
+- magic ``GLYTSEG1``;
+- blocks, each a fixed header followed by the compressed payload. The header
+  holds the compressed size (u32), record count (u32), index of the block's
+  first record (u64), codec id (u8), SHA-256 of the uncompressed payload and
+  the ``trace_chain`` hash after the block's last record;
+- a footer, ``CBOR_CANONICAL`` map with the block offsets, the file's string
+  table, the record count and the final chain hash;
+- a trailer: footer offset (u64) and the magic again.
+
+A block payload is an RFC 8742 sequence of records in interned form: a flat
+array ``[key_id, value, key_id, value, ...]`` where keys, and string
+``operator_id`` values, are indices into the string table. Records decode back
+to the original logical records, so the chain hash is the same as for any
+other trace format. Because block ``i`` starts from the chain hash stored in
+block ``i - 1``'s header, blocks can be decompressed and verified
+independently and in parallel.
+"""
+from __future__ import annotations
+
+import hashlib
+import lzma
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+from src.glyphser.serialization.canonical_cbor import encode_canonical
+from src.glyphser.serialization.canonical_cbor_decode import (
+    decode_canonical,
+    iter_canonical_sequence,
+)
+from src.glyphser.trace.compute_trace_hash import (
+    TRACE_HEAD_HASH,
+    TraceHasher,
+    chain_step,
+    compute_record_hash,
+)
+
+SEGMENT_MAGIC = b"GLYTSEG1"
+SEGMENT_CODECS = {"zlib": 1, "lzma": 2}
+
+_BLOCK_HEADER = struct.Struct(">IIQB32s32s")
+_TRAILER = struct.Struct(">Q8s")
+_INTERNED_VALUE_KEYS = frozenset({"operator_id"})
+
+
+def _compress(codec: str, data: bytes, level: int | None) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 6 if level is None else level)
+    return lzma.compress(data, preset=6 if level is None else level)
+
+
+def _decompress(codec_id: int, data: bytes) -> bytes:
+    try:
+        if codec_id == SEGMENT_CODECS["zlib"]:
+            return zlib.decompress(data)
+        if codec_id == SEGMENT_CODECS["lzma"]:
+            return lzma.decompress(data)
+    except (zlib.error, lzma.LZMAError) as exc:
+        raise ValueError(f"corrupt segment block: {exc}") from exc
+    raise ValueError(f"unknown segment codec id: {codec_id}")
+
+
+class SegmentedTraceWriter:
+    """Append-only writer for the segmented trace format.
+
+    Records are buffered into a block until its uncompressed payload reaches
+    ``block_bytes``, then the block is compressed with ``codec`` ("zlib" or
+    "lzma", at ``level``) and written. ``close()`` writes the footer and
+    returns the same hex hash as ``compute_trace_hash`` over the records.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        codec: str = "zlib",
+        block_bytes: int = 1 << 20,
+        level: int | None = None,
+    ) -> None:
+        if codec not in SEGMENT_CODECS:
+            raise ValueError(f"unsupported segment codec: {codec}")
+        if block_bytes < 1:
+            raise ValueError("block_bytes must be positive")
+        self.path = Path(path)
+        self.codec = codec
+        self.block_bytes = block_bytes
+        self.level = level
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._file.write(SEGMENT_MAGIC)
+        self._offset = len(SEGMENT_MAGIC)
+        self._strings: Dict[str, int] = {}
+        self._block = bytearray()
+        self._block_records = 0
+        self._block_offsets: List[int] = []
+        self._hasher = TraceHasher()
+        self._final: str | None = None
+
+    @property
+    def record_count(self) -> int:
+        return self._hasher.record_count
+
+    def _intern(self, s: str) -> int:
+        i = self._strings.get(s)
+        if i is None:
+            i = self._strings[s] = len(self._strings)
+        return i
+
+    def append(self, record: Dict[str, Any]) -> bytes:
+        if self._final is not None:
+            raise ValueError("trace writer is closed")
+        if not isinstance(record, dict) or not all(isinstance(k, str) for k in record):
+            raise TypeError("trace records must be maps with text keys")
+        record_hash = self._hasher.update(record)
+        flat: List[Any] = []
+        for key, value in record.items():
+            flat.append(self._intern(key))
+            if key in _INTERNED_VALUE_KEYS:
+                # Interned strings are ids; anything else is boxed so it stays distinct.
+                value = self._intern(value) if isinstance(value, str) else [value]
+            flat.append(value)
+        self._block += encode_canonical(flat)
+        self._block_records += 1
+        if len(self._block) >= self.block_bytes:
+            self._flush_block()
+        return record_hash
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def _flush_block(self) -> None:
+        if not self._block_records:
+            return
+        payload = bytes(self._block)
+        compressed = _compress(self.codec, payload, self.level)
+        header = _BLOCK_HEADER.pack(
+            len(compressed),
+            self._block_records,
+            self._hasher.record_count - self._block_records,
+            SEGMENT_CODECS[self.codec],
+            hashlib.sha256(payload).digest(),
+            self._hasher.digest(),
+        )
+        self._file.write(header)
+        self._file.write(compressed)
+        self._block_offsets.append(self._offset)
+        self._offset += len(header) + len(compressed)
+        self._block.clear()
+        self._block_records = 0
+
+    def close(self) -> str:
+        if self._final is None:
+            self._flush_block()
+            footer = encode_canonical(
+                {
+                    "block_offsets": self._block_offsets,
+                    "record_count": self._hasher.record_count,
+                    "strings": list(self._strings),
+                    "trace_chain_hash": self._hasher.digest(),
+                }
+            )
+            self._file.write(footer)
+            self._file.write(_TRAILER.pack(self._offset, SEGMENT_MAGIC))
+            self._file.close()
+            self._final = self._hasher.hexdigest()
+        return self._final
+
+    def __enter__(self) -> SegmentedTraceWriter:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _read_block(
+    path: Path, offset: int, strings: List[str]
+) -> tuple[tuple[Any, ...], List[Dict[str, Any]]]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        header = _BLOCK_HEADER.unpack(f.read(_BLOCK_HEADER.size))
+        compressed = f.read(header[0])
+    if len(compressed) != header[0]:
+        raise ValueError(f"truncated segment block at offset {offset}")
+    payload = _decompress(header[3], compressed)
+    if hashlib.sha256(payload).digest() != header[4]:
+        raise ValueError(f"segment block payload hash mismatch at offset {offset}")
+    records = []
+    for flat in iter_canonical_sequence(payload):
+        record = {}
+        for i in range(0, len(flat), 2):
+            key = strings[flat[i]]
+            value = flat[i + 1]
+            if key in _INTERNED_VALUE_KEYS:
+                value = strings[value] if isinstance(value, int) else value[0]
+            record[key] = value
+        records.append(record)
+    if len(records) != header[1]:
+        raise ValueError(f"segment block record count mismatch at offset {offset}")
+    return header, records
+
+
+def _verify_block(
+    path: Path, offset: int, strings: List[str], start_hash: bytes
+) -> int:
+    header, records = _read_block(path, offset, strings)
+    h = start_hash
+    for record in records:
+        h = chain_step(h, compute_record_hash(record))
+    if h != header[5]:
+        raise ValueError(f"segment block chain hash mismatch at offset {offset}")
+    return len(records)
+
+
+class SegmentedTraceReader:
+    """Random access to the blocks of a segmented trace file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+                raise ValueError("not a segmented trace file")
+            size = f.seek(0, os.SEEK_END)
+            if size < len(SEGMENT_MAGIC) + _TRAILER.size:
+                raise ValueError("truncated segmented trace file")
+            f.seek(size - _TRAILER.size)
+            footer_offset, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if (
+                magic != SEGMENT_MAGIC
+                or not len(SEGMENT_MAGIC) <= footer_offset <= size - _TRAILER.size
+            ):
+                raise ValueError("invalid segmented trace trailer")
+            f.seek(footer_offset)
+            footer = decode_canonical(f.read(size - _TRAILER.size - footer_offset))
+            self._headers = []
+            for offset in footer["block_offsets"]:
+                f.seek(offset)
+                self._headers.append(_BLOCK_HEADER.unpack(f.read(_BLOCK_HEADER.size)))
+        self.block_offsets: List[int] = footer["block_offsets"]
+        self.strings: List[str] = footer["strings"]
+        self.record_count: int = footer["record_count"]
+        self.trace_chain_hash: bytes = footer["trace_chain_hash"]
+
+    @property
+    def block_count(self) -> int:
+        return len(self.block_offsets)
+
+    def block_start_hash(self, i: int) -> bytes:
+        """Chain hash before block ``i``: the previous block's end hash."""
+        return self._headers[i - 1][5] if i else TRACE_HEAD_HASH
+
+    def read_block(self, i: int) -> List[Dict[str, Any]]:
+        """Decompress block ``i`` and return its records (payload hash is checked)."""
+        return _read_block(self.path, self.block_offsets[i], self.strings)[1]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.block_count):
+            yield from self.read_block(i)
+
+    def verify(self, workers: int | None = 1) -> str:
+        """Verify every block and the footer; return the final chain hash (hex).
+
+        Blocks are independent given the chain hash in the preceding block's
+        header, so with ``workers > 1`` (``None`` means one per CPU) they are
+        decompressed and re-hashed in a process pool. Raises ``ValueError`` on
+        any mismatch.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        jobs = [
+            (self.path, offset, self.strings, self.block_start_hash(i))
+            for i, offset in enumerate(self.block_offsets)
+        ]
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                counts = list(pool.map(_verify_block, *zip(*jobs)))
+        else:
+            counts = [_verify_block(*job) for job in jobs]
+        expected_first = 0
+        for header, count in zip(self._headers, counts):
+            if header[2] != expected_first:
+                raise ValueError("segment blocks are not contiguous")
+            expected_first += count
+        final = self._headers[-1][5] if self._headers else TRACE_HEAD_HASH
+        if expected_first != self.record_count or final != self.trace_chain_hash:
+            raise ValueError("segmented trace footer does not match its blocks")
+        return final.hex()
+
+
+def write_segmented_trace(
+    records: Iterable[Dict[str, Any]],
+    path: Path,
+    codec: str = "zlib",
+    block_bytes: int = 1 << 20,
+) -> str:
+    with SegmentedTraceWriter(path, codec=codec, block_bytes=block_bytes) as writer:
+        writer.extend(records)
+    return writer.close()
@@ -1,16 +1,273 @@
 """Deterministic trace writer and hash helper (minimal)."""
 from __future__ import annotations
 
+import hashlib
 import json
+import mmap
+import os
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, Iterator
 
-from src.glyphser.trace.compute_trace_hash import compute_trace_hash
+from src.glyphser.persistence.background_writer import PersistenceService
+from src.glyphser.serialization.canonical_cbor import FrozenValue, encode_canonical
+from src.glyphser.serialization.canonical_cbor_decode import iter_canonical_sequence
+from src.glyphser.trace.compute_trace_hash import TraceHasher, compute_record_hash
+from src.glyphser.trace.trace_index import (
+    index_entry,
+    index_header,
+    index_path,
+    index_size,
+    parse_index_header,
+)
+from src.glyphser.trace.trace_record import TraceRecord, record_from_json
 
+# "json" is the single JSON array written by write_trace; "ndjson" writes one
+# canonical JSON object per line; "cbor" writes an RFC 8742 CBOR sequence of
+# canonical records.
+TRACE_FORMATS = ("json", "ndjson", "cbor")
 
-def write_trace(records: Iterable[Dict[str, Any]], path: Path) -> str:
-    data = [r for r in records]
-    path.parent.mkdir(parents=True, exist_ok=True)
-    text = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
-    path.write_text(text + "\n", encoding="utf-8")
-    return compute_trace_hash(data)
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, FrozenValue):
+        return obj.value
+    if isinstance(obj, TraceRecord):
+        return obj.to_json_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_bytes(record: Dict[str, Any]) -> bytes:
+    text = json.dumps(
+        record,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=True,
+        default=_json_default,
+    )
+    return text.encode("ascii")
+
+
+class TraceWriter:
+    """Append-only trace writer that advances the ``trace_chain`` hash per record.
+
+    Records are serialized and hashed as they are appended, so memory does not
+    grow with trace length. Buffered output is flushed every ``flush_records``
+    records or ``flush_bytes`` bytes (whichever comes first; ``None`` disables
+    a trigger), on ``flush()``, and on ``close()``. With ``fsync=True`` every
+    flush is also made durable. ``close()`` returns the same hex hash as
+    ``compute_trace_hash`` over the appended records.
+
+    ``export_state()`` flushes and returns the chain state plus the byte offset
+    of the trace file, suitable for a checkpoint header. Passing that dict back
+    as ``resume_state`` truncates the file to the offset (dropping records
+    written after the checkpoint) and continues the chain without re-hashing
+    earlier records. Resuming is supported for the "ndjson" and "cbor" formats.
+
+    With ``index_interval=N`` a seekable index sidecar (see ``trace_index``) is
+    maintained alongside the trace, holding per-record byte offsets and the
+    chain hash every ``N`` records. It is written after the trace data on each
+    flush and truncated together with the trace on resume.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fmt: str = "ndjson",
+        flush_records: int | None = 1024,
+        flush_bytes: int | None = 1 << 20,
+        fsync: bool = False,
+        resume_state: Dict[str, Any] | None = None,
+        index_interval: int | None = None,
+    ) -> None:
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"unsupported trace format: {fmt}")
+        if resume_state is not None and fmt == "json":
+            raise ValueError("resuming is not supported for the json trace format")
+        self.path = Path(path)
+        self.fmt = fmt
+        self.flush_records = flush_records
+        self.flush_bytes = flush_bytes
+        self.fsync = fsync
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._buf = bytearray(b"[" if fmt == "json" else b"")
+        self._pending = 0
+        self._final: str | None = None
+        self.index_interval = index_interval
+        self._index_file = None
+        self._index_buf = bytearray()
+        if resume_state is None:
+            self._hasher = TraceHasher()
+            self._file = open(self.path, "wb", buffering=0)
+            self._offset = 0
+            if index_interval is not None:
+                self._index_buf += index_header(fmt, index_interval)
+                self._index_file = open(index_path(self.path), "wb", buffering=0)
+            return
+        self._hasher = TraceHasher.from_state(resume_state)
+        offset = resume_state.get("trace_byte_offset")
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+            raise ValueError("missing or invalid int: trace_byte_offset")
+        self._file = open(self.path, "r+b", buffering=0)
+        if self._file.seek(0, os.SEEK_END) < offset:
+            self._file.close()
+            raise ValueError("trace file is shorter than trace_byte_offset")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self._offset = offset
+        if index_interval is not None:
+            self._index_file = open(index_path(self.path), "r+b", buffering=0)
+            size = index_size(self._hasher.record_count, index_interval)
+            header = self._index_file.read(16)
+            if (
+                parse_index_header(header) != (fmt, index_interval)
+                or self._index_file.seek(0, os.SEEK_END) < size
+            ):
+                self._file.close()
+                self._index_file.close()
+                raise ValueError("trace index does not match resume_state")
+            self._index_file.truncate(size)
+            self._index_file.seek(size)
+
+    @property
+    def record_count(self) -> int:
+        return self._hasher.record_count
+
+    @property
+    def current_hash(self) -> bytes:
+        return self._hasher.digest()
+
+    def append(self, record: Dict[str, Any]) -> bytes:
+        """Write ``record`` and fold it into the chain; returns its record hash."""
+        if self._final is not None:
+            raise ValueError("trace writer is closed")
+        if self.fmt == "cbor":
+            data = encode_canonical(record)
+            record_hash = hashlib.sha256(data).digest()
+        else:
+            record_hash = compute_record_hash(record)
+            data = _json_bytes(record)
+            if self.fmt == "json" and self._hasher.record_count:
+                self._buf += b","
+        if self.index_interval is not None:
+            start = self._offset + len(self._buf)
+            self._index_buf += index_entry(start, start + len(data))
+        self._buf += data
+        if self.fmt == "ndjson":
+            self._buf += b"\n"
+        self._hasher.update_record_hash(record_hash)
+        if (
+            self.index_interval is not None
+            and self._hasher.record_count % self.index_interval == 0
+        ):
+            self._index_buf += self._hasher.digest()
+        self._pending += 1
+        if (self.flush_records is not None and self._pending >= self.flush_records) or (
+            self.flush_bytes is not None and len(self._buf) >= self.flush_bytes
+        ):
+            self.flush()
+        return record_hash
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def flush(self) -> None:
+        if self._buf:
+            self._file.write(self._buf)
+            self._offset += len(self._buf)
+            self._buf.clear()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        # The index only ever points at trace bytes that are already written.
+        if self._index_buf:
+            self._index_file.write(self._index_buf)
+            self._index_buf.clear()
+            if self.fsync:
+                os.fsync(self._index_file.fileno())
+        self._pending = 0
+
+    def export_state(self) -> Dict[str, Any]:
+        """Flush and return the resumable chain state and trace byte offset."""
+        if self.fmt == "json":
+            raise ValueError("resuming is not supported for the json trace format")
+        if self._final is None:
+            self.flush()
+        state = self._hasher.export_state()
+        state["trace_byte_offset"] = self._offset
+        return state
+
+    def close(self) -> str:
+        if self._final is None:
+            if self.fmt == "json":
+                self._buf += b"]\n"
+            self.flush()
+            self._file.close()
+            if self._index_file is not None:
+                self._index_file.close()
+            self._final = self._hasher.hexdigest()
+        return self._final
+
+    def __enter__(self) -> TraceWriter:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def write_trace(
+    records: Iterable[Dict[str, Any]],
+    path: Path,
+    index_interval: int | None = None,
+    service: PersistenceService | None = None,
+) -> str:
+    if service is not None:
+        if index_interval is not None:
+            raise ValueError(
+                "index_interval is not supported with a persistence service"
+            )
+        hasher = TraceHasher()
+        records = list(records)
+        hasher.update_many(records)
+        service.submit(
+            path, b"[" + b",".join([_json_bytes(r) for r in records]) + b"]\n"
+        )
+        return hasher.hexdigest()
+    with TraceWriter(path, fmt="json", index_interval=index_interval) as writer:
+        writer.extend(records)
+    return writer.close()
+
+
+def trace_format(path: Path) -> str:
+    """Infer the trace format from the file suffix (``.json``/``.ndjson``/``.cbor``)."""
+    fmt = Path(path).suffix.lstrip(".")
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"cannot infer trace format from suffix: {path}")
+    return fmt
+
+
+def read_trace(path: Path, fmt: str | None = None) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a trace file in order.
+
+    "ndjson" and "cbor" traces are streamed; a "json" trace is one array and is
+    parsed in full.
+    """
+    path = Path(path)
+    fmt = fmt or trace_format(path)
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"unsupported trace format: {fmt}")
+    if fmt == "json":
+        with open(path, "rb") as f:
+            yield from map(record_from_json, json.load(f))
+    elif fmt == "ndjson":
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield record_from_json(json.loads(line))
+    else:
+        with open(path, "rb") as f:
+            if not f.seek(0, os.SEEK_END):
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield from iter_canonical_sequence(mm)
+        finally:
+            mm.close()
@@ -0,0 +1,43 @@
+"""Seeded random objects shared by the canonical CBOR property tests."""
+
+from __future__ import annotations
+
+import random
+
+SEED = 1337
+
+
+def rand_str(rng: random.Random) -> str:
+    return "".join(rng.choice("abcé") for _ in range(rng.randint(0, 6)))
+
+
+def rand_bytes(rng: random.Random, max_len: int = 6) -> bytes:
+    return bytes(rng.getrandbits(8) for _ in range(rng.randint(0, max_len)))
+
+
+def rand_obj(
+    rng: random.Random, depth: int, max_len: int = 4, tuples: bool = False
+) -> object:
+    """Random nesting of scalars, lists and text-keyed dicts, ``depth`` deep.
+
+    ``max_len`` bounds container and byte string lengths; ``tuples=True`` also
+    produces tuples, which decode back as lists.
+    """
+    choice = rng.randrange((6 + tuples) if depth > 0 else 4)
+    if choice == 0:
+        return rng.randint(-(2**40), 2**40)
+    if choice == 1:
+        return rand_str(rng)
+    if choice == 2:
+        return rand_bytes(rng, max_len)
+    if choice == 3:
+        return rng.choice([None, True, False, rng.uniform(-1e6, 1e6)])
+    items = (
+        rand_obj(rng, depth - 1, max_len, tuples)
+        for _ in range(rng.randint(0, max_len))
+    )
+    if choice == 4:
+        return list(items)
+    if choice == 5:
+        return {str(rng.randint(0, 50)): item for item in items}
+    return tuple(items)
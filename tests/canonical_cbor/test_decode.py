@@ -0,0 +1,129 @@
+"""Canonical CBOR decoder tests."""
+
+from __future__ import annotations
+
+import array
+import math
+import random
+import struct
+from pathlib import Path
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import MapSchema, encode_canonical
+from src.glyphser.serialization.canonical_cbor_decode import (
+    CBORArrayView,
+    CBORMapView,
+    decode_canonical,
+    decode_canonical_lazy,
+    open_canonical,
+)
+from tests.canonical_cbor.random_objects import SEED, rand_obj
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _materialize(value):
+    if isinstance(value, (CBORArrayView, CBORMapView)):
+        return value.to_python()
+    if isinstance(value, memoryview):
+        return bytes(value)
+    return value
+
+
+def test_decode_roundtrip():
+    rng = random.Random(SEED)
+    for _ in range(200):
+        obj = rand_obj(rng, depth=3, max_len=30)
+        data = encode_canonical(obj)
+        assert decode_canonical(data) == obj
+        assert _materialize(decode_canonical_lazy(data)) == obj
+
+
+def test_lazy_views_match_eager():
+    rng = random.Random(SEED)
+    for _ in range(50):
+        n = rng.randint(1, 40)
+        obj = {str(i): rand_obj(rng, depth=2, max_len=30) for i in range(n)}
+        view = decode_canonical_lazy(encode_canonical(obj))
+        assert isinstance(view, CBORMapView)
+        assert len(view) == len(obj)
+        assert sorted(view) == sorted(obj)
+        for key in reversed(list(obj)):
+            assert _materialize(view[key]) == obj[key]
+        assert "missing" not in view
+        with pytest.raises(KeyError):
+            view["missing"]
+
+
+def test_array_view_indexing():
+    obj = [{"i": i, "blob": bytes([i]) * i} for i in range(100)]
+    view = decode_canonical_lazy(encode_canonical(obj))
+    assert view[-1]["i"] == 99
+    assert bytes(view[7]["blob"]) == b"\x07" * 7
+    assert [item["i"] for item in view[10:13]] == [10, 11, 12]
+    with pytest.raises(IndexError):
+        view[100]
+
+
+def test_deep_nesting_decodes():
+    value = decode_canonical(b"\x81" * 5000 + b"\x80")
+    depth = 0
+    while value:
+        (value,) = value
+        depth += 1
+    assert depth == 5000
+
+
+def test_open_canonical_contract_artifact():
+    path = ROOT / "contracts" / "operator_registry.cbor"
+    eager = decode_canonical(path.read_bytes())
+    view = open_canonical(path)
+    assert view["registry_schema_version"] == eager["registry_schema_version"]
+    records = view["operator_records"]
+    assert records[-1]["operator_id"] == eager["operator_records"][-1]["operator_id"]
+    assert view.to_python() == eager
+    assert encode_canonical(eager) == path.read_bytes()
+
+
+@pytest.mark.parametrize(
+    "hex_input",
+    [
+        "",  # empty
+        "1817",  # non-minimal uint
+        "190017",  # non-minimal uint (2 bytes)
+        "5f40ff",  # indefinite byte string
+        "9f01ff",  # indefinite array
+        "c101",  # tag
+        "f7",  # undefined
+        "f93c00",  # half float
+        "fb7ff8000000000001",  # non-canonical NaN
+        "a2616201616101",  # unsorted keys
+        "a2616101616101",  # duplicate keys
+        "a10101",  # non-text key
+        "62c328",  # invalid UTF-8
+        "0101",  # trailing bytes
+        "8201",  # truncated array
+        "5a00010000",  # truncated byte string
+    ],
+)
+def test_decode_rejects_non_canonical(hex_input):
+    with pytest.raises(ValueError):
+        decode_canonical(bytes.fromhex(hex_input))
+
+
+def test_decode_accepts_every_encoded_nan():
+    payload = struct.unpack(">d", bytes.fromhex("7ff0000000000001"))[0]
+    schema = MapSchema([("x", "float")])
+    for nan in (math.nan, -math.nan, payload):
+        for obj in (nan, [nan] * 8, array.array("d", [nan, 1.0])):
+            data = encode_canonical(obj)
+            assert encode_canonical(decode_canonical(data)) == data
+        assert encode_canonical(nan) == bytes.fromhex("fb7ff8000000000000")
+        assert schema.encode((nan,)) == bytes.fromhex("a16178fb7ff8000000000000")
+
+
+def test_lazy_map_rejects_unsorted_keys_on_access():
+    view = decode_canonical_lazy(bytes.fromhex("a2616201616101"))
+    with pytest.raises(ValueError):
+        list(view)
@@ -0,0 +1,83 @@
+"""Iterative canonical CBOR encoder engine tests."""
+
+from __future__ import annotations
+
+import enum
+import random
+from collections import OrderedDict
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import encode_canonical, encode_many
+
+SEED = 1337
+
+
+class _Flag(enum.IntEnum):
+    ON = 1
+
+
+class _Label(str):
+    pass
+
+
+def test_deep_nesting_beyond_recursion_limit():
+    obj: object = []
+    for _ in range(50_000):
+        obj = [obj]
+    data = encode_canonical(obj)
+    assert data == b"\x81" * 50_000 + b"\x80"
+
+    nested: object = None
+    for _ in range(50_000):
+        nested = {"k": nested}
+    data = encode_canonical(nested)
+    assert data == b"\xa1\x61k" * 50_000 + b"\xf6"
+
+
+def test_self_referencing_containers_are_rejected():
+    a: list = []
+    a.append(a)
+    with pytest.raises(ValueError, match="self-referencing"):
+        encode_canonical(a)
+    d: dict = {"x": [1, {}]}
+    d["x"][1]["back"] = d
+    with pytest.raises(ValueError, match="self-referencing"):
+        encode_canonical(d)
+    shared = [1.0, 2.0]
+    assert encode_canonical([shared, shared, {"a": shared}]) == encode_canonical(
+        [[1.0, 2.0], [1.0, 2.0], {"a": [1.0, 2.0]}]
+    )
+
+
+def test_encode_many_matches_single():
+    rng = random.Random(SEED)
+    objs = []
+    for _ in range(300):
+        objs.append(
+            {
+                str(rng.randint(0, 9)): [rng.random(), rng.randint(-500, 500), None]
+                for _ in range(3)
+            }
+        )
+        objs.append(rng.choice([b"", "", 0, -1, 2**63, True]))
+    assert encode_many(objs) == [encode_canonical(o) for o in objs]
+    assert encode_many([]) == []
+
+
+def test_subclasses_encode_as_base_type():
+    assert encode_canonical(_Flag.ON) == encode_canonical(1)
+    assert encode_canonical(_Label("ab")) == encode_canonical("ab")
+    assert encode_canonical(OrderedDict([("b", 1), ("a", 2)])) == encode_canonical(
+        {"a": 2, "b": 1}
+    )
+
+
+def test_wide_heads_and_limits():
+    assert encode_canonical(2**64 - 1) == b"\x1b" + b"\xff" * 8
+    assert encode_canonical(-(2**64)) == b"\x3b" + b"\xff" * 8
+    assert encode_canonical("x" * 70000)[:5] == b"\x7a\x00\x01\x11\x70"
+    with pytest.raises(OverflowError):
+        encode_canonical(2**64)
+    with pytest.raises(TypeError):
+        encode_canonical({1.5j})
@@ -0,0 +1,97 @@
+"""Map-shape cache tests for the canonical CBOR encoder."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import (
+    OMITTED,
+    MapSchema,
+    encode_canonical,
+    encoder_stats,
+)
+
+
+def _reference(obj: dict) -> bytes:
+    items = sorted((encode_canonical(k), encode_canonical(v)) for k, v in obj.items())
+    head = encode_canonical({}) if not items else bytes([0xA0 | len(items)])
+    return head + b"".join(kb + vb for kb, vb in items)
+
+
+def test_repeated_shapes_hit_cache_and_match_reference():
+    before = encoder_stats()["map_shapes"]
+    records = [
+        {
+            "step": i,
+            "operator_id": "Glyphser.Data.NextBatch",
+            "event_hash": f"{i:064x}",
+            "t": i * 2,
+        }
+        for i in range(100)
+    ]
+    for record in records:
+        assert encode_canonical(record) == _reference(record)
+    after = encoder_stats()["map_shapes"]
+    assert after["hits"] - before["hits"] >= 98
+    assert 0.0 <= after["hit_rate"] <= 1.0
+
+
+def test_insertion_order_and_key_types():
+    rng = random.Random(7)
+    keys = ["b", "a", "aa", "é", "", "z" * 30]
+    for _ in range(50):
+        rng.shuffle(keys)
+        obj = {k: rng.randint(-5, 5) for k in keys}
+        assert encode_canonical(obj) == _reference(obj)
+    mixed = {1: "a", 0: "b", "k": None}
+    for _ in range(3):
+        assert encode_canonical(mixed) == _reference(mixed)
+    assert encode_canonical({True: 1, "x": 2}) != encode_canonical({1: 1, "x": 2})
+
+
+def test_shape_cache_is_bounded():
+    for i in range(5000):
+        obj = {f"k{i}": 1, f"j{i}": 2}
+        encode_canonical(obj)
+        encode_canonical(obj)
+    stats = encoder_stats()["map_shapes"]
+    assert stats["entries"] <= stats["max_entries"]
+    assert stats["evictions"] > 0
+
+
+def test_map_schema_matches_dict_encoding():
+    schema = MapSchema(
+        [
+            ("t", "uint"),
+            ("operator_id", "str"),
+            ("digest", "bytes"),
+            ("loss", "float"),
+            ("extra", "any"),
+        ],
+        optional=["loss", "extra"],
+        constants={"kind": "ITER"},
+    )
+    values = (
+        70000,
+        "Glyphser.Data.NextBatch",
+        b"\x01" * 32,
+        0.25,
+        {"b": [1, 2], "a": None},
+    )
+    expected = dict(
+        zip(["t", "operator_id", "digest", "loss", "extra"], values), kind="ITER"
+    )
+    assert schema.encode(values) == encode_canonical(expected)
+    del expected["loss"], expected["extra"]
+    assert schema.encode(values[:3] + (OMITTED, OMITTED)) == encode_canonical(expected)
+
+
+def test_map_schema_rejects_bad_declarations():
+    with pytest.raises(ValueError):
+        MapSchema([("a", "uint"), ("a", "str")])
+    with pytest.raises(ValueError):
+        MapSchema([("a", "decimal")])
+    with pytest.raises(ValueError):
+        MapSchema([("a", "uint")], optional=["b"])
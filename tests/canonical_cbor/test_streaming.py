@@ -0,0 +1,55 @@
+"""Streaming canonical CBOR encoder tests."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import random
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import (
+    encode_canonical,
+    encode_canonical_into,
+)
+from tests.canonical_cbor.random_objects import SEED, rand_obj
+
+
+def test_encode_canonical_into_matches_bytes():
+    rng = random.Random(SEED)
+    for _ in range(200):
+        obj = rand_obj(rng, depth=4, tuples=True)
+        expected = encode_canonical(obj)
+
+        buf = bytearray()
+        assert encode_canonical_into(obj, buf) == len(expected)
+        assert bytes(buf) == expected
+
+        f = io.BytesIO()
+        encode_canonical_into(obj, f)
+        assert f.getvalue() == expected
+
+        h = hashlib.sha256()
+        encode_canonical_into(obj, h)
+        assert h.digest() == hashlib.sha256(expected).digest()
+
+
+def test_encode_canonical_into_large_payload_chunks():
+    obj = {
+        "blob": b"\x01" * 200_000,
+        "rows": [{"x": [float(i)] * 8} for i in range(5000)],
+    }
+    chunks: list[bytes] = []
+
+    class Sink:
+        def write(self, data: bytes) -> None:
+            chunks.append(bytes(data))
+
+    encode_canonical_into(obj, Sink())
+    assert b"".join(chunks) == encode_canonical(obj)
+    assert len(chunks) > 1
+
+
+def test_encode_canonical_into_rejects_unknown_sink():
+    with pytest.raises(TypeError):
+        encode_canonical_into([1], object())
@@ -0,0 +1,70 @@
+"""Frozen-value subtree cache tests."""
+
+from __future__ import annotations
+
+import hashlib
+import pickle
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import (
+    FrozenValue,
+    SubtreeCache,
+    encode_canonical,
+    encode_canonical_into,
+    freeze,
+)
+
+
+def test_frozen_value_splices_identical_bytes():
+    cache = SubtreeCache()
+    row = {"x": [0.0, 1.0, 0.0, 1.0], "y": 1.0}
+    frozen = freeze(row, cache)
+    records = [{"step": i, "batch": frozen} for i in range(5)]
+    expected = [{"step": i, "batch": row} for i in range(5)]
+
+    assert encode_canonical(records) == encode_canonical(expected)
+    h = hashlib.sha256()
+    encode_canonical_into(records, h)
+    assert h.digest() == hashlib.sha256(encode_canonical(expected)).digest()
+    assert frozen.digest == hashlib.sha256(encode_canonical(row)).digest()
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] >= 10
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len(encode_canonical(row))
+
+
+def test_freeze_is_idempotent():
+    frozen = freeze([1, 2])
+    assert freeze(frozen) is frozen
+    assert isinstance(frozen, FrozenValue)
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = SubtreeCache(max_entries=2, max_bytes=1024)
+    a, b, c = (freeze(i, cache) for i in ("a", "b", "c"))
+    for frozen in (a, b, a, c):
+        frozen.encoded
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    b.encoded  # b was least recently used and has been evicted
+    assert cache.stats()["misses"] == 4
+
+    big = freeze(b"\x00" * 2048, cache)
+    assert big.encoded == encode_canonical(b"\x00" * 2048)
+    assert cache.stats()["bytes"] <= 1024
+
+
+def test_cache_bounds_must_be_positive():
+    with pytest.raises(ValueError):
+        SubtreeCache(max_entries=0)
+
+
+def test_frozen_value_pickles_without_its_cache():
+    frozen = freeze({"w": [1.5, 2.5]}, SubtreeCache(max_entries=4))
+    copy = pickle.loads(pickle.dumps(frozen))
+    assert copy.value == frozen.value
+    assert copy.encoded == frozen.encoded
@@ -0,0 +1,87 @@
+"""RFC 8746 typed-array and bulk float encoding tests."""
+
+from __future__ import annotations
+
+import array
+import math
+import struct
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import (
+    encode_canonical,
+    encode_canonical_into,
+)
+from src.glyphser.serialization.canonical_cbor_decode import (
+    decode_canonical,
+    decode_canonical_lazy,
+)
+
+
+def _float_list_reference(values: list[float]) -> bytes:
+    head = encode_canonical([None] * len(values))[: -len(values)]
+    return head + b"".join(b"\xfb" + struct.pack(">d", v) for v in values)
+
+
+def test_float_list_bulk_path_is_byte_identical():
+    values = [i * 0.37 - 5.0 for i in range(20_000)] + [
+        math.inf,
+        -math.inf,
+        -0.0,
+        math.nan,
+    ]
+    assert encode_canonical(values) == _float_list_reference(values)
+    assert encode_canonical(tuple(values[:9])) == _float_list_reference(values[:9])
+    mixed = [1.0] * 10 + [1]
+    assert encode_canonical(mixed) == b"\x8b" + b"".join(
+        encode_canonical(v) for v in mixed
+    )
+
+
+def test_typed_arrays_encode_with_tags():
+    floats = array.array("d", [1.5, -0.0])
+    assert encode_canonical(floats).hex() == "d852503ff80000000000008000000000000000"
+    assert encode_canonical(memoryview(floats)) == encode_canonical(floats)
+    assert (
+        encode_canonical(array.array("q", [1, -2])).hex()
+        == "d84b500000000000000001fffffffffffffffe"
+    )
+    assert encode_canonical(array.array("B", [0, 255])).hex() == "d8404200ff"
+    # Lists never switch to the typed form.
+    assert encode_canonical([1.5, -0.0]) != encode_canonical(floats)
+
+
+def test_byte_memoryview_encodes_as_byte_string():
+    assert encode_canonical(memoryview(b"\x01\x02")) == encode_canonical(b"\x01\x02")
+    data = encode_canonical({"blob": b"\x00" * 10})
+    assert encode_canonical(decode_canonical_lazy(data)["blob"]) == encode_canonical(
+        b"\x00" * 10
+    )
+
+
+def test_typed_arrays_stream_and_roundtrip():
+    values = array.array("d", (i / 7 for i in range(100_000)))
+    obj = {"activations": values, "ids": array.array("q", range(-5, 5))}
+    data = encode_canonical(obj)
+    buf = bytearray()
+    encode_canonical_into(obj, buf)
+    assert bytes(buf) == data
+    decoded = decode_canonical(data)
+    assert decoded["activations"] == values
+    assert decoded["ids"] == obj["ids"]
+    assert decode_canonical_lazy(data)["activations"] == values
+
+
+def test_unsupported_typed_arrays_rejected():
+    with pytest.raises(TypeError):
+        encode_canonical(array.array("f", [1.0]))
+    with pytest.raises(TypeError):
+        encode_canonical(
+            memoryview(array.array("d", [1.0, 2.0])).cast("B").cast("d", (1, 2))
+        )
+
+
+def test_decoder_rejects_bad_typed_arrays():
+    for hex_input in ("d8524701020304050607", "d8520101", "d853480000000000000000"):
+        with pytest.raises(ValueError):
+            decode_canonical(bytes.fromhex(hex_input))
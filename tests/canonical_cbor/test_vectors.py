@@ -2,17 +2,35 @@
 
 from __future__ import annotations
 
-from .vector_loader import load_vectors
-from src.glyphser.serialization.canonical_cbor import encode_canonical_hex, validate_canonical_hex
+import array
+import struct
+
+from src.glyphser.serialization.canonical_cbor import (
+    encode_canonical,
+    encode_canonical_hex,
+    validate_canonical_hex,
+)
+from src.glyphser.serialization.canonical_cbor_decode import decode_canonical
+from tests.canonical_cbor.vector_loader import load_vectors
+
+_TYPECODES = {"uint8": "B", "int64": "q", "float64": "d"}
 
 
 def _materialize_input(raw):
+    if isinstance(raw, list):
+        return [_materialize_input(item) for item in raw]
     if isinstance(raw, dict):
         if "__bytes__" in raw:
             return bytes.fromhex(raw["__bytes__"])
+        if "__float64__" in raw:
+            # Exact bit pattern, for values JSON cannot spell (NaN payloads).
+            return struct.unpack(">d", bytes.fromhex(raw["__float64__"]))[0]
         if "__map__" in raw:
             # Preserve ordering to test canonical sorting.
             return {k: v for k, v in raw["__map__"]}
+        if "__typed_array__" in raw:
+            values = _materialize_input(raw["values"])
+            return array.array(_TYPECODES[raw["__typed_array__"]], values)
     return raw
 
 
@@ -24,3 +42,23 @@ def test_canonical_cbor_vectors():
         validate_canonical_hex(obj, expected)
         actual = encode_canonical_hex(obj)
         assert actual == expected, vector["id"]
+
+
+def test_typed_array_vectors_roundtrip():
+    data = load_vectors()
+    for vector in data["vectors"]:
+        raw = vector["input_json"]
+        if not (isinstance(raw, dict) and "__typed_array__" in raw):
+            continue
+        decoded = decode_canonical(bytes.fromhex(vector["expected_cbor_hex"]))
+        # repr() so NaN elements compare equal to each other.
+        expected = _materialize_input(raw)
+        assert list(map(repr, decoded)) == list(map(repr, expected)), vector["id"]
+
+
+def test_decoder_accepts_float_vectors():
+    for vector in load_vectors()["vectors"]:
+        if "float64" not in vector["id"]:
+            continue
+        data = bytes.fromhex(vector["expected_cbor_hex"])
+        assert encode_canonical(decode_canonical(data)) == data, vector["id"]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import array
+import random
+
+import pytest
+
+from src.glyphser.checkpoint.chunk_store import ChunkStore, chunk_boundaries
+
+
+def _state(seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        f"layer{i}.weight": array.array("d", [rng.random() for _ in range(4096)])
+        for i in range(4)
+    } | {"step": 1}
+
+
+def _store(root) -> ChunkStore:
+    return ChunkStore(root, min_chunk=512, avg_chunk=2048, max_chunk=8192, fsync=False)
+
+
+def test_chunk_boundaries_are_content_defined():
+    data = random.Random(1).randbytes(200_000)
+    ends = chunk_boundaries(data, 512, 2048, 8192)
+    assert ends[-1] == len(data)
+    sizes = [b - a for a, b in zip([0] + ends, ends)]
+    assert all(s <= 8192 for s in sizes) and all(s >= 512 for s in sizes[:-1])
+    shifted = chunk_boundaries(b"xyz" + data, 512, 2048, 8192)
+    assert len(set(e + 3 for e in ends) & set(shifted)) > len(ends) * 0.9
+    with pytest.raises(ValueError):
+        chunk_boundaries(data, 512, 3000, 8192)
+
+
+def test_vectorized_gear_hash_matches_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(2)
+    data = bytes(5000) + rng.randbytes(300_000) + b"\x07" * 9000 + rng.randbytes(1000)
+    monkeypatch.setattr("src.glyphser.checkpoint.chunk_store._GEAR_BLOCK", 4096)
+    fast = chunk_boundaries(data, 512, 2048, 8192)
+    monkeypatch.setattr(
+        "src.glyphser.checkpoint.chunk_store._gear_candidates", lambda data, mask: None
+    )
+    assert chunk_boundaries(data, 512, 2048, 8192) == fast
+
+
+def test_large_entries_use_fixed_size_chunks(tmp_path):
+    store = ChunkStore(
+        tmp_path,
+        min_chunk=512,
+        avg_chunk=2048,
+        max_chunk=8192,
+        fsync=False,
+        cdc_max_entry=4096,
+    )
+    state = _state()
+    store.save("a", state)
+    state["layer1.weight"][3000] = 2.0
+    store.save("b", state)
+    stats = store.last_stats
+    assert stats["chunks_written"] == 1
+    manifest_size = (tmp_path / "manifests" / "b.cbor").stat().st_size
+    assert stats["bytes_written"] - manifest_size == 2048
+    assert store.load("b")["layer1.weight"] == state["layer1.weight"]
+
+
+def test_delta_checkpoint_writes_only_changed_chunks(tmp_path):
+    store = _store(tmp_path)
+    state = _state()
+    first = store.save("step-1", state)
+    full = store.last_stats["bytes_written"]
+
+    state["step"] = 2
+    state["layer2.weight"][100] = -1.0
+    second = store.save("step-2", state)
+    assert store.last_stats["bytes_written"] * 10 < full
+    assert store.last_stats["chunks_reused"] > 0
+
+    assert store.verify("step-1", first) == first
+    restored = _store(tmp_path).load("step-2", second)
+    assert restored["step"] == 2
+    assert restored["layer2.weight"] == state["layer2.weight"]
+    with pytest.raises(ValueError):
+        store.load("step-1", second)
+    with pytest.raises(ValueError):
+        store.save("step-1", state)
+
+
+def _count_chunks(root) -> int:
+    return sum(1 for p in (root / "chunks").rglob("*") if p.is_file())
+
+
+def test_gc_removes_only_unreferenced_chunks(tmp_path):
+    store = _store(tmp_path)
+    store.save("a", _state(0))
+    store.save("b", _state(1))
+    before = _count_chunks(tmp_path)
+    assert store.gc() == 0
+
+    store.delete("a")
+    removed = store.gc()
+    assert removed > 0
+    assert _count_chunks(tmp_path) == before - removed
+    reopened = _store(tmp_path)
+    assert reopened.checkpoints() == ["b"]
+    assert reopened.load("b")["layer0.weight"] == _state(1)["layer0.weight"]
+
+
+def test_tampered_chunk_is_detected(tmp_path):
+    store = _store(tmp_path)
+    store.save("a", _state())
+    victim = next(p for p in (tmp_path / "chunks").rglob("*") if p.is_file())
+    victim.write_bytes(b"\x00" + victim.read_bytes()[1:])
+    with pytest.raises(ValueError):
+        store.verify("a")
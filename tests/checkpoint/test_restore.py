@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import array
+import sys
+
+import pytest
+
+from src.glyphser.checkpoint.restore import restore_checkpoint
+from src.glyphser.checkpoint.sharded import (
+    HEADER_NAME,
+    MANIFEST_NAME,
+    save_sharded_checkpoint,
+)
+from src.glyphser.serialization.canonical_cbor import encode_canonical
+from src.glyphser.serialization.canonical_cbor_decode import decode_canonical
+
+
+def _state() -> dict:
+    state = {
+        f"layer{i}.weight": array.array("d", [i + j / 8 for j in range(32)])
+        for i in range(4)
+    }
+    state["optimizer"] = {"lr": 0.1, "momentum": [0.9, 0.99]}
+    state["rng"] = b"\x01" * 16
+    return state
+
+
+def _save(tmp_path, **kw):
+    return save_sharded_checkpoint(
+        _state(),
+        tmp_path,
+        shard_bytes=0,
+        fsync=False,
+        header={"checkpoint_id": "ckpt-1", "step": 7},
+        **kw,
+    )
+
+
+def test_restore_is_lazy_and_matches_state(tmp_path):
+    digest = _save(tmp_path)
+    with restore_checkpoint(tmp_path, expected_hash=digest) as ckpt:
+        assert ckpt.header["step"] == 7 and ckpt.checkpoint_hash == digest
+        assert sorted(ckpt) == sorted(_state())
+        assert ckpt.loaded_shards == []
+        assert ckpt["optimizer"]["momentum"][1] == 0.99
+        assert ckpt.loaded_shards == [ckpt.shard_of("optimizer")]
+        assert bytes(ckpt["rng"]) == b"\x01" * 16
+        assert ckpt.to_python() == _state()
+        assert ckpt.verify() == digest
+
+
+def test_tensor_buffer_is_zero_copy_big_endian(tmp_path):
+    _save(tmp_path)
+    ckpt = restore_checkpoint(tmp_path)
+    code, payload = ckpt.tensor_buffer("layer2.weight")
+    assert code == "d" and isinstance(payload, memoryview)
+    values = array.array("d", bytes(payload))
+    if sys.byteorder == "little":
+        values.byteswap()
+    assert values == _state()["layer2.weight"]
+    del payload
+    ckpt.close()
+
+
+def test_corrupt_shard_detected_on_first_touch(tmp_path):
+    _save(tmp_path)
+    ckpt = restore_checkpoint(tmp_path)
+    shard = tmp_path / ckpt.shard_of("layer1.weight")
+    data = bytearray(shard.read_bytes())
+    data[-1] ^= 1
+    shard.write_bytes(bytes(data))
+    assert ckpt["layer0.weight"][0] == 0.0
+    with pytest.raises(ValueError, match="shard hash mismatch"):
+        ckpt["layer1.weight"]
+    ckpt.close()
+
+
+def test_header_must_validate_and_match_manifest(tmp_path):
+    _save(tmp_path)
+    with pytest.raises(ValueError, match="checkpoint hash mismatch"):
+        restore_checkpoint(tmp_path, expected_hash="00" * 32)
+    save_sharded_checkpoint(
+        {"x": 1},
+        tmp_path / "other",
+        fsync=False,
+        header={"checkpoint_id": "c", "step": 1},
+    )
+    (tmp_path / HEADER_NAME).write_bytes(
+        (tmp_path / "other" / HEADER_NAME).read_bytes()
+    )
+    with pytest.raises(ValueError, match="manifest hash"):
+        restore_checkpoint(tmp_path)
+    with pytest.raises(ValueError, match="step"):
+        save_sharded_checkpoint(
+            {"x": 1}, tmp_path / "bad", fsync=False, header={"checkpoint_id": "c"}
+        )
+
+
+def test_restore_without_header_checks_the_manifest(tmp_path):
+    _save(tmp_path)
+    digest = save_sharded_checkpoint(_state(), tmp_path, shard_bytes=0, fsync=False)
+    assert not (tmp_path / HEADER_NAME).exists()
+    with restore_checkpoint(tmp_path, expected_hash=digest) as ckpt:
+        assert ckpt.header is None
+        assert ckpt.to_python() == _state()
+    manifest = decode_canonical((tmp_path / MANIFEST_NAME).read_bytes())
+    manifest["shards"][0]["size_bytes"] += 1
+    (tmp_path / MANIFEST_NAME).write_bytes(encode_canonical(manifest))
+    with pytest.raises(ValueError, match="checkpoint_merkle_root mismatch"):
+        restore_checkpoint(tmp_path)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import array
+import hashlib
+
+import pytest
+
+from src.glyphser.checkpoint.sharded import (
+    MANIFEST_NAME,
+    commit_hash,
+    merkle_root,
+    plan_shards,
+    save_sharded_checkpoint,
+    shard_leaf,
+)
+from src.glyphser.serialization.canonical_cbor_decode import decode_canonical
+
+
+def _state() -> dict:
+    return {
+        f"layer{i}.weight": array.array("d", [float(i * 100 + j) for j in range(64)])
+        for i in range(6)
+    } | {"step": 12, "optimizer.lr": [0.1, 0.01]}
+
+
+def test_merkle_root_rules():
+    a, b, c = (hashlib.sha256(x).digest() for x in (b"a", b"b", b"c"))
+    assert merkle_root([]) == commit_hash("ckpt_merkle_root", [])
+    assert merkle_root([a]) == a
+    ab = commit_hash("ckpt_merkle_node", [a, b])
+    cc = commit_hash("ckpt_merkle_node", [c, c])
+    assert merkle_root([a, b, c]) == commit_hash("ckpt_merkle_node", [ab, cc])
+
+
+def test_plan_shards_respects_budget():
+    state = _state()
+    assert plan_shards(state, 0) == [[k] for k in sorted(state)]
+    groups = plan_shards(state, 1100)
+    assert [k for g in groups for k in g] == sorted(state)
+    assert all(sum("weight" in k for k in g) <= 2 for g in groups)
+    with pytest.raises(ValueError):
+        plan_shards(state, -1)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_save_sharded_checkpoint_manifest(tmp_path, workers):
+    state = _state()
+    digest = save_sharded_checkpoint(
+        state, tmp_path, shard_bytes=1100, workers=workers, fsync=False
+    )
+    manifest_bytes = (tmp_path / MANIFEST_NAME).read_bytes()
+    assert digest == hashlib.sha256(manifest_bytes).hexdigest()
+
+    manifest = decode_canonical(manifest_bytes)
+    shards = manifest["shards"]
+    assert [s["path"] for s in shards] == sorted(s["path"] for s in shards)
+    restored = {}
+    for s in shards:
+        data = (tmp_path / s["path"]).read_bytes()
+        assert hashlib.sha256(data).digest() == s["sha256"]
+        assert len(data) == s["size_bytes"]
+        restored.update(decode_canonical(data))
+    assert restored == {
+        k: (list(v) if isinstance(v, list) else v) for k, v in state.items()
+    }
+    leaves = [shard_leaf(s["path"], s["sha256"], s["size_bytes"]) for s in shards]
+    assert manifest["checkpoint_merkle_root"] == merkle_root(leaves)
+
+
+def test_sharded_checkpoint_is_deterministic_across_workers(tmp_path):
+    state = _state()
+    serial = save_sharded_checkpoint(
+        state, tmp_path / "a", shard_bytes=512, fsync=False
+    )
+    parallel = save_sharded_checkpoint(
+        state, tmp_path / "b", shard_bytes=512, workers=2, fsync=False
+    )
+    assert serial == parallel
+    extra = save_sharded_checkpoint(
+        state,
+        tmp_path / "c",
+        shard_bytes=512,
+        fsync=False,
+        extra_manifest={"dataset_snapshot_id": "ds-1"},
+    )
+    assert extra != serial
+    manifest = decode_canonical((tmp_path / "c" / MANIFEST_NAME).read_bytes())
+    assert manifest["dataset_snapshot_id"] == "ds-1"
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import array
+import json
+
+import pytest
+
+from src.glyphser.data.collate import collate, collate_snapshot
+from src.glyphser.data.next_batch import next_batch
+from src.glyphser.data.snapshot import SnapshotDataset, build_snapshot
+
+ROWS = [
+    {"x": [float(i), i + 0.5], "y": i * 2.0, "id": i, "tag": "t" * i} for i in range(6)
+]
+
+
+def test_collate_rows_into_flat_arrays():
+    batch, _ = next_batch(ROWS, 1, 3)
+    cols = collate(batch)
+    assert cols["x"].shape == (3, 2)
+    assert cols["x"].data == array.array("d", [1.0, 1.5, 2.0, 2.5, 3.0, 3.5])
+    assert cols["id"].dtype == "int64" and list(cols["id"].data) == [1, 2, 3]
+    assert cols["tag"].dtype == "cbor" and cols["tag"].data == ["t", "tt", "ttt"]
+    assert set(collate(batch, columns=["y"])) == {"y"}
+    with pytest.raises(KeyError):
+        collate(batch, columns=["nope"])
+    with pytest.raises(ValueError):
+        collate(batch, backend="torch")
+
+
+def test_collate_snapshot_matches_row_collation(tmp_path):
+    source = tmp_path / "d.jsonl"
+    source.write_text("\n".join(json.dumps(r) for r in ROWS), encoding="utf-8")
+    build_snapshot(source, tmp_path / "snap", fsync=False)
+    with SnapshotDataset(tmp_path / "snap") as ds:
+        cols, cursor = collate_snapshot(ds, 4, 4)
+        rows, expected_cursor = next_batch(ROWS, 4, 4)
+        assert cursor == expected_cursor == 0
+        expected = collate(rows)
+        for name, column in cols.items():
+            assert column.shape == expected[name].shape
+            assert column.dtype == expected[name].dtype
+            assert list(column.data) == list(expected[name].data)
+        assert isinstance(cols["x"].data, memoryview)
+        del cols, column
+
+
+def test_numpy_backend_views_buffers():
+    np = pytest.importorskip("numpy")
+    cols = collate(ROWS[:2], backend="numpy")
+    assert isinstance(cols["x"].data, np.ndarray) and cols["x"].data.shape == (2, 2)
+    assert cols["x"].data[1, 1] == 1.5
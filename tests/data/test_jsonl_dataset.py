@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import os
+import pickle
+
+import pytest
+
+from src.glyphser.data.jsonl_dataset import LINE_INDEX_SUFFIX, JsonlDataset
+from src.glyphser.data.next_batch import next_batch
+
+
+def _write(path, rows, blank=False):
+    lines = [json.dumps(r) for r in rows]
+    if blank:
+        lines.insert(1, "   ")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_rows_match_eager_load_and_next_batch(tmp_path):
+    path = tmp_path / "d.jsonl"
+    rows = [{"id": i, "x": [i, i + 0.5]} for i in range(7)]
+    _write(path, rows, blank=True)
+    with JsonlDataset(path) as ds:
+        assert len(ds) == 7 and ds[0] == rows[0] and ds[-1] == rows[-1]
+        assert ds[2:5] == rows[2:5] and ds[::3] == rows[::3]
+        assert next_batch(ds, 5, 4) == (rows[5:7], 0)
+        assert ds.rows([6, 0]) == [rows[6], rows[0]]
+        with pytest.raises(IndexError):
+            ds[7]
+    assert (tmp_path / ("d.jsonl" + LINE_INDEX_SUFFIX)).exists()
+
+
+def test_cached_index_reused_and_rebuilt_when_stale(tmp_path):
+    path = tmp_path / "d.jsonl"
+    _write(path, [{"i": i} for i in range(3)])
+    JsonlDataset(path).close()
+    index = tmp_path / ("d.jsonl" + LINE_INDEX_SUFFIX)
+    stamp = index.stat().st_mtime_ns
+    with JsonlDataset(path) as ds:
+        assert len(ds) == 3
+    assert index.stat().st_mtime_ns == stamp
+    _write(path, [{"i": i} for i in range(5)])
+    os.utime(path, ns=(stamp + 10**9, stamp + 10**9))
+    with JsonlDataset(path) as ds:
+        assert len(ds) == 5 and ds[4] == {"i": 4}
+
+
+def test_empty_file_and_no_cache(tmp_path):
+    path = tmp_path / "empty.jsonl"
+    path.write_bytes(b"")
+    assert len(JsonlDataset(path, cache_index=False)) == 0
+    assert not (tmp_path / ("empty.jsonl" + LINE_INDEX_SUFFIX)).exists()
+
+
+def test_pickle_reopens_from_path(tmp_path):
+    path = tmp_path / "d.jsonl"
+    rows = [{"i": i} for i in range(4)]
+    _write(path, rows)
+    with JsonlDataset(path) as ds:
+        blob = pickle.dumps(ds)
+    with pickle.loads(blob) as copy:
+        assert copy[:] == rows
+    _write(path, rows[:2])
+    os.utime(path, ns=(1, 1))
+    with pytest.raises(ValueError, match="changed"):
+        pickle.loads(blob)
+
+
+@pytest.mark.parametrize("sep", ["\r\n", "\r", "\x0c", "\u2028", "\x85"])
+def test_line_breaks_match_splitlines(tmp_path, sep):
+    text = sep.join(['{"a": 1}', "", '{"b": "é"}', " ", '{"c": 3}']) + "\n" + '{"d": 4}'
+    path = tmp_path / "d.jsonl"
+    path.write_bytes(text.encode("utf-8"))
+    expected = [json.loads(line) for line in text.splitlines() if line.strip()]
+    with JsonlDataset(path) as ds:
+        assert ds[:] == expected
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import pytest
+
+from src.glyphser.data.next_batch import (
+    derive_epoch_seed,
+    next_batch,
+    next_batch_indices,
+    seeded_block_permute,
+    seeded_intra_block_map,
+    virtual_order_indices,
+)
+
+SEED = derive_epoch_seed(bytes(32), "m", "ds", 0)
+KW = {"kernel_replay_token": bytes(32), "manifest_hash": "m", "dataset_key": "ds"}
+
+
+def test_pinned_vectors():
+    assert SEED.hex() == "f5952c1b59c2e2a53254e7116b14ce1e"
+    assert list(seeded_block_permute(8, SEED)) == [6, 1, 5, 3, 2, 4, 7, 0]
+    assert virtual_order_indices(0, 10, 10, SEED, 4) == [1, 0, 3, 2, 6, 5, 4, 7, 8, 9]
+
+
+def test_block_permute_and_intra_map_are_bijections():
+    assert sorted(seeded_block_permute(1000, SEED)) == list(range(1000))
+    assert list(seeded_block_permute(1, SEED)) == [0]
+    for n, block_size in ((37, 8), (64, 8), (10, 3)):
+        for block in range((n + block_size - 1) // block_size):
+            start = block * block_size
+            m = min(block_size, n - start)
+            mapped = [
+                seeded_intra_block_map(block, i, block_size, SEED, n) for i in range(m)
+            ]
+            assert sorted(mapped) == list(range(start, start + m))
+    with pytest.raises(ValueError):
+        seeded_intra_block_map(5, 0, 8, SEED, 37)
+
+
+def test_train_epoch_is_a_permutation_and_batching_invariant():
+    n, block = 1003, 64
+    whole = virtual_order_indices(0, n, n, SEED, block)
+    assert sorted(whole) == list(range(n)) and whole != list(range(n))
+    # The short tail block is not permuted with the full blocks.
+    assert set(whole[-(n % block) :]) == set(range(n - n % block, n))
+    seen, cursor = [], {"epoch": 0, "global_index": 0}
+    while cursor["epoch"] == 0:
+        indices, cursor, meta = next_batch_indices(
+            n, cursor, 100, stage_type="train", sampler_block_size=block, **KW
+        )
+        assert meta["is_shuffled"] and meta["effective_batch_size"] == 100
+        seen.extend(indices)
+    assert sorted(seen) == list(range(n)) and len(indices) == 3
+    assert cursor == {"epoch": 1, "global_index": 0}
+    again, _, _ = next_batch_indices(
+        n, {"epoch": 0, "global_index": 0}, n, sampler_block_size=block, **KW
+    )
+    assert again == seen
+    next_epoch, _, _ = next_batch_indices(n, cursor, n, sampler_block_size=block, **KW)
+    assert next_epoch != seen
+
+
+def test_large_cardinality_without_materializing():
+    n = 10**12 + 7
+    cursor = {"epoch": 3, "global_index": 5 * 10**11}
+    indices, cursor, _ = next_batch_indices(
+        n, cursor, 256, sampler_block_size=1 << 30, **KW
+    )
+    assert len(set(indices)) == 256 and all(0 <= i < n for i in indices)
+    assert cursor == {"epoch": 3, "global_index": 5 * 10**11 + 256}
+
+
+def test_eval_is_sequential_and_wraps():
+    indices, cursor, meta = next_batch_indices(
+        5, {"epoch": 0, "global_index": 3}, 4, stage_type="eval", **KW
+    )
+    assert indices == [3, 4, 0, 1] and cursor == {"epoch": 1, "global_index": 0}
+    assert meta["sampling_mode"] == "SEQUENTIAL_V1"
+    assert meta["subsampling_mode"] == "NONE"
+    with pytest.raises(ValueError, match="INVALID_STAGE_TYPE"):
+        next_batch_indices(
+            5, {"epoch": 0, "global_index": 0}, 1, stage_type="test", **KW
+        )
+
+
+@pytest.mark.parametrize("stage_type", ["train", "eval"])
+@pytest.mark.parametrize("drop_last", [False, True])
+def test_rank_shards_reconstruct_global_sequence(stage_type, drop_last):
+    n, gbs = 103, 24
+    reference = []
+    cursor = {"epoch": 0, "global_index": 0}
+    while cursor["epoch"] == 0:
+        indices, cursor, _ = next_batch_indices(
+            n,
+            cursor,
+            gbs,
+            stage_type=stage_type,
+            drop_last=drop_last,
+            sampler_block_size=16,
+            **KW,
+        )
+        reference.append(indices)
+    for world_size in (2, 4, 8):
+        cursor = {"epoch": 0, "global_index": 0}
+        for expected in reference:
+            shards = []
+            for rank in range(world_size):
+                indices, nxt, meta = next_batch_indices(
+                    n,
+                    cursor,
+                    gbs,
+                    world_size=world_size,
+                    rank=rank,
+                    stage_type=stage_type,
+                    drop_last=drop_last,
+                    sampler_block_size=16,
+                    **KW,
+                )
+                assert len(indices) <= meta["micro_batch_size"] == gbs // world_size
+                shards.extend(indices)
+            assert shards == expected
+            cursor = nxt
+        assert cursor == {"epoch": 1, "global_index": 0}
+    if stage_type == "train":
+        assert sum(map(len, reference)) == (96 if drop_last else n)
+    else:
+        wrapped = [96, 97, 98, 99, 100, 101, 102, 0, 1, 2, 3, 4]
+        assert reference[-1] == wrapped + list(range(5, 17))
+
+
+def test_shard_validation():
+    cursor = {"epoch": 0, "global_index": 0}
+    with pytest.raises(ValueError, match="BATCH_SIZE_INCONSISTENT"):
+        next_batch_indices(100, cursor, 10, world_size=4, **KW)
+    with pytest.raises(ValueError, match="BATCH_SIZE_INCONSISTENT"):
+        next_batch_indices(10, cursor, 16, drop_last=True, **KW)
+    with pytest.raises(ValueError, match="rank"):
+        next_batch_indices(100, cursor, 8, world_size=4, rank=4, **KW)
+    with pytest.raises(ValueError, match="uint64"):
+        next_batch_indices(1 << 64, cursor, 8, **KW)
+    with pytest.raises(ValueError, match="GLOBAL_POSITION"):
+        next_batch_indices(
+            100, {"epoch": 0, "global_index": 96}, 8, drop_last=True, **KW
+        )
+
+
+def test_next_batch_sequence_shards():
+    data = list(range(10))
+    assert next_batch(data, 0, 4) == ([0, 1, 2, 3], 4)
+    assert next_batch(data, 8, 4) == ([8, 9], 0)
+    shards = [next_batch(data, 8, 4, world_size=2, rank=r)[0] for r in (0, 1)]
+    assert shards == [[8, 9], []]
+    assert next_batch(data, 4, 4, world_size=2, rank=1) == ([6, 7], 8)
+    assert next_batch(data, 4, 4, drop_last=True) == ([4, 5, 6, 7], 0)
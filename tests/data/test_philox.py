@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import pytest
+
+from src.glyphser.data.philox import philox4x32_10, philox4x32_10_many
+
+# Known-answer vectors published with Random123 (kat_vectors, philox4x32 10 rounds).
+KAT = [
+    ((0, 0, 0, 0), (0, 0), (0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8)),
+    (
+        (0xFFFFFFFF,) * 4,
+        (0xFFFFFFFF,) * 2,
+        (0x408F276D, 0x41C83B0E, 0xA20BC7C6, 0x6D5451FD),
+    ),
+    (
+        (0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344),
+        (0xA4093822, 0x299F31D0),
+        (0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1),
+    ),
+]
+
+
+@pytest.mark.parametrize("counter,key,expected", KAT)
+def test_philox_known_answers(counter, key, expected):
+    assert philox4x32_10(counter, key) == expected
+    assert list(philox4x32_10_many([counter], key)) == [expected]
+
+
+def test_philox_many_matches_scalar_and_rejects_wide_words():
+    key = (7, 0xDEADBEEF)
+    counters = [(i, i >> 1, 3, 0xFFFFFFFF) for i in range(50)]
+    expected = [philox4x32_10(c, key) for c in counters]
+    assert list(philox4x32_10_many(counters, key)) == expected
+    with pytest.raises(ValueError):
+        philox4x32_10((1 << 32, 0, 0, 0), (0, 0))
+    with pytest.raises(ValueError):
+        list(philox4x32_10_many([(0, 0, 0, -1)], (0, 0)))
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import time
+from itertools import islice
+
+import pytest
+
+from src.glyphser.data.jsonl_dataset import JsonlDataset
+from src.glyphser.data.next_batch import next_batch
+from src.glyphser.data.pipeline import BatchPipeline
+
+
+def _serial(dataset, batch_size, cursor, steps, **kw):
+    out = []
+    for _ in range(steps):
+        batch, cursor = next_batch(dataset, cursor, batch_size, **kw)
+        out.append(batch)
+    return out, cursor
+
+
+def _slow_decode(row):
+    # Later rows finish first, so completion order differs from cursor order.
+    time.sleep(0.002 * (5 - row % 5))
+    return row * 10
+
+
+def test_pipeline_matches_serial_order_and_cursor():
+    dataset = list(range(23))
+    expected, cursor = _serial(dataset, 4, 0, 9)
+    with BatchPipeline(
+        dataset, 4, decode=_slow_decode, collate=tuple, prefetch=4, workers=3
+    ) as pipe:
+        got = list(islice(pipe, 9))
+        assert pipe.cursor == cursor
+    assert got == [tuple(r * 10 for r in batch) for batch in expected]
+
+
+def test_pipeline_resume_from_saved_cursor():
+    dataset = list(range(17))
+    expected, _ = _serial(dataset, 3, 5, 8, world_size=3, rank=1, drop_last=True)
+    with BatchPipeline(
+        dataset, 3, 5, world_size=3, rank=1, drop_last=True, prefetch=3
+    ) as pipe:
+        head = list(islice(pipe, 3))
+        saved = pipe.cursor
+    with BatchPipeline(dataset, 3, saved, world_size=3, rank=1, drop_last=True) as pipe:
+        tail = list(islice(pipe, 5))
+        pipe.seek(saved)
+        assert next(pipe) == tail[0]
+    assert head + tail == expected
+
+
+def test_pipeline_worker_error_raised_in_order():
+    failures = [6]
+
+    def decode(row):
+        if row in failures:
+            failures.remove(row)
+            raise RuntimeError("bad row")
+        return row
+
+    with BatchPipeline(list(range(10)), 3, decode=decode, prefetch=3) as pipe:
+        assert next(pipe) == [0, 1, 2] and next(pipe) == [3, 4, 5]
+        with pytest.raises(RuntimeError, match="bad row"):
+            next(pipe)
+        assert pipe.cursor == 6
+        assert next(pipe) == [6, 7, 8]
+
+
+def test_pipeline_with_process_workers():
+    dataset = [json.dumps({"x": i}) for i in range(7)]
+    with BatchPipeline(
+        dataset, 2, decode=json.loads, workers=2, use_processes=True
+    ) as pipe:
+        got = list(islice(pipe, 4))
+    assert got == [
+        [{"x": 0}, {"x": 1}],
+        [{"x": 2}, {"x": 3}],
+        [{"x": 4}, {"x": 5}],
+        [{"x": 6}],
+    ]
+
+
+def test_pipeline_spawned_workers_reopen_mapped_dataset(tmp_path):
+    path = tmp_path / "d.jsonl"
+    path.write_text(
+        "".join(json.dumps({"x": i}) + "\n" for i in range(5)), encoding="utf-8"
+    )
+    with JsonlDataset(path) as dataset:
+        expected, _ = _serial(dataset, 2, 0, 3)
+        context = multiprocessing.get_context("spawn")
+        with BatchPipeline(dataset, 2, use_processes=True, mp_context=context) as pipe:
+            assert list(islice(pipe, 3)) == expected
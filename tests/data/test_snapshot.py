@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import pickle
+
+import pytest
+
+from src.glyphser.data.next_batch import next_batch
+from src.glyphser.data.snapshot import (
+    SnapshotDataset,
+    build_snapshot,
+    infer_schema,
+    validate_snapshot,
+)
+
+ROWS = [
+    {
+        "x": [0.0, 1.0, 0.5],
+        "y": 1.0,
+        "id": 0,
+        "ok": True,
+        "tag": "a",
+        "extra": {"k": [1]},
+    },
+    {"x": [1.0, 0.0, 0.25], "y": 2.5, "id": 1, "ok": False, "tag": "bb"},
+    {"x": [2.0, 3.0, 4.0], "y": -1.0, "id": -7, "ok": True, "tag": "", "extra": None},
+    {
+        "x": [5.0, 6.0, 7.0],
+        "y": 0.0,
+        "id": 1 << 40,
+        "ok": False,
+        "tag": "ccc",
+        "extra": [1, "two"],
+    },
+    {"x": [8.0, 9.0, 1.5], "y": 3.0, "id": 3, "ok": True, "tag": "d"},
+]
+
+
+@pytest.fixture()
+def snapshot(tmp_path):
+    source = tmp_path / "data.jsonl"
+    source.write_text("\n".join(json.dumps(r) for r in ROWS) + "\n\n", encoding="utf-8")
+    digest = build_snapshot(source, tmp_path / "snap", fsync=False)
+    return tmp_path / "snap", digest
+
+
+def test_infer_schema():
+    schema = {name: (dtype, shape) for name, dtype, shape in infer_schema(ROWS)}
+    assert schema == {
+        "x": ("float64", (3,)),
+        "y": ("float64", ()),
+        "id": ("int64", ()),
+        "ok": ("bool", ()),
+        "tag": ("cbor", ()),
+        "extra": ("cbor", ()),
+    }
+    assert infer_schema([{"a": 1}, {"a": 1.0}]) == [("a", "cbor", ())]
+    assert infer_schema([{"a": [1, 2]}, {"a": [1]}]) == [("a", "cbor", ())]
+
+
+def test_rows_round_trip_and_next_batch(snapshot):
+    directory, digest = snapshot
+    with SnapshotDataset(directory, expected_hash=digest) as ds:
+        assert len(ds) == 5 and ds[:] == ROWS and ds[-1] == ROWS[-1]
+        assert next_batch(ds, 3, 4) == (ROWS[3:], 0)
+
+
+def test_pickle_reopens_and_checks_hash(snapshot):
+    directory, digest = snapshot
+    with SnapshotDataset(directory) as ds:
+        blob = pickle.dumps(ds)
+    assert len(blob) < 1024
+    with pickle.loads(blob) as copy:
+        assert copy.snapshot_hash == digest and copy[:] == ROWS
+
+
+def test_column_batches_are_zero_copy_slices(snapshot):
+    directory, _ = snapshot
+    ds = SnapshotDataset(directory)
+    cols, cursor = ds.next_column_batch(
+        2, 4, world_size=2, rank=1, columns=["x", "id", "tag"]
+    )
+    assert cursor == 0
+    assert isinstance(cols["x"], memoryview) and cols["x"].format == "d"
+    assert list(cols["x"]) == [8.0, 9.0, 1.5]
+    assert list(cols["id"]) == [3] and cols["tag"] == ["d"]
+    assert ds.column_slice("extra", 0, 5) == [{"k": [1]}, None, None, [1, "two"], None]
+    del cols
+    ds.close()
+
+
+def test_validate_snapshot_detects_tampering(snapshot):
+    directory, digest = snapshot
+    assert validate_snapshot(directory, digest) == digest
+    with pytest.raises(ValueError, match="hash mismatch"):
+        validate_snapshot(directory, "00" * 32)
+    column = directory / "columns" / "c1.bin"
+    data = bytearray(column.read_bytes())
+    data[0] ^= 1
+    column.write_bytes(bytes(data))
+    assert validate_snapshot(directory, digest, deep=False) == digest
+    with pytest.raises(ValueError, match="c1.bin"):
+        validate_snapshot(directory, digest)
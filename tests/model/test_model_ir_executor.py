@@ -0,0 +1,197 @@
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from src.glyphser.model.model_ir_executor import execute, execute_ir, topo_sort_nodes
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _node(node_id, instr, inputs=(), **params):
+    return {
+        "node_id": node_id,
+        "instr": instr,
+        "inputs": list(inputs),
+        "params": params,
+    }
+
+
+def _unary_ir(instr, **params):
+    nodes = [_node("x", "INPUT"), _node("y", instr, ["x"], **params)]
+    return {"nodes": nodes + [_node("o", "OUTPUT", ["y"])]}
+
+
+MLP = {
+    "nodes": [
+        _node("y", "OUTPUT", ["p"]),
+        _node("p", "SOFTMAX", ["z"]),
+        _node("z", "ADD", ["m", "b"]),
+        _node("m", "MATMUL", ["h", "w2"]),
+        _node("h", "RELU", ["a"]),
+        _node("a", "MATMUL", ["x", "w1"]),
+        _node("x", "INPUT"),
+        _node("w1", "PARAM", name="w1"),
+        _node("w2", "PARAM", name="w2"),
+        _node("b", "CONST", value=[0.5, -0.5]),
+    ]
+}
+THETA = {
+    "w1": [[1.0, -1.0, 0.5], [2.0, 0.0, -1.0]],
+    "w2": [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+}
+
+
+def test_topo_sort_is_kahn_with_lowest_id_first():
+    order = [n["node_id"] for n in topo_sort_nodes(MLP)]
+    assert order == ["b", "w1", "w2", "x", "a", "h", "m", "z", "p", "y"]
+
+
+def test_topo_sort_rejects_cycles_and_dangling_inputs():
+    cyclic = {
+        "nodes": [_node(0, "INPUT"), _node(1, "ADD", [0, 2]), _node(2, "RELU", [1])]
+    }
+    with pytest.raises(ValueError, match="CYCLE_DETECTED"):
+        topo_sort_nodes(cyclic)
+    with pytest.raises(ValueError, match="INVALID_IR"):
+        topo_sort_nodes({"nodes": [_node(0, "RELU", [7])]})
+    with pytest.raises(ValueError, match="INVALID_IR"):
+        topo_sort_nodes({"nodes": [_node(0, "INPUT"), _node(0, "INPUT")]})
+
+
+def test_mlp_forward_python_backend():
+    out = execute_ir(MLP, {"x": [[1.0, 2.0], [-1.0, 0.0]]}, THETA, backend="python")
+    # row 0: a = [5, -1, -1.5] -> h = [5, 0, 0] -> z = [5.5, -0.5]
+    # row 1: a = [-1, 1, -0.5] -> h = [0, 1, 0] -> z = [0.5, 0.5]
+    e = math.exp(-6.0)
+    expected = [[1.0 / (1.0 + e), e / (1.0 + e)], [0.5, 0.5]]
+    for row, want in zip(out["y"], expected):
+        assert row == pytest.approx(want, abs=1e-15)
+
+
+def test_python_and_numpy_backends_agree():
+    np = pytest.importorskip("numpy")
+    x = {"x": [[1.0, 2.0], [-1.0, 0.0], [0.25, 3.0]]}
+    ref = execute_ir(MLP, x, THETA, backend="python")["y"]
+    got = execute_ir(MLP, x, THETA, backend="numpy")["y"]
+    assert isinstance(got, np.ndarray) and got.dtype == np.float64
+    assert np.allclose(got, ref, rtol=0, atol=1e-12)
+
+
+UNARY = [(op, {}) for op in ("RELU", "SIGMOID", "TANH", "GELU", "EXP", "SOFTMAX")]
+UNARY += [
+    (op, {"axis": axis}) for op in ("SUM", "MEAN", "MAX") for axis in (None, 0, -1)
+]
+
+
+@pytest.mark.parametrize("instr,params", UNARY)
+def test_numpy_kernels_match_python_kernels(instr, params):
+    np = pytest.importorskip("numpy")
+    ir = _unary_ir(instr, **params)
+    x = {"x": [[-2.5, -0.5, 0.0], [0.75, 1.5, 3.0]]}
+    ref = execute_ir(ir, x, backend="python")["o"]
+    got = execute_ir(ir, x, backend="numpy")["o"]
+    assert np.asarray(got).dtype == np.float64
+    assert np.allclose(got, ref, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("instr", ["ADD", "SUB", "MUL", "MATMUL"])
+def test_numpy_binary_kernels_match_python_kernels(instr):
+    np = pytest.importorskip("numpy")
+    ir = {
+        "nodes": [
+            _node("a", "INPUT"),
+            _node("b", "INPUT"),
+            _node("y", instr, ["a", "b"]),
+            _node("o", "OUTPUT", ["y"]),
+        ]
+    }
+    inputs = {
+        "a": [[1.0, -2.0], [0.5, 4.0]],
+        "b": [[3.0, 0.25], [-1.0, 2.0]] if instr == "MATMUL" else [10.0, -1.0],
+    }
+    ref = execute_ir(ir, inputs, backend="python")["o"]
+    got = execute_ir(ir, inputs, backend="numpy")["o"]
+    assert np.allclose(got, ref, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_empty_reductions_are_shape_mismatches(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    for instr in ("MEAN", "MAX"):
+        ir = _unary_ir(instr, axis=-1)
+        with pytest.raises(ValueError, match="SHAPE_MISMATCH"):
+            execute_ir(ir, {"x": [[], []]}, backend=backend)
+    ir = _unary_ir("SUM", axis=-1)
+    assert list(execute_ir(ir, {"x": [[], []]}, backend=backend)["o"]) == [0.0, 0.0]
+
+
+def test_reductions_activations_and_broadcasting():
+    ir = {
+        "nodes": [
+            _node("x", "INPUT"),
+            _node("s", "SUM", ["x"], axis=0),
+            _node("m", "MEAN", ["x"], axis=-1),
+            _node("t", "MAX", ["x"]),
+            _node("g", "MUL", ["x", "k"]),
+            _node("k", "CONST", value=2.0),
+            _node("o1", "OUTPUT", ["s"]),
+            _node("o2", "OUTPUT", ["m"]),
+            _node("o3", "OUTPUT", ["t"]),
+            _node("o4", "OUTPUT", ["g"]),
+            _node("o5", "OUTPUT", ["sg"]),
+            _node("sg", "SIGMOID", ["x"]),
+        ]
+    }
+    x = [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+    out = execute_ir(ir, {"x": x}, backend="python")
+    assert out["o1"] == [5.0, 7.0, 9.0]
+    assert out["o2"] == [2.0, 5.0]
+    assert out["o3"] == 6.0
+    assert out["o4"] == [[2.0, 4.0, 6.0], [8.0, 10.0, 12.0]]
+    assert out["o5"][0][0] == pytest.approx(1.0 / (1.0 + math.exp(-1.0)), abs=1e-15)
+
+
+def test_dispatch_errors():
+    bad_shape = {
+        "nodes": [
+            _node("a", "INPUT"),
+            _node("b", "INPUT"),
+            _node("c", "MATMUL", ["a", "b"]),
+        ]
+    }
+    with pytest.raises(ValueError, match="SHAPE_MISMATCH"):
+        execute_ir(bad_shape, {"a": [[1.0, 2.0]], "b": [[1.0, 2.0]]}, backend="python")
+    unsupported = {"nodes": [_node("a", "INPUT"), _node("b", "CONV2D", ["a"])]}
+    with pytest.raises(ValueError, match="PRIMITIVE_UNSUPPORTED"):
+        execute_ir(unsupported, {"a": [1.0]}, backend="python")
+    with pytest.raises(ValueError, match="INVALID_IR"):
+        execute_ir(MLP, {"x": [[1.0, 2.0]]}, {}, backend="python")
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_unconvertible_inputs_are_coded_errors(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    ir = _unary_ir("RELU")
+    with pytest.raises(ValueError, match="SHAPE_MISMATCH: node 'x'"):
+        execute_ir(ir, {"x": [[1.0, "a"], [2.0, 3.0]]}, backend=backend)
+    with pytest.raises(ValueError, match="INVALID_IR: node 'x'"):
+        execute_ir(ir, {"x": [{"a": 1}]}, backend=backend)
+    if backend == "numpy":
+        with pytest.raises(ValueError, match="SHAPE_MISMATCH: node 'x'"):
+            execute_ir(ir, {"x": [[1.0, 2.0], [3.0]]}, backend=backend)
+
+
+def test_execute_keeps_placeholder_semantics_without_nodes():
+    path = ROOT / "fixtures" / "hello-core" / "model_ir.json"
+    ir = json.loads(path.read_text(encoding="utf-8"))
+    assert execute(ir, [1.0, 2.0]) == [1.0, 2.0]
+    assert execute({"scale": 2.0, "bias": 1.0}, [1.0, -1.0]) == [3.0, -1.0]
+
+
+def test_execute_runs_node_graphs():
+    ir = {"nodes": [_node(0, "INPUT"), _node(1, "TANH", [0]), _node(2, "OUTPUT", [1])]}
+    assert execute(ir, [0.0, 1.0]) == pytest.approx([0.0, math.tanh(1.0)])
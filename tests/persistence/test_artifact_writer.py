@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import hashlib
+import json
+
+from src.glyphser.checkpoint.write import save_checkpoint, save_checkpoint_digests
+from src.glyphser.persistence.artifact_writer import write_artifact
+from src.glyphser.persistence.background_writer import PersistenceService
+from src.glyphser.serialization.canonical_cbor import encode_canonical
+
+
+def test_digests_match_separate_serializations(tmp_path):
+    obj = {"b": [1, 2.5, None], "a": {"z": "é", "y": True}}
+    digests = write_artifact(obj, tmp_path / "a.json", "checkpoint")
+    text = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+    assert (tmp_path / "a.json").read_text(encoding="utf-8") == text + "\n"
+    assert digests.json_sha256 == hashlib.sha256(text.encode("utf-8")).hexdigest()
+    commit_bytes = encode_canonical(["checkpoint", obj])
+    assert digests.commit_hash == hashlib.sha256(commit_bytes).hexdigest()
+    assert save_checkpoint(obj, tmp_path / "b.json") == digests.commit_hash
+
+
+def test_queued_write_returns_same_digests(tmp_path):
+    state = {"checkpoint_id": "c1", "step": 3}
+    sync = save_checkpoint_digests(state, tmp_path / "sync.json")
+    with PersistenceService() as service:
+        queued = save_checkpoint_digests(state, tmp_path / "bg.json", service=service)
+    assert queued == sync
+    assert (tmp_path / "bg.json").read_bytes() == (tmp_path / "sync.json").read_bytes()
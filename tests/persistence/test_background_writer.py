@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from src.glyphser.certificate.build import write_execution_certificate
+from src.glyphser.checkpoint.write import save_checkpoint
+from src.glyphser.persistence.background_writer import (
+    PersistenceService,
+    atomic_write_bytes,
+)
+from src.glyphser.trace.trace_sidecar import write_trace
+
+
+def test_atomic_write_replaces_without_leftovers(tmp_path):
+    path = tmp_path / "sub" / "artifact.bin"
+    atomic_write_bytes(path, b"first")
+    atomic_write_bytes(path, b"second", fsync=False)
+    assert path.read_bytes() == b"second"
+    assert sorted(p.name for p in path.parent.iterdir()) == ["artifact.bin"]
+
+
+def test_service_outputs_match_synchronous_writers(tmp_path):
+    records = [{"t": i, "operator_id": "Glyphser.Data.NextBatch"} for i in range(5)]
+    state = {"checkpoint_id": "c1", "step": 3}
+    evidence = {"certificate_id": "x", "trace_final_hash": "00"}
+    sync = (
+        write_trace(records, tmp_path / "sync" / "trace.json"),
+        save_checkpoint(state, tmp_path / "sync" / "ckpt.json"),
+        write_execution_certificate(evidence, tmp_path / "sync" / "cert.json"),
+    )
+    with PersistenceService(max_pending=2) as service:
+        queued = (
+            write_trace(records, tmp_path / "bg" / "trace.json", service=service),
+            save_checkpoint(state, tmp_path / "bg" / "ckpt.json", service=service),
+            write_execution_certificate(
+                evidence, tmp_path / "bg" / "cert.json", service=service
+            ),
+        )
+        state["step"] = 99  # already serialized
+        service.flush()
+    assert queued == sync
+    for name in ("trace.json", "ckpt.json", "cert.json"):
+        expected = (tmp_path / "sync" / name).read_bytes()
+        assert (tmp_path / "bg" / name).read_bytes() == expected
+
+
+class _GatedFuture:
+    """Queue item stand-in that holds the writer thread until ``gate`` is set."""
+
+    def __init__(self, gate: threading.Event) -> None:
+        self.gate = gate
+
+    def set_running_or_notify_cancel(self) -> bool:
+        self.gate.wait()
+        return False
+
+
+def test_service_applies_backpressure_and_keeps_order(tmp_path):
+    service = PersistenceService(max_pending=1, fsync=False)
+    gate = threading.Event()
+    service.submit(tmp_path / "gate", b"")
+    service._queue.put((tmp_path / "gate", b"", _GatedFuture(gate)))
+    futures = []
+
+    def produce():
+        for i in range(1, 4):
+            futures.append(service.submit(tmp_path / "a", bytes([i])))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()  # the queue is full while the writer is held
+    gate.set()
+    producer.join()
+    service.close()
+    assert all(f.done() for f in futures)
+    assert (tmp_path / "a").read_bytes() == bytes([3])
+
+
+def test_barrier_reports_write_errors(tmp_path):
+    (tmp_path / "dir").mkdir()
+    with PersistenceService(fsync=False) as service:
+        bad = service.submit(tmp_path / "dir", b"not a file")
+        with pytest.raises(OSError):
+            service.flush()
+        with pytest.raises(OSError):
+            bad.result()
+        service.submit(tmp_path / "ok", b"ok")
+        service.flush()
+    assert (tmp_path / "ok").read_bytes() == b"ok"
+    with pytest.raises(ValueError):
+        service.submit(tmp_path / "late", b"")
+
+
+def test_asyncio_api(tmp_path):
+    async def main():
+        with PersistenceService(max_pending=1, fsync=False) as service:
+            done = [
+                await service.asubmit(tmp_path / f"f{i}", str(i).encode())
+                for i in range(4)
+            ]
+            await service.aflush()
+            return [await d for d in done]
+
+    paths = asyncio.run(main())
+    assert [p.name for p in paths] == ["f0", "f1", "f2", "f3"]
+    assert (tmp_path / "f3").read_bytes() == b"3"
+
+
+def test_close_racing_submitters_leaves_no_orphaned_futures(tmp_path):
+    service = PersistenceService(max_pending=2, fsync=False)
+    futures = []
+    start = threading.Barrier(5)
+
+    def produce(k):
+        start.wait()
+        for i in range(200):
+            try:
+                futures.append(service.submit(tmp_path / f"p{k}", bytes([i % 256])))
+            except ValueError:
+                return
+
+    producers = [threading.Thread(target=produce, args=(k,)) for k in range(4)]
+    for t in producers:
+        t.start()
+    start.wait()
+    service.close()
+    for t in producers:
+        t.join()
+    assert all(f.result(timeout=5) is not None for f in futures)
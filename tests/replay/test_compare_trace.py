@@ -0,0 +1,84 @@
+"""Trace comparison and first-divergence tests."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.glyphser.replay.compare_trace import compare_traces, diff_records
+from src.glyphser.trace.trace_sidecar import TraceWriter, read_trace, write_trace
+from tests.trace.conftest import make_records
+
+
+def _write(path, records, interval=None):
+    with TraceWriter(
+        path, fmt=path.suffix[1:], flush_records=8, index_interval=interval
+    ) as writer:
+        writer.extend(records)
+    return path
+
+
+@pytest.mark.parametrize("interval", [None, 16])
+def test_compare_traces_reports_first_divergence(tmp_path, interval):
+    a = make_records(200)
+    b = [dict(r) for r in a]
+    b[137] = dict(b[137], outputs=[68.5, -2.0])
+    b[150] = dict(b[150], operator_id="other")
+    summary = compare_traces(
+        _write(tmp_path / "a.cbor", a, interval),
+        _write(tmp_path / "b.ndjson", b, interval),
+    )
+    assert summary["status"] == "DIVERGED"
+    assert summary["first_divergence_index"] == 137
+    assert summary["first_divergence_t"] == 137
+    assert summary["operator_id"] == "Glyphser.Op2"
+    assert summary["field_diffs"] == [{"field": "outputs[1]", "a": -1.0, "b": -2.0}]
+    assert summary["error"]["code_id"] == "REPLAY_DIVERGENCE"
+    if interval:
+        assert summary["records_skipped"] == 128
+        assert summary["records_compared"] == 10
+
+
+def test_compare_traces_match_and_length_mismatch(tmp_path):
+    a = make_records(40)
+    write_trace(a, tmp_path / "a.json")
+    write_trace(a, tmp_path / "b.json")
+    assert compare_traces(tmp_path / "a.json", tmp_path / "b.json")["status"] == "MATCH"
+
+    write_trace(a[:35], tmp_path / "short.json")
+    summary = compare_traces(tmp_path / "a.json", tmp_path / "short.json")
+    assert summary["first_divergence_index"] == 35
+    assert summary["field_diffs"][0]["b"] == "<missing>"
+
+
+def test_compare_traces_tolerant_profile(tmp_path):
+    a = make_records(10)
+    b = [dict(r, loss=r["loss"] + 1e-12) for r in a]
+    _write(tmp_path / "a.cbor", a)
+    _write(tmp_path / "b.cbor", b)
+    report = compare_traces(tmp_path / "a.cbor", tmp_path / "b.cbor")
+    assert report["first_divergence_index"] == 0
+    profile = {"determinism_class_map": {"loss": "E1"}}
+    report = compare_traces(tmp_path / "a.cbor", tmp_path / "b.cbor", profile)
+    assert report["status"] == "MATCH"
+
+
+def test_diff_records_classes():
+    a = {"t": 1, "replay_token": "x", "wall_time": 3.0, "m": {"acc": 0.5}}
+    b = {"t": 1, "replay_token": "y", "wall_time": 4.0, "m": {"acc": 0.5, "extra": 1}}
+    profile = {"determinism_class_map": {"wall_time": "NON_COMPARABLE"}}
+    assert diff_records(a, b, profile) == [
+        {"field": "m.extra", "a": "<missing>", "b": 1},
+        {"field": "replay_token", "a": "x", "b": "y"},
+    ]
+    with pytest.raises(ValueError):
+        diff_records(a, b, {"determinism_class_map": {"t": "E9"}})
+
+
+def test_read_trace_streams_each_format(tmp_path):
+    records = make_records(5)
+    for suffix in ("json", "ndjson", "cbor"):
+        path = _write(tmp_path / f"t.{suffix}", records)
+        assert list(read_trace(path)) == records
+    gen = read_trace(tmp_path / "t.cbor")
+    assert next(gen) == records[0]
+    gen.close()
@@ -0,0 +1,17 @@
+"""Shared helpers for the trace and replay tests."""
+
+from __future__ import annotations
+
+
+def make_records(n: int, start: int = 0) -> list[dict]:
+    """``n`` plain-dict trace records with ``t`` running from ``start``."""
+    return [
+        {
+            "t": i,
+            "operator_id": f"Glyphser.Op{i % 3}",
+            "outputs": [i * 0.5, -1.0],
+            "loss": 1.0 / (i + 1),
+            "status": "OK",
+        }
+        for i in range(start, start + n)
+    ]
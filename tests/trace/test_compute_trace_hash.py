@@ -11,3 +11,13 @@ def test_compute_trace_hash_deterministic():
     a = compute_trace_hash(records)
     b = compute_trace_hash(records)
     assert a == b
+
+
+def test_compute_trace_hash_parallel_matches_serial():
+    records = [
+        {"t": i, "operator_id": "Glyphser.Data.NextBatch", "outputs": [i * 0.25]}
+        for i in range(300)
+    ]
+    serial = compute_trace_hash(records)
+    assert compute_trace_hash(iter(records), workers=2, chunk_size=16) == serial
+    assert compute_trace_hash([], workers=2) == compute_trace_hash([])
@@ -0,0 +1,71 @@
+"""Incremental trace hasher and resume tests."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.glyphser.checkpoint.write import save_checkpoint
+from src.glyphser.trace.compute_trace_hash import (
+    TRACE_HEAD_HASH,
+    TraceHasher,
+    compute_trace_hash,
+)
+from src.glyphser.trace.trace_sidecar import TraceWriter
+from tests.trace.conftest import make_records
+
+
+def test_trace_hasher_resume_matches_full_hash(tmp_path):
+    records = make_records(20)
+    hasher = TraceHasher()
+    hasher.update_many(records[:12])
+    header = {"checkpoint_id": "ckpt-12", "step": 12, **hasher.export_state()}
+    save_checkpoint(header, tmp_path / "ckpt.json")
+
+    restored = json.loads((tmp_path / "ckpt.json").read_text(encoding="utf-8"))
+    resumed = TraceHasher.from_state(restored)
+    assert resumed.record_count == 12
+    for record in records[12:]:
+        resumed.update(record)
+    assert resumed.record_count == 20
+    assert resumed.hexdigest() == compute_trace_hash(records)
+
+
+def test_trace_hasher_state_validation():
+    assert (
+        TraceHasher.from_state(TraceHasher().export_state()).digest() == TRACE_HEAD_HASH
+    )
+    with pytest.raises(ValueError):
+        TraceHasher.from_state({"trace_chain_hash": "00" * 32, "trace_record_count": 0})
+    with pytest.raises(ValueError):
+        TraceHasher.from_state({"trace_chain_hash": "zz", "trace_record_count": 1})
+    with pytest.raises(ValueError):
+        TraceHasher.from_state(
+            {"trace_chain_hash": "00" * 32, "trace_record_count": -1}
+        )
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "cbor"])
+def test_trace_writer_resume_truncates_uncheckpointed_records(tmp_path, fmt):
+    path = tmp_path / f"trace.{fmt}"
+    records = make_records(10)
+    writer = TraceWriter(path, fmt=fmt)
+    writer.extend(records[:6])
+    state = writer.export_state()
+    writer.extend(make_records(3, start=100))  # lost in the "crash"
+    writer.close()
+
+    with TraceWriter(path, fmt=fmt, resume_state=state) as resumed:
+        resumed.extend(records[6:])
+    assert resumed.close() == compute_trace_hash(records)
+
+    with TraceWriter(tmp_path / f"fresh.{fmt}", fmt=fmt) as fresh:
+        fresh.extend(records)
+    assert path.read_bytes() == (tmp_path / f"fresh.{fmt}").read_bytes()
+
+
+def test_trace_writer_resume_rejects_json_format(tmp_path):
+    state = dict(TraceHasher().export_state(), trace_byte_offset=0)
+    with pytest.raises(ValueError):
+        TraceWriter(tmp_path / "trace.json", fmt="json", resume_state=state)
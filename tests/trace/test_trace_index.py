@@ -0,0 +1,114 @@
+"""Trace index sidecar tests."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.glyphser.trace.compute_trace_hash import TRACE_HEAD_HASH, compute_trace_hash
+from src.glyphser.trace.trace_index import TraceIndex, index_path
+from src.glyphser.trace.trace_sidecar import TraceWriter, write_trace
+from tests.trace.conftest import make_records
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "cbor"])
+def test_trace_index_random_access_and_checkpoints(tmp_path, fmt):
+    records = make_records(23)
+    path = tmp_path / f"trace.{fmt}"
+    with TraceWriter(path, fmt=fmt, flush_records=4, index_interval=5) as writer:
+        writer.extend(records)
+
+    index = TraceIndex(path)
+    assert len(index) == 23
+    assert index.checkpoint_count() == 4
+    assert index.read_record(17) == records[17]
+    assert index.read_record(-1) == records[-1]
+    assert list(index.iter_records(3, 9)) == records[3:9]
+    assert index.checkpoint_hash(0) == TRACE_HEAD_HASH
+    assert index.checkpoint_hash(2).hex() == compute_trace_hash(records[:10])
+    assert index.chain_hash_at(13).hex() == compute_trace_hash(records[:13])
+    assert index.verify_range(7).hex() == compute_trace_hash(records)
+
+
+def test_iter_records_reads_bounded_windows(tmp_path, monkeypatch):
+    records = make_records(40)
+    records[7]["outputs"] = [0.25] * 50  # larger than the read window on its own
+    path = tmp_path / "trace.cbor"
+    with TraceWriter(path, fmt="cbor", index_interval=8) as writer:
+        writer.extend(records)
+    index = TraceIndex(path)
+    reads = []
+    real_open = open
+
+    class _Spy:
+        def __init__(self, f):
+            self._f = f
+
+        def read(self, n):
+            reads.append(n)
+            return self._f.read(n)
+
+        def __getattr__(self, name):
+            return getattr(self._f, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._f.close()
+
+    monkeypatch.setattr("src.glyphser.trace.trace_index._READ_WINDOW", 256)
+    monkeypatch.setattr("builtins.open", lambda *a, **k: _Spy(real_open(*a, **k)))
+    assert list(index.iter_records(2)) == records[2:]
+    assert len(reads) > 1
+    assert max(reads) <= max(256, max(e - s for s, e in map(index.span, range(40))))
+
+
+def test_write_trace_index_keeps_trace_bytes(tmp_path):
+    records = make_records(6)
+    write_trace(records, tmp_path / "plain.json")
+    write_trace(records, tmp_path / "indexed.json", index_interval=2)
+    plain = (tmp_path / "plain.json").read_bytes()
+    assert (tmp_path / "indexed.json").read_bytes() == plain
+    assert not index_path(tmp_path / "plain.json").exists()
+
+
+def test_trace_index_detects_tampered_record(tmp_path):
+    path = tmp_path / "trace.ndjson"
+    with TraceWriter(path, fmt="ndjson", index_interval=4) as writer:
+        writer.extend(make_records(8))
+    data = path.read_bytes().replace(b'"t":5', b'"t":6', 1)
+    path.write_bytes(data)
+    index = TraceIndex(path)
+    index.verify_range(0, 4)
+    with pytest.raises(ValueError):
+        index.verify_range(4)
+
+
+def test_trace_index_tails_live_writer(tmp_path):
+    path = tmp_path / "trace.cbor"
+    records = make_records(7)
+    writer = TraceWriter(path, fmt="cbor", flush_records=1, index_interval=3)
+    writer.extend(records[:2])
+    index = TraceIndex(path)
+    assert len(index) == 2
+    writer.extend(records[2:])
+    assert index.refresh() == 7
+    assert index.read_record(6) == records[6]
+    writer.close()
+
+
+def test_trace_index_resume_truncates_with_trace(tmp_path):
+    path = tmp_path / "trace.cbor"
+    records = make_records(11)
+    writer = TraceWriter(path, fmt="cbor", index_interval=3)
+    writer.extend(records[:5])
+    state = writer.export_state()
+    writer.extend(make_records(4))
+    writer.close()
+
+    with TraceWriter(path, fmt="cbor", resume_state=state, index_interval=3) as resumed:
+        resumed.extend(records[5:])
+    index = TraceIndex(path)
+    assert len(index) == 11
+    assert list(index.iter_records()) == records
+    assert index.verify_range(0).hex() == compute_trace_hash(records)
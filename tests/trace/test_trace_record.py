@@ -0,0 +1,141 @@
+"""Slotted trace record tests."""
+
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import OMITTED, encode_canonical
+from src.glyphser.trace.compute_trace_hash import (
+    compute_record_hash,
+    compute_trace_hash,
+)
+from src.glyphser.trace.trace_index import TraceIndex
+from src.glyphser.trace.trace_record import (
+    TRACE_RECORD_SCHEMA,
+    TRACE_RECORD_TYPES,
+    IterRecord,
+    RunEndRecord,
+    TraceRecord,
+    record_from_json,
+)
+from src.glyphser.trace.trace_sidecar import TraceWriter, read_trace, write_trace
+
+TOKEN = bytes(range(32))
+
+
+def _iter_fields(t: int) -> dict:
+    return {
+        "t": t,
+        "stage_id": "train",
+        "operator_id": "Glyphser.Model.ModelIR_Executor",
+        "operator_seq": 0,
+        "rank": 0,
+        "status": "OK",
+        "replay_token": TOKEN,
+    }
+
+
+def test_slotted_records_encode_like_dicts():
+    record = IterRecord(**_iter_fields(3), loss_total=0.5, rng_offset_after=70000)
+    as_dict = record.to_dict()
+    assert as_dict["kind"] == "ITER" and "grad_norm" not in as_dict
+    assert record.grad_norm is OMITTED
+    assert record.encode() == encode_canonical(as_dict)
+    assert encode_canonical([record, 1]) == encode_canonical([as_dict, 1])
+    assert record.record_hash() == compute_record_hash(as_dict)
+    assert TraceRecord.from_dict(as_dict) == record
+    assert not hasattr(record, "__dict__")
+
+
+def test_every_schema_kind_has_a_class():
+    assert set(TRACE_RECORD_TYPES) == set(TRACE_RECORD_SCHEMA)
+    end = RunEndRecord(status="OK", final_state_fp=TOKEN, trace_final_hash=TOKEN)
+    assert end.encode() == encode_canonical(
+        {
+            "kind": "RUN_END",
+            "status": "OK",
+            "final_state_fp": TOKEN,
+            "trace_final_hash": TOKEN,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "override",
+    [
+        {"t": -1},
+        {"t": True},
+        {"rank": 1 << 32},
+        {"replay_token": b"short"},
+        {"status": 1},
+        {"kind": "RUN_END"},
+    ],
+)
+def test_invalid_field_values_are_rejected(override):
+    with pytest.raises(ValueError):
+        IterRecord(**{**_iter_fields(0), **override})
+    with pytest.raises(ValueError):
+        IterRecord(**_iter_fields(0), loss_total=1)
+
+
+def test_missing_or_unknown_fields_are_rejected():
+    fields = _iter_fields(0)
+    del fields["rank"]
+    with pytest.raises(TypeError):
+        IterRecord(**fields)
+    with pytest.raises(TypeError):
+        IterRecord(**_iter_fields(0), bogus=1)
+    with pytest.raises(ValueError):
+        TraceRecord.from_dict({"kind": "NOPE"})
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "cbor"])
+def test_trace_writer_accepts_slotted_records(tmp_path, fmt):
+    records = [IterRecord(**_iter_fields(t)) for t in range(5)]
+    path = tmp_path / f"trace.{fmt}"
+    with TraceWriter(path, fmt=fmt, index_interval=2) as writer:
+        writer.extend(records)
+    as_dicts = [r.to_dict() for r in records]
+    assert writer.close() == compute_trace_hash(as_dicts)
+    assert list(read_trace(path)) == as_dicts
+    assert TraceIndex(path).verify_range(0).hex() == writer.close()
+
+
+def test_records_are_immutable():
+    record = IterRecord(**_iter_fields(3))
+    for name, value in (("t", -1), ("t", True), ("grad_norm", 1.0)):
+        with pytest.raises(AttributeError):
+            setattr(record, name, value)
+    with pytest.raises(AttributeError):
+        del record.t
+    assert record.encode() == encode_canonical(record.to_dict())
+
+
+def test_record_from_json_leaves_other_records_alone():
+    plain = {"t": 1, "replay_token": "00" * 32}
+    assert record_from_json(plain) is plain
+    as_json = IterRecord(**_iter_fields(1)).to_json_dict()
+    assert as_json["replay_token"] == {"__bytes__": TOKEN.hex()}
+    assert record_from_json(as_json) == IterRecord(**_iter_fields(1)).to_dict()
+
+
+@pytest.mark.parametrize("token", ["zz", "00" * 32])
+def test_plain_dict_json_traces_round_trip(tmp_path, token):
+    path = tmp_path / "trace.json"
+    records = [
+        {"kind": "ITER", "replay_token": token, "t": 1},
+        {"kind": "ITER", "replay_token": token, "t": 2},
+    ]
+    final = write_trace(records, path, index_interval=1)
+    assert list(read_trace(path)) == records
+    assert TraceIndex(path).verify_range(0, 2).hex() == final
+
+
+def test_records_pickle_and_hash_in_worker_processes():
+    record = IterRecord(**_iter_fields(3))
+    assert pickle.loads(pickle.dumps(record)) == record
+    records = [record] * 50
+    expected = compute_trace_hash([r.to_dict() for r in records])
+    assert compute_trace_hash(records, workers=2) == expected
@@ -0,0 +1,74 @@
+"""Segmented compressed trace format tests."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.glyphser.trace.compute_trace_hash import compute_trace_hash
+from src.glyphser.trace.trace_segments import (
+    SegmentedTraceReader,
+    write_segmented_trace,
+)
+from src.glyphser.trace.trace_sidecar import write_trace
+from tests.trace.conftest import make_records
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_segmented_trace_round_trip_and_hash(tmp_path, codec):
+    records = make_records(500)
+    path = tmp_path / "trace.seg"
+    final = write_segmented_trace(records, path, codec=codec, block_bytes=2048)
+    assert final == compute_trace_hash(records)
+
+    reader = SegmentedTraceReader(path)
+    assert reader.block_count > 1
+    assert reader.record_count == 500
+    assert reader.strings[:2] == ["t", "operator_id"]
+    assert list(reader) == records
+    assert reader.verify() == final
+    assert reader.verify(workers=2) == final
+
+    write_trace(records, tmp_path / "trace.json")
+    assert path.stat().st_size < (tmp_path / "trace.json").stat().st_size // 4
+
+
+def test_segmented_trace_blocks_verify_independently(tmp_path):
+    records = make_records(200)
+    path = tmp_path / "trace.seg"
+    write_segmented_trace(records, path, block_bytes=1024)
+    reader = SegmentedTraceReader(path)
+    last = reader.block_count - 1
+    tail = reader.read_block(last)
+    assert tail == records[-len(tail):]
+
+    data = bytearray(path.read_bytes())
+    data[reader.block_offsets[1] + 90] ^= 0xFF
+    path.write_bytes(bytes(data))
+    tampered = SegmentedTraceReader(path)
+    with pytest.raises(ValueError):
+        tampered.verify()
+    head = tampered.read_block(0)
+    assert head == records[: len(head)]
+
+
+def test_segmented_trace_non_string_operator_id_and_empty(tmp_path):
+    records = [
+        {"operator_id": 7, "t": 0},
+        {"operator_id": None, "t": 1},
+        {"t": 2, "meta": {"k": "v"}},
+    ]
+    path = tmp_path / "odd.seg"
+    assert write_segmented_trace(records, path) == compute_trace_hash(records)
+    assert list(SegmentedTraceReader(path)) == records
+
+    empty = tmp_path / "empty.seg"
+    assert write_segmented_trace([], empty) == compute_trace_hash([])
+    assert SegmentedTraceReader(empty).verify() == compute_trace_hash([])
+    with pytest.raises(ValueError):
+        write_segmented_trace([], tmp_path / "x.seg", codec="brotli")
+    plain = tmp_path / "plain.json"
+    plain.write_text(json.dumps([1, 2, 3]), encoding="utf-8")
+    with pytest.raises(ValueError):
+        SegmentedTraceReader(plain)
@@ -0,0 +1,65 @@
+"""Streaming trace writer tests."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.glyphser.serialization.canonical_cbor import encode_canonical
+from src.glyphser.trace.compute_trace_hash import compute_trace_hash
+from src.glyphser.trace.trace_sidecar import TraceWriter, write_trace
+from tests.trace.conftest import make_records
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "cbor"])
+def test_trace_writer_hash_matches_compute_trace_hash(tmp_path, fmt):
+    records = make_records(50)
+    with TraceWriter(tmp_path / f"trace.{fmt}", fmt=fmt, flush_records=7) as writer:
+        for record in records:
+            writer.append(record)
+        assert writer.record_count == 50
+    assert writer.close() == compute_trace_hash(records)
+
+
+def test_trace_writer_formats_on_disk(tmp_path):
+    records = make_records(5)
+    write_trace(records, tmp_path / "trace.json")
+    expected = (
+        json.dumps(records, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+        + "\n"
+    )
+    assert (tmp_path / "trace.json").read_text(encoding="utf-8") == expected
+
+    with TraceWriter(tmp_path / "trace.ndjson", fmt="ndjson") as writer:
+        writer.extend(records)
+    lines = (tmp_path / "trace.ndjson").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == records
+
+    with TraceWriter(tmp_path / "trace.cbor", fmt="cbor") as writer:
+        writer.extend(records)
+    assert (tmp_path / "trace.cbor").read_bytes() == b"".join(
+        encode_canonical(r) for r in records
+    )
+
+
+def test_trace_writer_empty_trace(tmp_path):
+    assert write_trace([], tmp_path / "empty.json") == compute_trace_hash([])
+    assert (tmp_path / "empty.json").read_text(encoding="utf-8") == "[]\n"
+
+
+def test_trace_writer_flush_policy(tmp_path):
+    path = tmp_path / "trace.cbor"
+    writer = TraceWriter(path, fmt="cbor", flush_records=3, flush_bytes=None)
+    writer.extend(make_records(2))
+    assert path.stat().st_size == 0
+    writer.append(make_records(3)[2])
+    assert path.stat().st_size > 0
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.append({"t": 9, "operator_id": "x"})
+
+
+def test_trace_writer_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        TraceWriter(tmp_path / "x", fmt="xml")
@@ -3,7 +3,6 @@ from __future__ import annotations
 
 import hashlib
 import json
-import struct
 import sys
 from pathlib import Path
 from typing import Any
@@ -15,63 +14,16 @@ from src.glyphser.registry.registry_builder import (  # noqa: E402
     build_operator_registry_from_list,
     parse_api_interfaces,
 )
+from src.glyphser.serialization.canonical_cbor import (  # noqa: E402
+    encode_canonical as cbor_encode,
+)
+from src.glyphser.serialization.canonical_cbor import encode_many  # noqa: E402
 
 
 def sha256_hex(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
-def _enc_uint(major: int, n: int) -> bytes:
-    assert n >= 0
-    if n < 24:
-        return bytes([(major << 5) | n])
-    if n < 256:
-        return bytes([(major << 5) | 24, n])
-    if n < 65536:
-        return bytes([(major << 5) | 25]) + n.to_bytes(2, "big")
-    if n < 4294967296:
-        return bytes([(major << 5) | 26]) + n.to_bytes(4, "big")
-    return bytes([(major << 5) | 27]) + n.to_bytes(8, "big")
-
-
-def cbor_encode(obj: Any) -> bytes:
-    if obj is None:
-        return b"\xf6"
-    if obj is False:
-        return b"\xf4"
-    if obj is True:
-        return b"\xf5"
-    if isinstance(obj, int):
-        if obj >= 0:
-            return _enc_uint(0, obj)
-        return _enc_uint(1, -1 - obj)
-    if isinstance(obj, bytes):
-        return _enc_uint(2, len(obj)) + obj
-    if isinstance(obj, str):
-        b = obj.encode("utf-8")
-        return _enc_uint(3, len(b)) + b
-    if isinstance(obj, float):
-        return b"\xfb" + struct.pack(">d", obj)
-    if isinstance(obj, (list, tuple)):
-        out = [_enc_uint(4, len(obj))]
-        for x in obj:
-            out.append(cbor_encode(x))
-        return b"".join(out)
-    if isinstance(obj, dict):
-        items = []
-        for k, v in obj.items():
-            kb = cbor_encode(k)
-            vb = cbor_encode(v)
-            items.append((kb, vb))
-        items.sort(key=lambda kv: kv[0])
-        out = [_enc_uint(5, len(items))]
-        for kb, vb in items:
-            out.append(kb)
-            out.append(vb)
-        return b"".join(out)
-    raise TypeError(f"unsupported type: {type(obj)!r}")
-
-
 def cbor_hash_preimage(domain: str, payload: Any) -> bytes:
     return cbor_encode([domain, payload])
 
@@ -253,14 +205,17 @@ def materialize() -> None:
     operator_registry = build_operator_registry(digest_map)
     vectors_catalog = build_vectors_catalog(digest_map)
 
-    blobs: dict[str, bytes] = {
-        "digest_catalog.cbor": cbor_encode(digest_catalog),
-        "error_codes.cbor": cbor_encode(error_codes),
-        "capability_catalog.cbor": cbor_encode(capability_catalog),
-        "schema_catalog.cbor": cbor_encode(schema_catalog),
-        "operator_registry.cbor": cbor_encode(operator_registry),
-        "vectors_catalog.cbor": cbor_encode(vectors_catalog),
+    blob_sources: dict[str, Any] = {
+        "digest_catalog.cbor": digest_catalog,
+        "error_codes.cbor": error_codes,
+        "capability_catalog.cbor": capability_catalog,
+        "schema_catalog.cbor": schema_catalog,
+        "operator_registry.cbor": operator_registry,
+        "vectors_catalog.cbor": vectors_catalog,
     }
+    blobs: dict[str, bytes] = dict(
+        zip(blob_sources, encode_many(blob_sources.values()))
+    )
 
     hash_manifest = {}
     for name, blob in blobs.items():
@@ -7,6 +7,9 @@ from pathlib import Path
 import sys
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.glyphser.serialization.canonical_cbor_decode import decode_canonical  # noqa: E402
 
 
 def sha256_hex(path: Path) -> str:
@@ -26,6 +29,11 @@ def verify_manifest(manifest_path: Path) -> list[str]:
             errors.append(f"hash mismatch: {p} expected={info.get('sha256')} got={h}")
         if p.stat().st_size != info.get("size_bytes"):
             errors.append(f"size mismatch: {p} expected={info.get('size_bytes')} got={p.stat().st_size}")
+        if p.suffix == ".cbor":
+            try:
+                decode_canonical(p.read_bytes())
+            except ValueError as exc:
+                errors.append(f"non-canonical cbor: {p} ({exc})")
     return errors
 
 